@@ -1,8 +1,15 @@
 import os
-from dotenv import load_dotenv
-from bot import HorizonBot
-import asyncio
-from db import session
+import startupprofile
+
+# Before the other imports, so they are part of the profile
+startupprofile.enable_from_env()
+
+from dotenv import load_dotenv  # noqa: E402
+from bot import HorizonBot  # noqa: E402
+import asyncio  # noqa: E402
+from db import session  # noqa: E402
+
+startupprofile.mark("imports")
 
 load_dotenv(dotenv_path=".env", override=True)
 
@@ -17,5 +24,6 @@ async def setup():
 
 if __name__ == "__main__":
     asyncio.run(setup())
+    startupprofile.mark("database initialised")
     bot = HorizonBot()
     bot.run(DISCORD_TOKEN)
\ No newline at end of file
@@ -2,6 +2,12 @@ from pathlib import Path
 import discord
 from discord.ext import commands
 
+from challonge.client import ChallongeClient
+from config import CONFIG
+import restscheduler
+import startupprofile
+import tracing
+
 class HorizonBot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
@@ -11,6 +17,8 @@ class HorizonBot(commands.Bot):
         super().__init__(command_prefix="!", intents=intents)
 
     async def on_ready(self):
+        startupprofile.mark("on_ready")
+        startupprofile.report_once()
         print(f"Logged in as {self.user} (ID: {self.user.id})")
         
         print("------")
@@ -18,12 +26,22 @@ class HorizonBot(commands.Bot):
         print("------")
     
     async def setup_hook(self):
+        restscheduler.install(self.http)
+
+        if CONFIG.tracing is not None and CONFIG.tracing.enabled:
+            tracing.configure(True, CONFIG.tracing.slow_threshold or 1.0, CONFIG.tracing.output_path or "traces.jsonl")
+            tracing.instrument_package("core.repositories")
+            tracing.instrument_package("core.services")
+            tracing.instrument_class(ChallongeClient)
+            tracing.instrument_discord_http(self.http)
+
         folder = Path(__file__).resolve().parent / "cogs"
 
         for cog_path in folder.glob("*.py"):
             await self.load_extension(f"cogs.{cog_path.stem}")
+            startupprofile.mark(f"loaded cogs.{cog_path.stem}")
 
-#       TODO:                                                                           #
-#       - fetch/use brackets from challonge                                             #
-#       - add ban method in service layer which will check teams, signups, etc.         #
-#       - ban command using the according service layer                                 #
\ No newline at end of file
+        restscheduler.prioritize_app_commands(self.tree)
+        if tracing.is_enabled():
+            tracing.instrument_app_commands(self.tree)
+        startupprofile.mark("setup_hook")
@@ -1,50 +1,105 @@
-import requests
+import threading
+
+import metrics
+import resilience
 
 class ChallongeClient:
     BASE_URL = "https://api.challonge.com/v1"
 
-    def __init__(self, api_key: str, user_agent: str = "HorizonChallongeClient/1.0"):
+    def __init__(self, api_key: str, user_agent: str = "HorizonChallongeClient/1.0", base_url: str | None = None):
         self.api_key = api_key
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": user_agent
-        })
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.user_agent = user_agent
+        self._session = None
+        self._session_lock = threading.Lock()
 
-    def _get(self, endpoint, params=None):
-        if params is None:
-            params = {}
-        params["api_key"] = self.api_key
-        response = self.session.get(f"{self.BASE_URL}{endpoint}.json", params=params)
+    @property
+    def session(self):
+        """
+        The requests session, created on first use. requests is imported here
+        and not at module level, it is not needed until the first call (which
+        runs in a worker thread) and is one of the slower imports at startup.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+
+                    session = requests.Session()
+                    session.headers.update({
+                        "User-Agent": self.user_agent
+                    })
+                    self._session = session
+        return self._session
+
+    def _request(self, method, endpoint, idempotent=True, **kwargs):
+        """
+        Send a request through the shared retry and circuit breaker layer.
+        Non idempotent requests are only retried when Challonge rejected them
+        with a 429 or the connection could not be established, so nothing gets
+        created twice.
+        """
+        import requests
+
+        def attempt(timeout):
+            with metrics.track_external_request("challonge") as request:
+                response = self.session.request(method, f"{self.base_url}{endpoint}.json", timeout=timeout, **kwargs)
+                request.status = response.status_code
+            if response.status_code == 429 or (idempotent and response.status_code in resilience.RETRY_STATUSES):
+                raise resilience.RetryableStatus(response.status_code, resilience.parse_retry_after(response.headers.get("Retry-After")), host="challonge")
+            return response
+
+        retry_on = (requests.ConnectionError, requests.Timeout) if idempotent else (requests.ConnectionError,)
+        try:
+            response = resilience.call_sync("challonge", attempt, retry_on=retry_on)
+        except resilience.RetryableStatus as e:
+            raise requests.HTTPError(f"{e.status} error from Challonge for {endpoint} after retries") from e
+        if response.status_code == 304:
+            return response
         try:
             response.raise_for_status()
         except requests.HTTPError as e:
             print(str(response.content))
             raise e
-        return response.json()
+        return response
+
+    def _get(self, endpoint, params=None):
+        if params is None:
+            params = {}
+        params["api_key"] = self.api_key
+        return self._request("GET", endpoint, params=params).json()
+
+    def _get_if_changed(self, endpoint, etag=None, params=None):
+        """GET that sends If-None-Match. Returns (None, etag) when the resource did not change."""
+        if params is None:
+            params = {}
+        params["api_key"] = self.api_key
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self._request("GET", endpoint, params=params, headers=headers)
+        if response.status_code == 304:
+            return None, etag
+        return response.json(), response.headers.get("ETag")
 
-    def _post(self, endpoint, data=None):
+    def _post(self, endpoint, data=None, idempotent=False):
         if data is None:
             data = {}
-        data["api_key"] = self.api_key
-        response = self.session.post(f"{self.BASE_URL}{endpoint}.json", data=data)
-        try:
-            response.raise_for_status()
-        except requests.HTTPError as e:
-            print(str(response.content))
-            raise e
-        return response.json()
+        if isinstance(data, list):
+            data = data + [("api_key", self.api_key)]
+        else:
+            data["api_key"] = self.api_key
+        return self._request("POST", endpoint, idempotent=idempotent, data=data).json()
 
     def _put(self, endpoint, data=None):
         if data is None:
             data = {}
         data["api_key"] = self.api_key
-        response = self.session.put(f"{self.BASE_URL}{endpoint}.json", data=data)
-        try:
-            response.raise_for_status()
-        except requests.HTTPError as e:
-            print(str(response.content))
-            raise e
-        return response.json()
+        return self._request("PUT", endpoint, data=data).json()
+
+    def _delete(self, endpoint, params=None):
+        if params is None:
+            params = {}
+        params["api_key"] = self.api_key
+        return self._request("DELETE", endpoint, params=params).json()
 
 
     def create_tournament(self, name, url, signup_cap, tournament_type="single elimination"):
@@ -67,11 +122,22 @@ class ChallongeClient:
         }
         return self._post(f"/tournaments/{tournament_id}/participants", data)
     
+    def bulk_add_participants(self, tournament_id, participants: list[dict]):
+        """Add many participants in one call. `participants` holds dicts with `name` and optionally `misc`."""
+        data = []
+        for participant in participants:
+            data.append(("participants[][name]", participant["name"]))
+            data.append(("participants[][misc]", participant.get("misc", "")))
+        return self._post(f"/tournaments/{tournament_id}/participants/bulk_add", data)
+    
     def check_in_participant(self, tournament_id, participant_id):
-        return self._post(f"/tournaments/{tournament_id}/participants/{participant_id}/check_in")
+        return self._post(f"/tournaments/{tournament_id}/participants/{participant_id}/check_in", idempotent=True)
     
     def check_out_participant(self, tournament_id, participant_id):
-        return self._post(f"/tournaments/{tournament_id}/participants/{participant_id}/undo_check_in")
+        return self._post(f"/tournaments/{tournament_id}/participants/{participant_id}/undo_check_in", idempotent=True)
+
+    def delete_participant(self, tournament_id, participant_id):
+        return self._delete(f"/tournaments/{tournament_id}/participants/{participant_id}")
 
     def list_participants(self, tournament_id):
         return self._get(f"/tournaments/{tournament_id}/participants")
@@ -82,6 +148,9 @@ class ChallongeClient:
     def get_matches(self, tournament_id):
         return self._get(f"/tournaments/{tournament_id}/matches")
 
+    def get_matches_if_changed(self, tournament_id, etag=None):
+        return self._get_if_changed(f"/tournaments/{tournament_id}/matches", etag)
+
     def get_participant_seed(self, tournament_id, participant_id):
         participant = self._get(f"/tournaments/{tournament_id}/participants/{participant_id}")
         return participant['participant']['seed']
@@ -0,0 +1,317 @@
+"""
+In-process fake of the parts of the Challonge v1 API used by ChallongeClient.
+
+Latency, error injection and rate limiting are configurable so retry
+behaviour and throughput can be measured without network access:
+
+    simulator = ChallongeSimulator(latency=0.05, error_rate=0.1, rate_limit=20)
+    await simulator.start()
+    client = ChallongeClient("any-key", base_url=simulator.base_url)
+
+It can also be run standalone: ``python bot/challonge/simulator.py --port 9300``.
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import math
+import random
+import time
+
+from aiohttp import web
+
+class ChallongeSimulator:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, rate_limit: float | None = None, burst: int | None = None, seed: int | None = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst or (int(rate_limit) if rate_limit else 0)
+        self.random = random.Random(seed)
+
+        self.tournaments: dict[int, dict] = {}
+        self.participants: dict[int, dict[int, dict]] = {}
+        self.matches: dict[int, dict[int, dict]] = {}
+        self.stats = {"requests": 0, "errors_injected": 0, "rate_limited": 0}
+
+        self._ids = itertools.count(1)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._runner: web.AppRunner | None = None
+        self.host = "127.0.0.1"
+        self.port = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._chaos_middleware])
+        routes = [
+            web.post("/v1/tournaments.json", self._create_tournament),
+            web.get("/v1/tournaments/{tid}.json", self._get_tournament),
+            web.post("/v1/tournaments/{tid}/start.json", self._start_tournament),
+            web.get("/v1/tournaments/{tid}/participants.json", self._list_participants),
+            web.post("/v1/tournaments/{tid}/participants.json", self._add_participant),
+            web.post("/v1/tournaments/{tid}/participants/bulk_add.json", self._bulk_add_participants),
+            web.get("/v1/tournaments/{tid}/participants/{pid}.json", self._get_participant),
+            web.delete("/v1/tournaments/{tid}/participants/{pid}.json", self._delete_participant),
+            web.post("/v1/tournaments/{tid}/participants/{pid}/check_in.json", self._check_in),
+            web.post("/v1/tournaments/{tid}/participants/{pid}/undo_check_in.json", self._undo_check_in),
+            web.get("/v1/tournaments/{tid}/matches.json", self._list_matches),
+            web.put("/v1/tournaments/{tid}/matches/{mid}.json", self._update_match),
+            web.get("/_stats", self._get_stats),
+        ]
+        app.add_routes(routes)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.host = host
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _chaos_middleware(self, request: web.Request, handler):
+        if request.path == "/_stats":
+            return await handler(request)
+
+        self.stats["requests"] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+
+        if self.rate_limit:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate_limit)
+            self._last_refill = now
+            if self._tokens < 1:
+                self.stats["rate_limited"] += 1
+                retry_after = math.ceil((1 - self._tokens) / self.rate_limit)
+                return self._error(429, "Rate limit exceeded", headers={"Retry-After": str(retry_after)})
+            self._tokens -= 1
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["errors_injected"] += 1
+            return self._error(self.random.choice((500, 502, 503)), "Injected failure")
+
+        return await handler(request)
+
+    def _error(self, status: int, message: str, headers: dict | None = None) -> web.Response:
+        return web.json_response({"errors": [message]}, status=status, headers=headers)
+
+    def _tournament(self, request: web.Request) -> dict:
+        tournament = self.tournaments.get(int(request.match_info["tid"])) if request.match_info["tid"].isdigit() else None
+        if tournament is None:
+            raise web.HTTPNotFound(text=json.dumps({"errors": ["Tournament not found"]}), content_type="application/json")
+        return tournament
+
+    def _participant(self, request: web.Request, tournament: dict) -> dict:
+        participant = self.participants[tournament["id"]].get(int(request.match_info["pid"]))
+        if participant is None:
+            raise web.HTTPNotFound(text=json.dumps({"errors": ["Participant not found"]}), content_type="application/json")
+        return participant
+
+    async def _create_tournament(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        tournament_id = next(self._ids)
+        tournament = {
+            "id": tournament_id,
+            "name": form.get("tournament[name]", f"Tournament {tournament_id}"),
+            "url": form.get("tournament[url]", str(tournament_id)),
+            "tournament_type": form.get("tournament[tournament_type]", "single elimination"),
+            "signup_cap": int(form["tournament[signup_cap]"]) if form.get("tournament[signup_cap]") else None,
+            "state": "pending",
+        }
+        self.tournaments[tournament_id] = tournament
+        self.participants[tournament_id] = {}
+        self.matches[tournament_id] = {}
+        return web.json_response({"tournament": tournament})
+
+    async def _get_tournament(self, request: web.Request) -> web.Response:
+        return web.json_response({"tournament": self._tournament(request)})
+
+    def _new_participant(self, tournament: dict, name: str, misc: str) -> dict | web.Response:
+        participants = self.participants[tournament["id"]]
+        if any(p["name"] == name for p in participants.values()):
+            return self._error(422, "Name has already been taken")
+        if tournament["signup_cap"] and len(participants) >= tournament["signup_cap"]:
+            return self._error(422, "Signup cap reached")
+        participant = {
+            "id": next(self._ids),
+            "tournament_id": tournament["id"],
+            "name": name,
+            "misc": misc,
+            "seed": len(participants) + 1,
+            "checked_in": False,
+            "active": True,
+            "group_player_ids": [],
+        }
+        participants[participant["id"]] = participant
+        return participant
+
+    async def _add_participant(self, request: web.Request) -> web.Response:
+        tournament = self._tournament(request)
+        form = await request.post()
+        participant = self._new_participant(tournament, form.get("participant[name]", ""), form.get("participant[misc]", ""))
+        if isinstance(participant, web.Response):
+            return participant
+        return web.json_response({"participant": participant})
+
+    async def _bulk_add_participants(self, request: web.Request) -> web.Response:
+        tournament = self._tournament(request)
+        form = await request.post()
+        names = form.getall("participants[][name]", [])
+        miscs = form.getall("participants[][misc]", [""] * len(names))
+        created = []
+        for name, misc in zip(names, miscs):
+            participant = self._new_participant(tournament, name, misc)
+            if isinstance(participant, web.Response):
+                return participant
+            created.append({"participant": participant})
+        return web.json_response(created)
+
+    async def _list_participants(self, request: web.Request) -> web.Response:
+        tournament = self._tournament(request)
+        return web.json_response([{"participant": p} for p in self.participants[tournament["id"]].values()])
+
+    async def _get_participant(self, request: web.Request) -> web.Response:
+        tournament = self._tournament(request)
+        return web.json_response({"participant": self._participant(request, tournament)})
+
+    async def _delete_participant(self, request: web.Request) -> web.Response:
+        tournament = self._tournament(request)
+        participant = self._participant(request, tournament)
+        del self.participants[tournament["id"]][participant["id"]]
+        return web.json_response({"participant": participant})
+
+    async def _check_in(self, request: web.Request) -> web.Response:
+        tournament = self._tournament(request)
+        participant = self._participant(request, tournament)
+        participant["checked_in"] = True
+        return web.json_response({"participant": participant})
+
+    async def _undo_check_in(self, request: web.Request) -> web.Response:
+        tournament = self._tournament(request)
+        participant = self._participant(request, tournament)
+        participant["checked_in"] = False
+        return web.json_response({"participant": participant})
+
+    async def _start_tournament(self, request: web.Request) -> web.Response:
+        tournament = self._tournament(request)
+        if tournament["state"] != "pending":
+            return self._error(422, "Tournament has already been started")
+
+        entrants = sorted(self.participants[tournament["id"]].values(), key=lambda p: p["seed"])
+        if len(entrants) < 2:
+            return self._error(422, "At least two participants are required")
+
+        rounds = math.ceil(math.log2(len(entrants)))
+        seeds = [p["id"] for p in entrants] + [None] * (2 ** rounds - len(entrants))
+        # Seed 1 plays the last seed and so on, so byes go to the top seeds
+        slots = [slot for i in range(len(seeds) // 2) for slot in (seeds[i], seeds[-1 - i])]
+        play_order = itertools.count(1)
+        previous: list[dict] = []
+        for round_number in range(1, rounds + 1):
+            current = []
+            for i in range(2 ** (rounds - round_number)):
+                match = {
+                    "id": next(self._ids),
+                    "tournament_id": tournament["id"],
+                    "round": round_number,
+                    "suggested_play_order": next(play_order),
+                    "player1_id": slots[2 * i] if round_number == 1 else None,
+                    "player2_id": slots[2 * i + 1] if round_number == 1 else None,
+                    "player1_prereq_match_id": previous[2 * i]["id"] if previous else None,
+                    "player2_prereq_match_id": previous[2 * i + 1]["id"] if previous else None,
+                    "winner_id": None,
+                    "loser_id": None,
+                    "scores_csv": "",
+                    "state": "pending",
+                }
+                self.matches[tournament["id"]][match["id"]] = match
+                current.append(match)
+            previous = current
+
+        for match in self.matches[tournament["id"]].values():
+            if match["round"] == 1:
+                self._refresh_match_state(tournament["id"], match)
+        tournament["state"] = "underway"
+        return web.json_response({"tournament": tournament})
+
+    def _refresh_match_state(self, tournament_id: int, match: dict):
+        """Open matches with two players and advance byes."""
+        if match["state"] == "complete":
+            return
+        if match["player1_id"] and match["player2_id"]:
+            match["state"] = "open"
+        elif match["round"] == 1 and (match["player1_id"] or match["player2_id"]):
+            self._complete_match(tournament_id, match, match["player1_id"] or match["player2_id"])
+
+    def _complete_match(self, tournament_id: int, match: dict, winner_id: int):
+        match["winner_id"] = winner_id
+        match["loser_id"] = match["player2_id"] if winner_id == match["player1_id"] else match["player1_id"]
+        match["state"] = "complete"
+        for following in self.matches[tournament_id].values():
+            if following["player1_prereq_match_id"] == match["id"]:
+                following["player1_id"] = winner_id
+                self._refresh_match_state(tournament_id, following)
+            elif following["player2_prereq_match_id"] == match["id"]:
+                following["player2_id"] = winner_id
+                self._refresh_match_state(tournament_id, following)
+
+    async def _list_matches(self, request: web.Request) -> web.Response:
+        tournament = self._tournament(request)
+        body = json.dumps([{"match": m} for m in self.matches[tournament["id"]].values()])
+        etag = f'"{hashlib.md5(body.encode()).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+
+    async def _update_match(self, request: web.Request) -> web.Response:
+        tournament = self._tournament(request)
+        match = self.matches[tournament["id"]].get(int(request.match_info["mid"]))
+        if match is None:
+            return self._error(404, "Match not found")
+        form = await request.post()
+        if form.get("match[scores_csv]"):
+            match["scores_csv"] = form["match[scores_csv]"]
+        if form.get("match[winner_id]"):
+            winner_id = int(form["match[winner_id]"])
+            if winner_id not in (match["player1_id"], match["player2_id"]):
+                return self._error(422, "Winner must be one of the players")
+            self._complete_match(tournament["id"], match, winner_id)
+        return web.json_response({"match": match})
+
+    async def _get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+async def _serve(args):
+    simulator = ChallongeSimulator(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        seed=args.seed
+    )
+    await simulator.start(args.host, args.port)
+    print(f"Challonge simulator listening on {simulator.base_url}")
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local Challonge API simulator.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Additional random latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 5xx")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Allowed requests per second")
+    parser.add_argument("--seed", type=int, default=None)
+    asyncio.run(_serve(parser.parse_args()))
@@ -0,0 +1,73 @@
+import hmac
+import json
+from typing import Awaitable, Callable
+from urllib.parse import parse_qs
+
+from aiohttp import web
+
+def extract_tournament_id(payload: dict) -> str | None:
+    """Find the tournament id in a Challonge webhook payload (v1 or v2 style)."""
+    data = payload.get("data")
+    if isinstance(data, dict):
+        if data.get("type") == "tournament" and data.get("id"):
+            return str(data["id"])
+        tournament = (data.get("relationships") or {}).get("tournament", {}).get("data") or {}
+        if tournament.get("id"):
+            return str(tournament["id"])
+        attributes = data.get("attributes") or {}
+        if attributes.get("tournament_id"):
+            return str(attributes["tournament_id"])
+
+    for key in ("match", "tournament", "participant"):
+        entry = payload.get(key)
+        if isinstance(entry, dict):
+            tournament_id = entry.get("tournament_id") or (entry.get("id") if key == "tournament" else None)
+            if tournament_id:
+                return str(tournament_id)
+
+    if payload.get("tournament_id"):
+        return str(payload["tournament_id"])
+    return None
+
+class ChallongeWebhookServer:
+    """
+    Receives Challonge webhooks and calls `on_tournament_changed` with the
+    Challonge tournament id. When a secret is configured it has to be part
+    of the webhook URL: ``/challonge/webhook/<secret>``.
+    """
+
+    def __init__(self, host: str, port: int, on_tournament_changed: Callable[[str], Awaitable[None]], secret: str | None = None):
+        self.host = host
+        self.port = port
+        self.on_tournament_changed = on_tournament_changed
+        self.secret = secret
+        self._runner: web.AppRunner | None = None
+
+    async def _handle_webhook(self, request: web.Request) -> web.Response:
+        if self.secret and not hmac.compare_digest(request.match_info.get("secret", ""), self.secret):
+            return web.Response(status=404)
+
+        raw = await request.text()
+        try:
+            payload = json.loads(raw) if raw else {}
+        except json.JSONDecodeError:
+            payload = {key: values[0] for key, values in parse_qs(raw).items()}
+
+        tournament_id = extract_tournament_id(payload) if isinstance(payload, dict) else None
+        if tournament_id is None:
+            return web.Response(status=202, text="ignored")
+
+        await self.on_tournament_changed(tournament_id)
+        return web.Response(status=200, text="ok")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/challonge/webhook/{secret}" if self.secret else "/challonge/webhook", self._handle_webhook)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
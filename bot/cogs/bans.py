@@ -0,0 +1,89 @@
+import datetime
+import logging
+from logging.handlers import RotatingFileHandler
+import discord
+from discord.ext import commands
+from discord import app_commands
+
+from challonge.client import ChallongeClient
+from config import CONFIG
+from core.repositories.bans import BanRepository
+from core.repositories.members import MemberRepository
+from core.repositories.teams import TeamRepository
+from core.repositories.tournaments import TournamentRepository
+from core.services.bans import AlreadyBanned, BanResult, BanService
+from core.services.dm_notification import DmNotificationService
+from db import models
+from db.session import SessionLocal
+from mojang import fetch_minecraft_uuid
+from resilience import UpstreamError
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('cogs.bans.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+class BanCog(commands.Cog):
+    def __init__(self, bot: commands.Bot, session_factory):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.challonge_client = ChallongeClient(CONFIG.challonge.api_key, base_url=CONFIG.challonge.base_url)
+
+    async def _ban(self, interaction: discord.Interaction, ban_type: models.BanType, key: str, label: str, reason: str, days: int | None):
+        expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=days) if days else None
+
+        async with self.session_factory() as session:
+            service = BanService(
+                BanRepository(session),
+                TeamRepository(session),
+                MemberRepository(session),
+                TournamentRepository(session),
+                DmNotificationService(self.bot),
+                self.challonge_client
+            )
+            try:
+                result = await service.ban(ban_type, key, reason, expires_at)
+            except AlreadyBanned:
+                await interaction.followup.send(f"{label} is already banned.", ephemeral=True)
+                return
+
+        logger.info(f"{label} banned by {interaction.user.name} ({interaction.user.id}) for '{reason}', expires {expires_at}")
+        await interaction.followup.send(self._format_result(label, expires_at, result), ephemeral=True)
+
+    def _format_result(self, label: str, expires_at: datetime.datetime | None, result: BanResult) -> str:
+        lines = [f"🔨 Banned {label} {'until ' + discord.utils.format_dt(expires_at) if expires_at else 'permanently'}."]
+        if result.rejected_teams:
+            lines.append(f"• Removed teams: {', '.join(team.team_name for team in result.rejected_teams)}")
+        if result.promoted_teams:
+            lines.append(f"• Substitutes accepted: {', '.join(team.team_name for team in result.promoted_teams)}")
+        if result.flagged_teams:
+            lines.append(f"• ⚠️ Teams in running tournaments (not removed): {', '.join(team.team_name for team in result.flagged_teams)}")
+        lines.append(f"-# Took {result.duration * 1000:.0f}ms")
+        return "\n".join(lines)
+
+    @app_commands.command(name="ban_user", description="Ban a discord user and remove their teams from upcoming tournaments (Admin only)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(days="Length of the ban in days. Permanent if omitted.")
+    async def ban_user(self, interaction: discord.Interaction, member: discord.User, reason: str, days: int | None = None):
+        await interaction.response.defer(thinking=True, ephemeral=True)
+        await self._ban(interaction, models.BanType.discord_user, str(member.id), member.mention, reason, days)
+
+    @app_commands.command(name="ban_minecraft", description="Ban a Minecraft account and remove its teams from upcoming tournaments (Admin only)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(days="Length of the ban in days. Permanent if omitted.")
+    async def ban_minecraft(self, interaction: discord.Interaction, ign: str, reason: str, days: int | None = None):
+        await interaction.response.defer(thinking=True, ephemeral=True)
+        try:
+            uuid = await fetch_minecraft_uuid(ign)
+        except UpstreamError:
+            await interaction.followup.send("❌ Mojang is not reachable right now, please try again later.", ephemeral=True)
+            return
+        if not uuid:
+            await interaction.followup.send(f"❌ The username `{ign}` does not exist.", ephemeral=True)
+            return
+        await self._ban(interaction, models.BanType.minecraft_account, uuid, f"`{ign}`", reason, days)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(BanCog(bot, SessionLocal))
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+from logging.handlers import RotatingFileHandler
+from itertools import groupby
+from typing import TYPE_CHECKING
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+
+from challonge.client import ChallongeClient
+from config import CONFIG
+from core.repositories.brackets import BracketRepository
+from core.repositories.games import GameRepository
+from core.repositories.members import MemberRepository
+from core.repositories.messages import MessageRepository
+from core.repositories.teams import TeamRepository
+from core.repositories.tournaments import TournamentRepository
+from core.services.brackets import AdaptivePollScheduler, BracketSyncResult, BracketSyncService
+from core.services.games import GameService
+from core.services.participants import ParticipantRegistrationService
+from core.services.rounds import RoundLaunchService
+from db import models
+from db.session import SessionLocal
+
+if TYPE_CHECKING:
+    from challonge.webhooks import ChallongeWebhookServer
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('cogs.brackets.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+class BracketCog(commands.Cog):
+    def __init__(self, bot: commands.Bot, session_factory):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.challonge_client = ChallongeClient(CONFIG.challonge.api_key, base_url=CONFIG.challonge.base_url)
+        self.scheduler = AdaptivePollScheduler()
+        self.webhook_server: "ChallongeWebhookServer | None" = None
+        self._sync_locks: dict[str, asyncio.Lock] = {}
+        self._webhook_tasks: set[asyncio.Task] = set()
+
+    async def cog_load(self):
+        self.sync_task.start()
+        self.reconcile_task.start()
+
+        if CONFIG.challonge.webhook_enabled:
+            # aiohttp.web is only imported when the receiver is enabled
+            from challonge.webhooks import ChallongeWebhookServer
+
+            self.webhook_server = ChallongeWebhookServer(
+                CONFIG.challonge.webhook_host or "0.0.0.0",
+                CONFIG.challonge.webhook_port or 9109,
+                self.on_challonge_webhook,
+                CONFIG.challonge.webhook_secret
+            )
+            await self.webhook_server.start()
+            logger.info(f"Challonge webhook receiver listening on port {self.webhook_server.port}")
+
+    async def cog_unload(self):
+        self.sync_task.cancel()
+        self.reconcile_task.cancel()
+        if self.webhook_server:
+            await self.webhook_server.stop()
+        for task in self._webhook_tasks:
+            task.cancel()
+
+    def _create_sync_service(self, session) -> BracketSyncService:
+        return BracketSyncService(TournamentRepository(session), TeamRepository(session), BracketRepository(session), self.challonge_client)
+
+    async def _sync(self, challonge_id: str, force: bool = False):
+        lock = self._sync_locks.setdefault(challonge_id, asyncio.Lock())
+        async with lock, self.session_factory() as session:
+            tournament = await TournamentRepository(session).get_tournament_by_challonge_id(challonge_id)
+            if tournament is None:
+                return
+            try:
+                result = await self._create_sync_service(session).sync_tournament(tournament, force=force)
+            except Exception as e:
+                logger.error(f"Bracket sync failed for tournament {tournament.id}: {e}")
+                result = BracketSyncResult(changed=False)
+            self.scheduler.record_poll(challonge_id, result)
+
+    async def on_challonge_webhook(self, challonge_id: str):
+        logger.debug(f"Challonge webhook for tournament {challonge_id}")
+        self.scheduler.record_webhook(challonge_id)
+        task = asyncio.create_task(self._sync(challonge_id, force=True))
+        self._webhook_tasks.add(task)
+        task.add_done_callback(self._webhook_tasks.discard)
+
+    @tasks.loop(seconds=10)
+    async def sync_task(self):
+        async with self.session_factory() as session:
+            tournaments = await TournamentRepository(session).get_tournaments_by_status(models.TournamentStatus.active)
+        challonge_ids = [str(tournament.challonge_tournament_id) for tournament in tournaments if tournament.challonge_tournament_id]
+
+        for challonge_id in self.scheduler.due(challonge_ids):
+            await self._sync(challonge_id)
+
+    @sync_task.before_loop
+    async def before_sync_task(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(minutes=15)
+    async def reconcile_task(self):
+        async with self.session_factory() as session:
+            tournaments = await TournamentRepository(session).get_tournaments_by_status(models.TournamentStatus.signups, models.TournamentStatus.active)
+            service = ParticipantRegistrationService(TeamRepository(session), MessageRepository(session), self.challonge_client)
+            for tournament in tournaments:
+                if not tournament.challonge_tournament_id:
+                    continue
+                try:
+                    await service.reconcile_tournament(tournament)
+                except Exception as e:
+                    logger.error(f"Participant reconciliation failed for tournament {tournament.id}: {e}")
+
+    @reconcile_task.before_loop
+    async def before_reconcile_task(self):
+        await self.bot.wait_until_ready()
+
+    async def tournament_autocomplete(self, interaction: discord.Interaction, current: str):
+        async with self.session_factory() as session:
+            tournament_repo = TournamentRepository(session)
+            tournaments = await tournament_repo.get_all_tournaments()
+            if tournaments is None:
+                return []
+
+        filtered_tournaments: list[models.Tournaments] = [tournament for tournament in tournaments if current.lower() in tournament.name.lower()]
+        limited_tournaments: list[models.Tournaments] = filtered_tournaments[:25]
+
+        return [
+            discord.app_commands.Choice(name=tournament.name, value=str(tournament.id))
+            for tournament in limited_tournaments
+        ]
+
+    @app_commands.command(name="bracket", description="Show the bracket of a tournament")
+    @app_commands.autocomplete(tournament=tournament_autocomplete)
+    async def bracket(self, interaction: discord.Interaction, tournament: str):
+        await interaction.response.defer(thinking=True, ephemeral=True)
+
+        async with self.session_factory() as session:
+            tournament_model = await TournamentRepository(session).get_tournament_by_id(tournament)
+            if tournament_model is None:
+                await interaction.followup.send("Tournament not found.", ephemeral=True)
+                return
+
+            matches = await BracketRepository(session).get_matches_for_tournament(tournament_model.id)
+            if not matches:
+                await interaction.followup.send("No bracket available for this tournament yet.", ephemeral=True)
+                return
+
+            team_names = {team.id: team.team_name for team in await TeamRepository(session).get_all_teams_for_tournament(tournament_model.id)}
+
+        embed = discord.Embed(title=f"Bracket: {tournament_model.name}", color=discord.Color.from_rgb(224, 122, 36))
+        for round_number, round_matches in groupby(matches, key=lambda match: match.round_number):
+            lines = []
+            for match in round_matches:
+                team1 = team_names.get(match.team1_id, "_TBD_")
+                team2 = team_names.get(match.team2_id, "_TBD_")
+                if match.match_status == models.MatchStatus.finished and match.winner_team_id:
+                    lines.append(f"`#{match.match_number}` {team1} vs {team2} → **{team_names.get(match.winner_team_id, '?')}**")
+                else:
+                    lines.append(f"`#{match.match_number}` {team1} vs {team2}")
+            name = f"Round {round_number}" if round_number > 0 else f"Losers Round {-round_number}"
+            embed.add_field(name=name, value="\n".join(lines)[:1024], inline=False)
+            if len(embed.fields) == 25:
+                break
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="reconcile_challonge", description="Repair the challonge participants of a tournament (Admin only)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.autocomplete(tournament=tournament_autocomplete)
+    async def reconcile_challonge(self, interaction: discord.Interaction, tournament: str):
+        await interaction.response.defer(thinking=True, ephemeral=True)
+
+        async with self.session_factory() as session:
+            tournament_model = await TournamentRepository(session).get_tournament_by_id(tournament)
+            if tournament_model is None or not tournament_model.challonge_tournament_id:
+                await interaction.followup.send("Tournament not found or not on challonge.", ephemeral=True)
+                return
+
+            service = ParticipantRegistrationService(TeamRepository(session), MessageRepository(session), self.challonge_client)
+            result = await service.reconcile_tournament(tournament_model)
+
+        orphans = ", ".join(result.orphans) if result.orphans else "none"
+        await interaction.followup.send(
+            f"✅ Reconciled `{tournament_model.name}` in {result.duration:.1f}s\n"
+            f"• Repaired ids: {result.repaired}\n"
+            f"• Cleared stale ids: {result.cleared}\n"
+            f"• Orphaned participants: {orphans} ({result.removed} removed)",
+            ephemeral=True
+        )
+
+    @app_commands.command(name="start_round", description="Create the game channels of every open match of a round (Admin only)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.autocomplete(tournament=tournament_autocomplete)
+    async def start_round(self, interaction: discord.Interaction, tournament: str, round_number: int):
+        await interaction.response.defer(thinking=True, ephemeral=True)
+
+        async with self.session_factory() as session:
+            tournament_model = await TournamentRepository(session).get_tournament_by_id(tournament)
+            if tournament_model is None:
+                await interaction.followup.send("Tournament not found.", ephemeral=True)
+                return
+
+            if tournament_model.challonge_tournament_id:
+                await self._sync(str(tournament_model.challonge_tournament_id), force=True)
+
+            team_repo = TeamRepository(session)
+            member_repo = MemberRepository(session)
+            game_repo = GameRepository(session)
+            service = RoundLaunchService(
+                BracketRepository(session),
+                team_repo,
+                member_repo,
+                game_repo,
+                GameService(self.bot, team_repo, TournamentRepository(session), member_repo, game_repo)
+            )
+
+            progress_message = await interaction.followup.send(f"⏳ Starting round {round_number} of `{tournament_model.name}`...", ephemeral=True, wait=True)
+            last_update = 0.0
+
+            async def on_progress(done, total, match, outcome):
+                nonlocal last_update
+                # A few progress updates are enough, editing on every game only adds requests
+                if done < total and time.monotonic() - last_update < 2:
+                    return
+                last_update = time.monotonic()
+                await progress_message.edit(content=f"⏳ Round {round_number} of `{tournament_model.name}`: {done}/{total} games set up")
+
+            try:
+                result = await service.launch_round(tournament_model, round_number, on_progress=on_progress)
+            except ValueError as e:
+                await progress_message.edit(content=f"❌ {e}")
+                return
+
+        lines = [f"✅ Round {round_number} of `{tournament_model.name}`: {len(result.created)} games created in {result.duration:.1f}s"]
+        if result.already_launched:
+            lines.append(f"• Already running: {', '.join(f'#{match.match_number}' for match in result.already_launched)}")
+        if result.skipped:
+            lines.append(f"• Skipped matches without both teams: {', '.join(f'#{match.match_number}' for match in result.skipped)}")
+        if result.failed:
+            lines.append(f"• ⚠️ Failed: {', '.join(f'#{match.match_number} ({error})' for match, error in result.failed)}"[:1500])
+        await progress_message.edit(content="\n".join(lines))
+
+async def setup(bot: commands.Bot):
+    if CONFIG.challonge.api_key is None:
+        logger.warning("BracketCog not loaded: challonge api_key is not set.")
+        raise commands.ExtensionFailed("BracketCog", "Challonge API Key is not set.")
+    await bot.add_cog(BracketCog(bot, SessionLocal))
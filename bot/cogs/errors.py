@@ -1,8 +1,10 @@
 import logging
 from logging.handlers import RotatingFileHandler
+import discord
 from discord.ext import commands
 
 from config import CONFIG
+import metrics
 from core.services.issue_reporter import report_unhandled_exception
 import traceback
 
@@ -24,6 +26,9 @@ class ErrorHandler(commands.Cog):
     @commands.Cog.listener()
     async def on_app_command_error(self, interaction, error):
         if interaction.command:
+            metrics.APP_COMMAND_LATENCY.labels(command=interaction.command.qualified_name, status="error").observe(
+                (discord.utils.utcnow() - interaction.created_at).total_seconds()
+            )
             logger.info(f"Slash command error in {interaction.command.name}: {error}")
             await report_unhandled_exception(interaction=interaction, error=error, source="slash_command")
         else:
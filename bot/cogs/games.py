@@ -0,0 +1,78 @@
+import logging
+from logging.handlers import RotatingFileHandler
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+
+from core.repositories.games import GameRepository
+from core.services.game_lifecycle import GameLifecycleService
+from db import models
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('cogs.games.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+class GameCog(commands.Cog):
+    def __init__(self, bot: commands.Bot, session_factory):
+        self.bot = bot
+        self.session_factory = session_factory
+
+    async def cog_load(self):
+        self.cleanup_task.start()
+
+    async def cog_unload(self):
+        self.cleanup_task.cancel()
+
+    @tasks.loop(minutes=1)
+    async def cleanup_task(self):
+        async with self.session_factory() as session:
+            try:
+                result = await GameLifecycleService(self.bot, GameRepository(session)).close_finished_games()
+            except Exception as e:
+                logger.error(f"Game cleanup failed: {e}")
+                return
+        if result.closed or result.failed or result.removed_categories:
+            logger.info(
+                f"Game cleanup: {len(result.closed)} closed, {len(result.failed)} failed, {result.waiting} waiting, "
+                f"{result.removed_categories} overflow categories removed in {result.duration:.1f}s"
+            )
+
+    @cleanup_task.before_loop
+    async def before_cleanup_task(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name="close_game", description="Archive and delete the channels of a game now (Admin only)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(game_id="The game id, e.g. THR-BC4D. Defaults to the game of this channel.")
+    async def close_game(self, interaction: discord.Interaction, game_id: str | None = None):
+        await interaction.response.defer(thinking=True, ephemeral=True)
+
+        async with self.session_factory() as session:
+            game_repo = GameRepository(session)
+            game = await game_repo.get_by_game_id(game_id.upper()) if game_id else await game_repo.get_by_channel_id(interaction.channel_id)
+            if game is None:
+                await interaction.followup.send("❌ Game not found.", ephemeral=True)
+                return
+            if game.status == models.GameStatus.finished:
+                await interaction.followup.send(f"Game `{game.game_id}` is already closed.", ephemeral=True)
+                return
+
+            # The channel this is answered in might get deleted, reply first
+            await interaction.followup.send(f"🗑️ Closing game `{game.game_id}`...", ephemeral=True)
+            result = await GameLifecycleService(self.bot, game_repo).close_games([game])
+
+        if result.failed:
+            logger.error(f"{interaction.user.name} ({interaction.user.id}) failed to close game {game.game_id}: {result.failed[0][1]}")
+            try:
+                await interaction.followup.send(f"❌ Closing game `{game.game_id}` failed: {result.failed[0][1]}", ephemeral=True)
+            except discord.HTTPException:
+                pass
+        else:
+            logger.info(f"Game {game.game_id} closed by {interaction.user.name} ({interaction.user.id})")
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(GameCog(bot, SessionLocal))
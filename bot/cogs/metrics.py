@@ -0,0 +1,67 @@
+import logging
+from logging.handlers import RotatingFileHandler
+import math
+from typing import TYPE_CHECKING
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+
+from config import CONFIG
+import metrics
+from metrics.watchdog import LoopWatchdog
+
+if TYPE_CHECKING:
+    from metrics.server import MetricsServer
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('cogs.metrics.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+class MetricsCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.server: "MetricsServer | None" = None
+        self.watchdog: LoopWatchdog | None = None
+
+    async def cog_load(self):
+        self.gateway_latency_task.start()
+
+        stall_threshold = CONFIG.metrics.stall_threshold if CONFIG.metrics and CONFIG.metrics.stall_threshold else 0.25
+        asyncio_debug = bool(CONFIG.metrics and CONFIG.metrics.asyncio_debug)
+        self.watchdog = LoopWatchdog(self.bot.loop, stall_threshold=stall_threshold, asyncio_debug=asyncio_debug)
+        self.watchdog.start()
+
+        if CONFIG.metrics is not None and CONFIG.metrics.enabled:
+            # aiohttp.web is only imported when the endpoint is enabled
+            from metrics.server import MetricsServer
+
+            self.server = MetricsServer(CONFIG.metrics.host, CONFIG.metrics.port)
+            await self.server.start()
+            logger.info(f"Metrics endpoint listening on http://{CONFIG.metrics.host}:{CONFIG.metrics.port}/metrics")
+
+    async def cog_unload(self):
+        self.gateway_latency_task.cancel()
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.server:
+            await self.server.stop()
+
+    @tasks.loop(seconds=10)
+    async def gateway_latency_task(self):
+        if not math.isnan(self.bot.latency):
+            metrics.GATEWAY_LATENCY.set(self.bot.latency)
+
+    @gateway_latency_task.before_loop
+    async def before_gateway_latency_task(self):
+        await self.bot.wait_until_ready()
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command: app_commands.Command | app_commands.ContextMenu):
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        metrics.APP_COMMAND_LATENCY.labels(command=command.qualified_name, status="ok").observe(elapsed)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MetricsCog(bot))
@@ -2,8 +2,8 @@ import time
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
+import asyncio
 import datetime
-import plotly.graph_objects as go
 import io
 
 class PingCog(commands.Cog):
@@ -39,6 +39,27 @@ class PingCog(commands.Cog):
         times = [t[0] for t in self.ping_history]
         pings = [t[1] for t in self.ping_history]
 
+        # plotly and kaleido are slow to import and render, keep both off the event loop and out of startup
+        img_bytes = await asyncio.to_thread(self._render_graph, times, pings)
+        img_file = discord.File(io.BytesIO(img_bytes), filename="pinggraph.png")
+
+        current_ping = round(self.bot.latency * 1000, 2)
+        #timestamp = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+        timestamp = f"<t:{int(time.time())}:F>"
+
+        embed = discord.Embed(
+            title="Bot Ping Over Time",
+            description=f"Current ping: **{current_ping} ms**\nLast updated: {timestamp}",
+            color=0x1DB954
+        )
+        embed.set_image(url="attachment://pinggraph.png")
+        embed.set_footer(text="Data updated every 10 seconds")
+
+        await interaction.followup.send(embed=embed, file=img_file)
+
+    def _render_graph(self, times: list[datetime.datetime], pings: list[float]) -> bytes:
+        import plotly.graph_objects as go
+
         fig = go.Figure()
 
         fig.add_trace(go.Scatter(
@@ -77,22 +98,7 @@ class PingCog(commands.Cog):
             zeroline=False,
         )
 
-        img_bytes = fig.to_image(format="png", engine="kaleido")
-        img_file = discord.File(io.BytesIO(img_bytes), filename="pinggraph.png")
-
-        current_ping = round(self.bot.latency * 1000, 2)
-        #timestamp = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-        timestamp = f"<t:{int(time.time())}:F>"
-
-        embed = discord.Embed(
-            title="Bot Ping Over Time",
-            description=f"Current ping: **{current_ping} ms**\nLast updated: {timestamp}",
-            color=0x1DB954
-        )
-        embed.set_image(url="attachment://pinggraph.png")
-        embed.set_footer(text="Data updated every 10 seconds")
-
-        await interaction.followup.send(embed=embed, file=img_file)
+        return fig.to_image(format="png", engine="kaleido")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(PingCog(bot))
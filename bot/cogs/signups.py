@@ -1,21 +1,23 @@
 import logging
 from logging.handlers import RotatingFileHandler
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 
 from core.services.dm_notification import DmNotificationService
 from challonge.client import ChallongeClient
 from core.repositories.members import MemberRepository
 from db import models
-from core.repositories.minecraft import MinecraftRepository
 from core.repositories.players import PlayerRepository
+from core.repositories.registrations import RegistrationRepository, registration_index
 from config import CONFIG
+import metrics
 from core.repositories.messages import MessageRepository
 from core.repositories.teams import TeamRepository
 from core.repositories.tournaments import TournamentRepository
-from core.services.signups import TEAM_NAME_MAX_LENGTH, DuplicateTeamMemberError, PlayerAlreadyInATeam, SignupClosed, SignupError, SignupService, TeamNameTaken, TeamNameTooLong, TournamentNotFound, UnregisteredPlayersError
-from core.services.teamreactions import TeamReactionService
+from core.services.signup_queue import SignupAdmissionQueue
+from core.services.signups import TEAM_NAME_MAX_LENGTH, DuplicateTeamMemberError, PlayerAlreadyInATeam, SignupClosed, SignupError, TeamNameTaken, TeamNameTooLong, TournamentNotFound, UnregisteredPlayersError
+from core.services.teamreactions import TeamReactionService, signup_embed
 from db.session import SessionLocal
 
 logger = logging.getLogger(__name__)
@@ -29,17 +31,47 @@ class SignupCog(commands.Cog):
     def __init__(self, bot, session_factory):
         self.bot: commands.Bot = bot
         self.session_factory = session_factory
+        self.challonge_client = ChallongeClient(CONFIG.challonge.api_key, base_url=CONFIG.challonge.base_url)
+        self.admission_queue = SignupAdmissionQueue(session_factory, self.challonge_client, self.send_signup_message_to_channel)
+
+    async def cog_load(self):
+        self.registration_warmup.start()
+
+    async def cog_unload(self):
+        self.registration_warmup.cancel()
+        await self.admission_queue.close()
+
+    @tasks.loop(minutes=1)
+    async def registration_warmup(self):
+        """Pre-load the registration index when a tournament enters signups, drop it when signups close."""
+        async with self.session_factory() as session:
+            tournaments = await TournamentRepository(session).get_tournaments_by_status(models.TournamentStatus.signups)
+            tournament_ids = {tournament.id for tournament in tournaments}
+            if tournament_ids == registration_index.tournament_ids and not registration_index.needs_refresh():
+                return
+            try:
+                await RegistrationRepository(session).warm(tournament_ids)
+            except Exception as e:
+                logger.error(f"Warming the registration index failed: {e}")
+                return
+        if tournament_ids:
+            logger.info(f"Registration index warmed for tournaments {sorted(tournament_ids)}")
+
+    @registration_warmup.before_loop
+    async def before_registration_warmup(self):
+        await self.bot.wait_until_ready()
+
+    def _team_reaction_service(self, session) -> TeamReactionService:
+        return TeamReactionService(
+            TeamRepository(session), MessageRepository(session), MemberRepository(session), TournamentRepository(session),
+            PlayerRepository(session), DmNotificationService(self.bot), self.challonge_client
+        )
 
     @commands.Cog.listener()
     async def on_ready(self):
         async with self.session_factory() as session:
-            team_repo = TeamRepository(session)
             message_repo = MessageRepository(session)
-            tournament_repo = TournamentRepository(session)
-            member_repo = MemberRepository(session)
-            player_repo = PlayerRepository(session)
-            challonge_client = ChallongeClient(CONFIG.challonge.api_key)
-            service = TeamReactionService(team_repo, message_repo, member_repo, tournament_repo, player_repo, DmNotificationService(self.bot), challonge_client)
+            service = self._team_reaction_service(session)
             
             signup_messages = await message_repo.get_all_signup_messages()
             for msg in signup_messages:
@@ -72,54 +104,46 @@ class SignupCog(commands.Cog):
     ) -> None:
         await interaction.response.defer(thinking=True, ephemeral=True)
         
+        # Validation and team creation happen in the admission queue, batched with the other signups of this tournament
+        try:
+            admission = await self.admission_queue.submit(str(interaction.channel_id), team_name, [p1, p2, p3, interaction.user])
+        except TournamentNotFound:
+            await interaction.followup.send("⚠️ No tournament is active in this channel. Please check the tournament channel.", ephemeral=True)
+            return
+        except SignupClosed:
+            await interaction.followup.send("🚫 Signup period is over. Please wait for the next tournament.", ephemeral=True)
+            return
+        except TeamNameTooLong as e:
+            await interaction.followup.send(f"⚠️ Team name must be {e.max_length} characters or less.", ephemeral=True)
+            return
+        except TeamNameTaken as e:
+            await interaction.followup.send(f"⚠️ Team name '{e.team.team_name}' is already taken. Please choose a different name.", ephemeral=True)    
+            return
+        except DuplicateTeamMemberError:
+            await interaction.followup.send("⚠️ A team cannot have duplicate members. Please ensure all members are unique.", ephemeral=True)
+            return
+        except UnregisteredPlayersError as e:
+            await interaction.followup.send(embed=self._create_unregistered_players_embed(e), ephemeral=True)
+            return
+        except PlayerAlreadyInATeam as e:
+            await interaction.followup.send(f"⚠️ Player <@{e.player}> is already in a team. Please remove them from their current team before signing up.", ephemeral=True)
+            return
+        except SignupError as e:
+            await interaction.followup.send(f"⚠️ Signup failed: {str(e)}", ephemeral=True)
+            return
+        except Exception as e:
+            await interaction.followup.send("⚠️ An unexpected error occurred. If this keeps happening please open a ticket!", ephemeral=True)
+            raise e
+        
+        await interaction.followup.send(f"✅ Team '{team_name}' successfully registered!", ephemeral=True)
+        
         async with self.session_factory() as session:
-            tournament_repo = TournamentRepository(session)
-            team_repo = TeamRepository(session)
-            player_repo = PlayerRepository(session)
-            minecraft_repo = MinecraftRepository(session)
-            message_repo = MessageRepository(session)
-            member_repo = MemberRepository(session)
-            
-            service = SignupService(tournament_repo, team_repo, player_repo, minecraft_repo, message_repo, member_repo)
+            await self._team_reaction_service(session).handle_signup_reaction_check(admission.message)
+        await self.dm_team_status_to_members(admission.team.id, admission.message)
             
-            try:
-                msg = await service.signup_team(    
-                    channel_id=str(interaction.channel_id),
-                    team_name=team_name,
-                    members=[p1, p2, p3, interaction.user],
-                    message_send=lambda team, members_discord_ids: self.send_singup_message(interaction.channel, team, members_discord_ids)
-                )
-                await TeamReactionService(team_repo, MessageRepository(session), MemberRepository(session), tournament_repo, player_repo).handle_signup_reaction_check(msg)
-                await self.dm_team_status_to_members((await message_repo.get_by_discord_message_id(msg.id)).team_id, msg)
-                
-                await interaction.followup.send(f"✅ Team '{team_name}' successfully registered!", ephemeral=True)
-            except TournamentNotFound:
-                await interaction.followup.send("⚠️ No tournament is active in this channel. Please check the tournament channel.", ephemeral=True)
-            except SignupClosed:
-                await interaction.followup.send("🚫 Signup period is over. Please wait for the next tournament.", ephemeral=True)
-            except TeamNameTooLong as e:
-                await interaction.followup.send(f"⚠️ Team name must be {e.max_length} characters or less.", ephemeral=True)
-            except TeamNameTaken as e:
-                await interaction.followup.send(f"⚠️ Team name '{e.team.team_name}' is already taken. Please choose a different name.", ephemeral=True)    
-            except DuplicateTeamMemberError:
-                await interaction.followup.send("⚠️ A team cannot have duplicate members. Please ensure all members are unique.", ephemeral=True)
-            except UnregisteredPlayersError as e:
-                await interaction.followup.send(embed=self._create_unregistered_players_embed(e), ephemeral=True)
-            except PlayerAlreadyInATeam as e:
-                await interaction.followup.send(f"⚠️ Player <@{e.player}> is already in a team. Please remove them from their current team before signing up.", ephemeral=True)
-            except SignupError as e:
-                await interaction.followup.send(f"⚠️ Signup failed: {str(e)}", ephemeral=True)
-            except Exception as e:
-                await interaction.followup.send("⚠️ An unexpected error occurred. If this keeps happening please open a ticket!", ephemeral=True)
-                raise e
-            
-    async def send_singup_message(self, channel: discord.TextChannel, team: models.Teams, members_discord_ids: list[int]) -> discord.Message:
-        print(f"Sending signup message to channel {channel.id}...")
-        msg = await channel.send(embed=discord.Embed(
-            title=team.team_name,
-            description="\n".join([f"{CONFIG.styles.pr_enter_emoji} `👤` <@{user_id}>" for user_id in members_discord_ids])
-        ).set_footer(text="React ✅ to approve or ⛔ to deny"))
-        return msg
+    async def send_signup_message_to_channel(self, channel_id: str, team: models.Teams, members_discord_ids: list[int]) -> discord.Message:
+        channel = self.bot.get_channel(int(channel_id)) or await self.bot.fetch_channel(int(channel_id))
+        return await channel.send(embed=signup_embed(team.team_name, models.TeamStatus.pending, members_discord_ids))
     
     def _create_unregistered_players_embed(self, error: UnregisteredPlayersError) -> discord.Embed:
         embed = discord.Embed(
@@ -145,24 +169,20 @@ class SignupCog(commands.Cog):
     
     async def on_raw_reaction_action(self, payload: discord.RawReactionActionEvent):
         if payload.user_id == self.bot.user.id:
+            metrics.REACTION_EVENTS.labels(result="filtered_self").inc()
             return
         
         async with self.session_factory() as session:
             tournament_repo = TournamentRepository(session)
             if not await tournament_repo.get_tournament_for_signup_channel_id(payload.channel_id):
+                metrics.REACTION_EVENTS.labels(result="filtered_channel").inc()
                 return
             
             channel = self.bot.get_channel(payload.channel_id) or await self.bot.fetch_channel(payload.channel_id)
             message = await channel.fetch_message(payload.message_id)
             
-            team_repo = TeamRepository(session)
-            message_repo = MessageRepository(session)
-            member_repo = MemberRepository(session)
-            player_repo = PlayerRepository(session)
-            
-            service = TeamReactionService(team_repo, message_repo, member_repo, tournament_repo, player_repo)
-            
-            await service.handle_signup_reaction_check(message)
+            await self._team_reaction_service(session).handle_signup_reaction_check(message)
+            metrics.REACTION_EVENTS.labels(result="processed").inc()
     
     async def dm_team_status_to_members(self, team_id: int, signup_message: discord.Message):
         async with self.session_factory() as session:
@@ -189,7 +209,9 @@ class SignupCog(commands.Cog):
                                 await user.send(f"Your team '{team.team_name}' has been successfully registered for the tournament! 🎉\n\n")
                             case models.TeamStatus.denied:
                                 await user.send(f"Your team '{team.team_name}' has been denied for the tournament. Please check the signup message for details.")
+                        metrics.DM_SENDS.labels(result="success").inc()
                     except Exception as e:
+                        metrics.DM_SENDS.labels(result="failure").inc()
                         logger.error(f"Could not send DM to {user.name} ({user.id}). They may have DMs disabled: {str(e)}")
         
         
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from logging.handlers import RotatingFileHandler
 import discord
@@ -47,23 +48,24 @@ class SignOffView(discord.ui.View):
             
             old_status = team.status
             
-            team.status = models.TeamStatus.rejected
-            await session.commit()
+            await team_repo.set_status(team.id, models.TeamStatus.rejected)
             
             dm_notifications_service = DmNotificationService(self.cog.bot)
             
-            challonge_client = ChallongeClient(CONFIG.challonge.api_key)
+            challonge_client = ChallongeClient(CONFIG.challonge.api_key, base_url=CONFIG.challonge.base_url)
             
+            member_repo = MemberRepository(session)
             if old_status == models.TeamStatus.accepted:
-                service = TeamSubstituteService(team_repo, TournamentRepository(session), PlayerRepository(session), dm_notifications_service, challonge_client)
-                service.update_teams_status_for_substitute(self.tournament_id)
+                service = TeamSubstituteService(team_repo, TournamentRepository(session), member_repo, dm_notifications_service, challonge_client)
+                await service.update_teams_status_for_substitute(self.tournament_id)
             
             tournament_repo = TournamentRepository(session)
             tournament = await tournament_repo.get_tournament_by_id(self.tournament_id)
-            challonge_client.check_out_participant(tournament.challonge_tournament_id, team.challonge_team_id)
+            if tournament.challonge_tournament_id and team.challonge_team_id:
+                await asyncio.to_thread(challonge_client.check_out_participant, tournament.challonge_tournament_id, team.challonge_team_id)
             
             await dm_notifications_service.notify(
-                await ModelTeamMembersGroup.create(team.members, self.player_repo),
+                await ModelTeamMembersGroup.create(await member_repo.get_members_for_team(team.id), PlayerRepository(session)),
                 dm_notifications_service.message_cancelled,
                 reason=f"A staff member has signed off the team '{team.team_name}' from the tournament `{self.tournament_id}`."
             )
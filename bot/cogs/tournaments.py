@@ -9,7 +9,10 @@ from db import models
 from challonge.client import ChallongeClient
 from config import CONFIG
 from db.session import SessionLocal
+from core.repositories.messages import MessageRepository
+from core.repositories.teams import TeamRepository
 from core.repositories.tournaments import TournamentRepository
+from core.services.participants import ParticipantBulkService
 from core.services.tournaments import TournamentService, TournamentCreationError, DuplicateSignupChannelError
 
 logger = logging.getLogger(__name__)
@@ -52,7 +55,7 @@ class TournamentCog(commands.Cog):
 
             async with self.session_factory() as session:
                 tournament_repo = TournamentRepository(session)
-                challonge_client = ChallongeClient(CONFIG.challonge.api_key)
+                challonge_client = ChallongeClient(CONFIG.challonge.api_key, base_url=CONFIG.challonge.base_url)
                 tournament_service = TournamentService(tournament_repo, challonge_client)
 
                 tournament = await tournament_service.create_tournament(
@@ -99,12 +102,27 @@ class TournamentCog(commands.Cog):
     @app_commands.default_permissions(administrator=True)
     @discord.app_commands.autocomplete(tournament=tournament_autocomplete)
     async def start_tournament(self, interaction: discord.Interaction, tournament: str):
-        interaction.response.defer(thinking=True, ephemeral=True)
+        await interaction.response.defer(thinking=True, ephemeral=True)
         tournament_id = tournament
         async with self.session_factory() as session:
             tournament_repo = TournamentRepository(session)
-            tournament_repo.set_status(tournament_id, models.TournamentStatus.active)
-        interaction.followup.send(content="✅ Tournament started successfully! (Signups now are closed!)", ephemeral=True)
+            await tournament_repo.set_status(tournament_id, models.TournamentStatus.active)
+            
+            tournament_model = await tournament_repo.get_tournament_by_id(tournament_id)
+            challonge_client = ChallongeClient(CONFIG.challonge.api_key, base_url=CONFIG.challonge.base_url)
+            service = ParticipantBulkService(TeamRepository(session), MessageRepository(session), challonge_client)
+            try:
+                result = await service.register_teams(tournament_model, guild_id=interaction.guild_id)
+            except Exception as e:
+                logger.exception("Bulk participant registration failed")
+                await interaction.followup.send(content=f"⚠️ Tournament started, but registering the teams on challonge failed: {str(e)}", ephemeral=True)
+                return
+        
+        await interaction.followup.send(
+            content=f"✅ Tournament started successfully! (Signups now are closed!)\n"
+                    f"• Teams added to challonge: {result.added} ({result.checked_in} checked in, {result.failed_check_ins} failed) in {result.duration:.1f}s",
+            ephemeral=True
+        )
 
 async def setup(bot: commands.Bot):
     if CONFIG.challonge.api_key is None:
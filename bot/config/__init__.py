@@ -10,6 +10,9 @@ class SignupConfig(BaseConfig):
 class GithubIssuesConfig(BaseConfig):
     github_repository: str = ConfigField(readonly=True)
     github_labels: list[str] = ConfigField(readonly=True)
+    dedup_ttl: int = ConfigField(readonly=True)
+    dedup_max_entries: int = ConfigField(readonly=True)
+    persist_signatures: bool = ConfigField(readonly=True)
     
     github_app_id: str = ConfigField(sensitive=True, env_var="GITHUB_APP_ID", readonly=True)
     github_installation_id: str = ConfigField(sensitive=True, env_var="GITHUB_INSTALLATION_ID", readonly=True)
@@ -26,6 +29,28 @@ class HypixelConfig(BaseConfig):
 class ChallongeConfig(BaseConfig):
     _placeholder: int = ConfigField(readonly=True) # The sub config (ChallongeConfig) will be None without this
     api_key: str = ConfigField(sensitive=True, env_var="CHALLONGE_API_KEY", readonly=True)
+    base_url: str = ConfigField(readonly=True)
+    webhook_enabled: bool = ConfigField(readonly=True)
+    webhook_host: str = ConfigField(readonly=True)
+    webhook_port: int = ConfigField(readonly=True)
+    webhook_secret: str = ConfigField(sensitive=True, env_var="CHALLONGE_WEBHOOK_SECRET", readonly=True)
+
+class MetricsConfig(BaseConfig):
+    enabled: bool = ConfigField(readonly=True)
+    host: str = ConfigField(readonly=True)
+    port: int = ConfigField(readonly=True)
+    stall_threshold: float = ConfigField(readonly=True)
+    asyncio_debug: bool = ConfigField(readonly=True)
+
+class TracingConfig(BaseConfig):
+    enabled: bool = ConfigField(readonly=True)
+    slow_threshold: float = ConfigField(readonly=True)
+    output_path: str = ConfigField(readonly=True)
+
+class GamesConfig(BaseConfig):
+    transcript_dir: str = ConfigField(readonly=True)
+    close_delay: int = ConfigField(readonly=True)
+    category_channel_limit: int = ConfigField(readonly=True)
 
 class StyleConfig(BaseConfig):
     pr_enter_emoji: str = ConfigField(readonly=True)
@@ -37,6 +62,9 @@ class HorizonBotConfig(BaseConfig):
     register: RegisterConfig = ConfigField()
     hypixel: HypixelConfig = ConfigField()
     challonge: ChallongeConfig = ConfigField()
+    metrics: MetricsConfig = ConfigField()
+    tracing: TracingConfig = ConfigField()
+    games: GamesConfig = ConfigField()
     styles: StyleConfig = ConfigField()
     version: str = ConfigField(readonly=True)
 
@@ -0,0 +1,195 @@
+import asyncio
+import datetime
+import heapq
+import time
+from typing import Callable, Iterable
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import models
+
+INDEX_REFRESH_INTERVAL = 600.0
+
+def _expiry_timestamp(expires_at: datetime.datetime | None) -> float | None:
+    """SQLite hands back naive datetimes, they are stored in UTC."""
+    if expires_at is None:
+        return None
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=datetime.timezone.utc)
+    return expires_at.timestamp()
+
+class BanIndex:
+    """
+    In-memory index of active bans: one set of banned keys per ban type and a
+    min-heap of expiry times, so expired bans drop out without a query.
+    The index is loaded lazily, updated on ban writes and fully reloaded every
+    `refresh_interval` seconds to pick up changes made outside the bot.
+    Bans added or lifted during a reload are replayed on the reloaded data.
+    """
+
+    def __init__(self, refresh_interval: float = INDEX_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._banned: dict[models.BanType, set[str]] = {ban_type: set() for ban_type in models.BanType}
+        self._expires: dict[tuple[models.BanType, str], float | None] = {}
+        self._expiry_heap: list[tuple[float, models.BanType, str]] = []
+        self._loaded_at: float | None = None
+        self._journal: list[Callable[[], None]] | None = None
+        self._lock = asyncio.Lock()
+
+    async def ensure_loaded(self, session: AsyncSession):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        async with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+                return
+            self._journal = []
+            try:
+                now = datetime.datetime.now(datetime.timezone.utc)
+                result = await session.execute(
+                    select(models.Bans.type, models.Bans.discord_user_id, models.Bans.minecraft_uuid, models.Bans.expires_at)
+                    .where(or_(models.Bans.expires_at.is_(None), models.Bans.expires_at > now))
+                )
+                self.clear()
+                for ban_type, discord_user_id, minecraft_uuid, expires_at in result.all():
+                    self._add(ban_type, discord_user_id if ban_type == models.BanType.discord_user else minecraft_uuid, expires_at)
+                self._loaded_at = time.monotonic()
+                for update in self._journal:
+                    update()
+            finally:
+                self._journal = None
+
+    def clear(self):
+        for keys in self._banned.values():
+            keys.clear()
+        self._expires.clear()
+        self._expiry_heap.clear()
+        self._loaded_at = None
+
+    def _apply(self, update: Callable[[], None]):
+        if self._journal is not None:
+            self._journal.append(update)
+        update()
+
+    def add(self, ban_type: models.BanType, key: str | None, expires_at: datetime.datetime | None = None):
+        self._apply(lambda: self._add(ban_type, key, expires_at))
+
+    def remove(self, ban_type: models.BanType, key: str):
+        self._apply(lambda: self._remove(ban_type, key))
+
+    def _add(self, ban_type: models.BanType, key: str | None, expires_at: datetime.datetime | None = None):
+        if key is None:
+            return
+        key = str(key)
+        expires = _expiry_timestamp(expires_at)
+        self._banned[ban_type].add(key)
+        self._expires[(ban_type, key)] = expires
+        if expires is not None:
+            heapq.heappush(self._expiry_heap, (expires, ban_type, key))
+
+    def _remove(self, ban_type: models.BanType, key: str):
+        key = str(key)
+        self._banned[ban_type].discard(key)
+        self._expires.pop((ban_type, key), None)
+
+    def _drop_expired(self):
+        now = time.time()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires, ban_type, key = heapq.heappop(self._expiry_heap)
+            # Stale heap entries (ban replaced or lifted since) are skipped
+            if self._expires.get((ban_type, key)) == expires:
+                self._remove(ban_type, key)
+
+    def is_banned(self, ban_type: models.BanType, key: str) -> bool:
+        self._drop_expired()
+        return str(key) in self._banned[ban_type]
+
+    def banned_among(self, ban_type: models.BanType, keys: Iterable[str]) -> set[str]:
+        self._drop_expired()
+        return {str(key) for key in keys} & self._banned[ban_type]
+
+ban_index = BanIndex()
+
+class BanRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def is_banned(self, ban_type: models.BanType, key: str) -> bool:
+        await ban_index.ensure_loaded(self.session)
+        return ban_index.is_banned(ban_type, key)
+
+    async def bulk_is_banned(self, discord_user_ids: Iterable[str] = (), minecraft_uuids: Iterable[str] = ()) -> set[str]:
+        """Return the given discord ids and minecraft uuids that are currently banned."""
+        await ban_index.ensure_loaded(self.session)
+        return (
+            ban_index.banned_among(models.BanType.discord_user, discord_user_ids)
+            | ban_index.banned_among(models.BanType.minecraft_account, minecraft_uuids)
+        )
+
+    async def get_active_ban(self, ban_type: models.BanType, key: str) -> models.Bans | None:
+        column = models.Bans.discord_user_id if ban_type == models.BanType.discord_user else models.Bans.minecraft_uuid
+        stmt = select(models.Bans).where(
+            models.Bans.type == ban_type,
+            column == str(key),
+            or_(
+                models.Bans.expires_at.is_(None),
+                models.Bans.expires_at > datetime.datetime.now(datetime.timezone.utc)
+            )
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().first()
+
+    async def ban(self, ban_type: models.BanType, key: str, reason: str, expires_at: datetime.datetime | None = None, commit: bool = True) -> bool:
+        """
+        Ban a discord user or minecraft account. Updates expired bans. Returns False if already banned.
+        With `commit=False` the ban is only flushed; the caller commits and adds it to `ban_index`.
+        """
+        column = models.Bans.discord_user_id if ban_type == models.BanType.discord_user else models.Bans.minecraft_uuid
+        result = await self.session.execute(select(models.Bans).where(models.Bans.type == ban_type, column == str(key)))
+        existing_ban = result.scalars().first()
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if existing_ban:
+            # If ban is still active, don't re-ban
+            existing_expires = _expiry_timestamp(existing_ban.expires_at)
+            if existing_expires is None or existing_expires > now.timestamp():
+                return False
+
+            existing_ban.reason = reason
+            existing_ban.expires_at = expires_at
+            existing_ban.banned_at = now
+        else:
+            self.session.add(models.Bans(
+                type=ban_type,
+                discord_user_id=str(key) if ban_type == models.BanType.discord_user else None,
+                minecraft_uuid=str(key) if ban_type == models.BanType.minecraft_account else None,
+                reason=reason,
+                expires_at=expires_at
+            ))
+        if not commit:
+            await self.session.flush()
+            return True
+        await self.session.commit()
+        ban_index.add(ban_type, key, expires_at)
+        return True
+
+    async def get_affected_teams(self, ban_type: models.BanType, key: str) -> list[tuple[models.Teams, models.Tournaments]]:
+        """
+        Every team (with its tournament) the banned discord user or minecraft account
+        plays in, limited to teams still in the running in unfinished tournaments.
+        """
+        stmt = (
+            select(models.Teams, models.Tournaments)
+            .join(models.TeamMembers, models.TeamMembers.team_id == models.Teams.id)
+            .join(models.Tournaments, models.Tournaments.id == models.Teams.tournament_id)
+            .where(
+                models.Teams.status.in_([models.TeamStatus.pending, models.TeamStatus.accepted, models.TeamStatus.substitute]),
+                models.Tournaments.status.in_([models.TournamentStatus.planned, models.TournamentStatus.signups, models.TournamentStatus.active])
+            )
+            .distinct()
+        )
+        if ban_type == models.BanType.discord_user:
+            stmt = stmt.join(models.Players, models.Players.id == models.TeamMembers.player_id).where(models.Players.discord_user_id == str(key))
+        else:
+            stmt = stmt.join(models.MinecraftAccounts, models.MinecraftAccounts.player_id == models.TeamMembers.player_id).where(models.MinecraftAccounts.minecraft_uuid == str(key))
+        result = await self.session.execute(stmt)
+        return [(team, tournament) for team, tournament in result.all()]
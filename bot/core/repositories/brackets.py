@@ -0,0 +1,57 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import models
+
+BRACKET_FIELDS = ("round_number", "match_number", "team1_id", "team2_id", "winner_team_id", "match_status")
+
+class BracketRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_matches_for_tournament(self, tournament_id: int) -> list[models.Brackets]:
+        stmt = (
+            select(models.Brackets)
+            .where(models.Brackets.tournament_id == tournament_id)
+            .order_by(models.Brackets.round_number, models.Brackets.match_number)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def get_matches_for_round(self, tournament_id: int, round_number: int, status: models.MatchStatus | None = None) -> list[models.Brackets]:
+        stmt = select(models.Brackets).where(
+            models.Brackets.tournament_id == tournament_id,
+            models.Brackets.round_number == round_number,
+        )
+        if status is not None:
+            stmt = stmt.where(models.Brackets.match_status == status)
+        result = await self.session.execute(stmt.order_by(models.Brackets.match_number))
+        return result.scalars().all()
+
+    async def upsert_matches(self, tournament_id: int, matches: list[dict]) -> int:
+        """
+        Insert or update bracket rows keyed by `challonge_match_id` in one transaction.
+        Only rows whose values actually differ are written. Returns the number of written rows.
+        """
+        stmt = select(models.Brackets).where(models.Brackets.tournament_id == tournament_id)
+        result = await self.session.execute(stmt)
+        existing = {row.challonge_match_id: row for row in result.scalars().all()}
+
+        changed = 0
+        for match in matches:
+            row = existing.get(match["challonge_match_id"])
+            if row is None:
+                self.session.add(models.Brackets(tournament_id=tournament_id, **match))
+                changed += 1
+                continue
+
+            dirty = False
+            for field in BRACKET_FIELDS:
+                if getattr(row, field) != match[field]:
+                    setattr(row, field, match[field])
+                    dirty = True
+            changed += dirty
+
+        if changed:
+            await self.session.commit()
+        return changed
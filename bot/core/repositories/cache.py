@@ -0,0 +1,130 @@
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, NamedTuple, TypeVar
+
+import metrics
+from db import models
+
+T = TypeVar("T")
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_ENTRIES = 10000
+
+class PlayerSnapshot(NamedTuple):
+    id: int
+    discord_user_id: str
+    username: str
+
+    @classmethod
+    def from_model(cls, player: models.Players) -> "PlayerSnapshot":
+        return cls(player.id, player.discord_user_id, player.username)
+
+class MinecraftAccountSnapshot(NamedTuple):
+    id: int
+    player_id: int
+    minecraft_uuid: str
+    minecraft_username: str
+    linked_at: datetime.datetime | None
+
+    @classmethod
+    def from_model(cls, account: models.MinecraftAccounts) -> "MinecraftAccountSnapshot":
+        return cls(account.id, account.player_id, account.minecraft_uuid, account.minecraft_username, account.linked_at)
+
+class SnapshotCache(Generic[T]):
+    """
+    Process wide TTL + LRU cache of immutable snapshots. Misses are not cached,
+    so a row created later is picked up on the next lookup.
+
+    Every invalidation bumps `version`. Readers take the version before querying
+    and pass it to `put`, so a row read before a concurrent write is not cached
+    after that write invalidated it.
+    """
+
+    def __init__(self, name: str, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def get(self, key: Hashable) -> T | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                metrics.CACHE_REQUESTS.labels(cache=self.name, result="hit").inc()
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+        metrics.CACHE_REQUESTS.labels(cache=self.name, result="miss").inc()
+        return None
+
+    def put(self, key: Hashable, value: T, version: int | None = None):
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+        metrics.CACHE_ENTRIES.labels(cache=self.name).set(size)
+
+    def invalidate(self, key: Hashable) -> T | None:
+        """Drop one entry. Returns the dropped value, if any."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            self.version += 1
+            size = len(self._entries)
+        metrics.CACHE_ENTRIES.labels(cache=self.name).set(size)
+        return entry[1] if entry is not None else None
+
+    def invalidate_where(self, predicate) -> int:
+        """Drop every entry whose value matches `predicate`. Returns the number of dropped entries."""
+        with self._lock:
+            keys = [key for key, (_, value) in self._entries.items() if predicate(value)]
+            for key in keys:
+                del self._entries[key]
+            self.version += 1
+            size = len(self._entries)
+        metrics.CACHE_ENTRIES.labels(cache=self.name).set(size)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.version += 1
+        metrics.CACHE_ENTRIES.labels(cache=self.name).set(0)
+
+players_by_discord_id: SnapshotCache[PlayerSnapshot] = SnapshotCache("players_by_discord_id")
+players_by_id: SnapshotCache[PlayerSnapshot] = SnapshotCache("players_by_id")
+minecraft_by_player_id: SnapshotCache[MinecraftAccountSnapshot] = SnapshotCache("minecraft_by_player_id")
+
+def cache_player(player: PlayerSnapshot, versions: tuple[int, int] | None = None):
+    """Store a player under both keys. `versions` are the cache versions taken before the query."""
+    by_discord_version, by_id_version = versions or (None, None)
+    players_by_discord_id.put(str(player.discord_user_id), player, by_discord_version)
+    players_by_id.put(player.id, player, by_id_version)
+
+def player_versions() -> tuple[int, int]:
+    return players_by_discord_id.version, players_by_id.version
+
+def invalidate_player(player_id: int | None = None, discord_user_id: str | None = None):
+    """Forget a player (and their Minecraft account) by either key."""
+    if discord_user_id is not None:
+        cached = players_by_discord_id.invalidate(str(discord_user_id))
+        if cached is not None:
+            player_id = cached.id
+        elif player_id is None:
+            players_by_id.invalidate_where(lambda player: str(player.discord_user_id) == str(discord_user_id))
+    if player_id is not None:
+        cached = players_by_id.invalidate(player_id)
+        minecraft_by_player_id.invalidate(player_id)
+        if cached is not None:
+            players_by_discord_id.invalidate(str(cached.discord_user_id))
+
+def invalidate_minecraft_uuid(minecraft_uuid: str):
+    minecraft_by_player_id.invalidate_where(lambda account: account.minecraft_uuid == minecraft_uuid)
@@ -0,0 +1,28 @@
+import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import models
+
+class ErrorSignatureRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_by_signature(self, signature: str) -> models.ErrorSignatures | None:
+        stmt = select(models.ErrorSignatures).where(models.ErrorSignatures.signature == signature)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def record_occurrences(self, signature: str, title: str, occurrences: int, reported: bool) -> models.ErrorSignatures:
+        """Add occurrences to a signature, creating it if needed. Marks it as reported now if `reported` is set."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        row = await self.get_by_signature(signature)
+        if row is None:
+            row = models.ErrorSignatures(signature=signature, title=title, occurrences=0, first_seen_at=now)
+            self.session.add(row)
+
+        row.occurrences += occurrences
+        if reported:
+            row.last_reported_at = now
+        await self.session.commit()
+        return row
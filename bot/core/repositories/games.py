@@ -0,0 +1,128 @@
+from typing import Callable
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from db import models
+
+class GameIdExhausted(Exception):
+    pass
+
+class GameRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_by_game_id(self, game_id: str) -> models.Games | None:
+        stmt = select(models.Games).where(models.Games.game_id == game_id).options(selectinload(models.Games.channels))
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_by_channel_id(self, discord_channel_id: int | str) -> models.Games | None:
+        """The game a text or voice channel belongs to, through the unique channel index."""
+        stmt = (
+            select(models.Games)
+            .join(models.GameChannels, models.GameChannels.game_id == models.Games.id)
+            .where(models.GameChannels.discord_channel_id == str(discord_channel_id))
+            .options(selectinload(models.Games.channels))
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_bracket_ids_with_games(self, bracket_ids: list[int]) -> set[int]:
+        if not bracket_ids:
+            return set()
+        result = await self.session.execute(select(models.Games.bracket_id).where(models.Games.bracket_id.in_(bracket_ids)))
+        return set(result.scalars().all())
+
+    async def reserve_games(self, tournament_id: int, bracket_ids: list[int | None], generate_game_id: Callable[[], str], attempts: int = 10) -> list[models.Games | None]:
+        """
+        Reserve a unique game id for each entry of `bracket_ids` (None for games outside the bracket).
+
+        Ids are inserted in one statement per attempt. The unique index on `game_id`
+        decides conflicts, so concurrent allocators never hand out the same id;
+        entries that collided get a fresh id in the next attempt.
+        Returns the reserved games in input order, None where the match already has a game.
+
+        :raises: GameIdExhausted if ids still collide after `attempts` rounds
+        """
+        reserved: list[models.Games | None] = [None] * len(bracket_ids)
+        pending = list(range(len(bracket_ids)))
+
+        for _ in range(attempts):
+            taken = await self.get_bracket_ids_with_games([bracket_ids[i] for i in pending if bracket_ids[i] is not None])
+            pending = [i for i in pending if bracket_ids[i] not in taken]
+            if not pending:
+                break
+
+            candidates: dict[str, int] = {}
+            for i in pending:
+                game_id = generate_game_id()
+                while game_id in candidates:
+                    game_id = generate_game_id()
+                candidates[game_id] = i
+
+            stmt = (
+                insert(models.Games)
+                .values([
+                    {"game_id": game_id, "tournament_id": tournament_id, "bracket_id": bracket_ids[i], "status": models.GameStatus.setup}
+                    for game_id, i in candidates.items()
+                ])
+                .on_conflict_do_nothing()
+                .returning(models.Games.id, models.Games.game_id)
+            )
+            inserted = (await self.session.execute(stmt)).all()
+            await self.session.commit()
+
+            ids = {row.game_id: row.id for row in inserted}
+            if ids:
+                result = await self.session.execute(select(models.Games).where(models.Games.id.in_(ids.values())))
+                for game in result.scalars().all():
+                    reserved[candidates[game.game_id]] = game
+            pending = [i for game_id, i in candidates.items() if game_id not in ids]
+        else:
+            if pending:
+                raise GameIdExhausted(f"No free game id found for {len(pending)} games after {attempts} attempts")
+        return reserved
+
+    async def add_channels(self, channels: list[tuple[int, int | str, models.GameChannelType, int | None]]):
+        """Store (game pk, discord channel id, type, team id) rows and mark their games active."""
+        if not channels:
+            return
+        self.session.add_all([
+            models.GameChannels(game_id=game_pk, discord_channel_id=str(channel_id), type=channel_type, team_id=team_id)
+            for game_pk, channel_id, channel_type, team_id in channels
+        ])
+        game_pks = {game_pk for game_pk, _, _, _ in channels}
+        result = await self.session.execute(select(models.Games).where(models.Games.id.in_(game_pks)))
+        for game in result.scalars().all():
+            game.status = models.GameStatus.active
+        await self.session.commit()
+
+    async def get_games_with_finished_matches(self) -> list[models.Games]:
+        """Active games whose bracket match is finished, with their channels."""
+        stmt = (
+            select(models.Games)
+            .join(models.Brackets, models.Brackets.id == models.Games.bracket_id)
+            .where(
+                models.Games.status == models.GameStatus.active,
+                models.Brackets.match_status == models.MatchStatus.finished
+            )
+            .options(selectinload(models.Games.channels))
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def set_status_for_games(self, game_pks: list[int], status: models.GameStatus):
+        if not game_pks:
+            return
+        await self.session.execute(update(models.Games).where(models.Games.id.in_(game_pks)).values(status=status))
+        await self.session.commit()
+
+    async def release_games(self, game_pks: list[int]):
+        """Drop reservations of games whose setup failed, so the match can be launched again."""
+        if not game_pks:
+            return
+        await self.session.execute(delete(models.GameChannels).where(models.GameChannels.game_id.in_(game_pks)))
+        await self.session.execute(delete(models.Games).where(models.Games.id.in_(game_pks)))
+        await self.session.commit()
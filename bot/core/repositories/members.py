@@ -13,15 +13,43 @@ class MemberRepository:
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_discord_ids_for_teams(self, team_ids: list[int]) -> dict[int, list[int]]:
+        """Discord user ids of the members of each given team, keyed by team id, in one query."""
+        stmt = (
+            select(models.TeamMembers.team_id, models.Players.discord_user_id)
+            .join(models.Players, models.Players.id == models.TeamMembers.player_id)
+            .where(models.TeamMembers.team_id.in_(team_ids))
+        )
+        result = await self.session.execute(stmt)
+        discord_ids: dict[int, list[int]] = {team_id: [] for team_id in team_ids}
+        for team_id, discord_user_id in result.all():
+            discord_ids[team_id].append(int(discord_user_id))
+        return discord_ids
+
+    async def get_rosters_for_teams(self, team_ids: list[int]) -> dict[int, list[tuple[int, str | None]]]:
+        """
+        Discord user id and Minecraft username (None if unlinked) of the members
+        of each given team, keyed by team id, in one query.
+        """
+        stmt = (
+            select(models.TeamMembers.team_id, models.Players.discord_user_id, models.MinecraftAccounts.minecraft_username)
+            .join(models.Players, models.Players.id == models.TeamMembers.player_id)
+            .outerjoin(models.MinecraftAccounts, models.MinecraftAccounts.player_id == models.TeamMembers.player_id)
+            .where(models.TeamMembers.team_id.in_(team_ids))
+            .order_by(models.TeamMembers.id)
+        )
+        result = await self.session.execute(stmt)
+        rosters: dict[int, list[tuple[int, str | None]]] = {team_id: [] for team_id in team_ids}
+        for team_id, discord_user_id, minecraft_username in result.all():
+            rosters[team_id].append((int(discord_user_id), minecraft_username))
+        return rosters
+
     async def add_member_to_team(self, team_id: int, player_id: int, role: models.PlayerRole = models.PlayerRole.member) -> models.TeamMembers:
         """Add a player as a member to a team."""
         new_member = models.TeamMembers(
             team_id=team_id,
             player_id=player_id,
-            role=role,
-            accepted=False,
-            responded=False,
-            response=None
+            role=role
         )
         self.session.add(new_member)
         try:
@@ -50,4 +78,20 @@ class MemberRepository:
             .limit(1)
         )
         result = await self.session.execute(stmt)
-        return result.scalars().first() is not None
\ No newline at end of file
+        return result.scalars().first() is not None
+
+    async def get_non_rejected_teams_of_players(self, player_ids: list[int], tournament_id: int) -> dict[int, int]:
+        """Team id of each given player that is part of a team in the tournament whose status is NOT rejected, in one query."""
+        if not player_ids:
+            return {}
+        stmt = (
+            select(models.TeamMembers.player_id, models.TeamMembers.team_id)
+            .join(models.Teams, models.TeamMembers.team_id == models.Teams.id)
+            .where(
+                models.TeamMembers.player_id.in_(player_ids),
+                models.Teams.tournament_id == tournament_id,
+                models.Teams.status != models.TeamStatus.rejected
+            )
+        )
+        result = await self.session.execute(stmt)
+        return dict(result.all())
@@ -1,5 +1,5 @@
 from typing import Optional
-from sqlalchemy import select
+from sqlalchemy import select, update
 from db import models
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
@@ -34,6 +34,30 @@ class MessageRepository:
             await self.session.rollback()
             return None
     
+    async def create_messages(self, messages: list[tuple[str, str, int]], purpose: str = "signup confirmation message") -> list[models.Messages]:
+        """Create (discord message id, discord channel id, team id) entries in one transaction."""
+        new_messages = [
+            models.Messages(discord_message_id=discord_message_id, discord_channel_id=discord_channel_id, team_id=team_id, purpose=purpose)
+            for discord_message_id, discord_channel_id, team_id in messages
+        ]
+        if new_messages:
+            self.session.add_all(new_messages)
+            await self.session.commit()
+        return new_messages
+
+    async def get_signup_messages_for_teams(self, team_ids: list[int]) -> dict[int, models.Messages]:
+        """Retrieve the signup message of each given team, keyed by team id."""
+        stmt = select(models.Messages).where(
+            models.Messages.team_id.in_(team_ids),
+            models.Messages.purpose == "signup propose message"
+        )
+        result = await self.session.execute(stmt)
+        return {message.team_id: message for message in result.scalars().all()}
+    
+    async def set_state_hash(self, message_id: int, state_hash: str):
+        await self.session.execute(update(models.Messages).where(models.Messages.id == message_id).values(state_hash=state_hash))
+        await self.session.commit()
+    
     async def get_by_discord_message_id(self, discord_message_id: str) -> Optional[models.Messages]:
         """Retrieve a message by its discord_message_id."""
         try:
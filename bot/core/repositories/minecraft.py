@@ -4,13 +4,51 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
 
+from core.repositories import cache
+from core.repositories.bans import BanRepository
+from core.repositories.cache import MinecraftAccountSnapshot
+from core.repositories.registrations import registration_index
 from db import models
 
 class MinecraftRepository:
     def __init__(self, session):
         self.session: AsyncSession = session
     
-    async def get_by_player_id(self, player_id: int) -> models.MinecraftAccounts | None:
+    async def get_by_player_id(self, player_id: int) -> MinecraftAccountSnapshot | None:
+        cached = cache.minecraft_by_player_id.get(int(player_id))
+        if cached is not None:
+            return cached
+
+        version = cache.minecraft_by_player_id.version
+        account = await self._get_account(player_id)
+        if account is None:
+            return None
+        snapshot = MinecraftAccountSnapshot.from_model(account)
+        cache.minecraft_by_player_id.put(snapshot.player_id, snapshot, version)
+        return snapshot
+
+    async def get_by_player_ids(self, player_ids: list[int]) -> dict[int, MinecraftAccountSnapshot]:
+        """Linked accounts of several players, keyed by player id. Cache misses are read in one query."""
+        accounts: dict[int, MinecraftAccountSnapshot] = {}
+        missing: list[int] = []
+        for player_id in map(int, player_ids):
+            cached = cache.minecraft_by_player_id.get(player_id)
+            if cached is not None:
+                accounts[player_id] = cached
+            else:
+                missing.append(player_id)
+        if not missing:
+            return accounts
+
+        version = cache.minecraft_by_player_id.version
+        result = await self.session.execute(select(models.MinecraftAccounts).where(models.MinecraftAccounts.player_id.in_(missing)))
+        for account in result.scalars().all():
+            snapshot = MinecraftAccountSnapshot.from_model(account)
+            cache.minecraft_by_player_id.put(snapshot.player_id, snapshot, version)
+            accounts[snapshot.player_id] = snapshot
+        return accounts
+
+    async def _get_account(self, player_id: int) -> models.MinecraftAccounts | None:
         result = await self.session.execute(
             select(models.MinecraftAccounts).where(models.MinecraftAccounts.player_id == player_id)
         )
@@ -23,18 +61,25 @@ class MinecraftRepository:
             minecraft_username=username
         )
         self.session.add(account)
-        await self.session.commit()
+        try:
+            await self.session.commit()
+        finally:
+            cache.minecraft_by_player_id.invalidate(int(player_id))
+        registration_index.set_minecraft_linked(int(player_id))
         await self.session.refresh(account)
         return account
 
     async def update_account(self, player_id: int, uuid: str, username: str) -> models.MinecraftAccounts:
-        account = await self.get_by_player_id(player_id)
+        account = await self._get_account(player_id)
         if not account:
             raise ValueError("Minecraft account not found")
 
         account.minecraft_uuid = uuid
         account.minecraft_username = username
-        await self.session.commit()
+        try:
+            await self.session.commit()
+        finally:
+            cache.minecraft_by_player_id.invalidate(int(player_id))
         await self.session.refresh(account)
         return account
 
@@ -60,51 +105,15 @@ class MinecraftRepository:
     async def is_minecraft_account_banned(self, minecraft_uuid: str) -> bool:
         """Check if a Minecraft account is banned."""
         try:
-            stmt = select(models.Bans).where(
-                models.Bans.type == models.BanType.minecraft_account,
-                models.Bans.minecraft_uuid == minecraft_uuid,
-                (
-                    models.Bans.expires_at == None
-                    | (models.Bans.expires_at > datetime.datetime.now(datetime.timezone.utc))
-                )
-            )
-            result = await self.session.execute(stmt)
-            ban = result.scalars().first()
-            return ban is not None
+            return await BanRepository(self.session).is_banned(models.BanType.minecraft_account, minecraft_uuid)
         except SQLAlchemyError:
             return False
     
-    async def ban_minecraft_account(session, minecraft_uuid: str, reason: str, expires_at: datetime.datetime | None = None) -> bool:
+    async def ban_minecraft_account(self, minecraft_uuid: str, reason: str, expires_at: datetime.datetime | None = None) -> bool:
         """Ban a Minecraft account by UUID. Updates expired bans."""
+        cache.invalidate_minecraft_uuid(minecraft_uuid)
         try:
-            stmt = select(models.Bans).where(
-                models.Bans.type == models.BanType.minecraft_account,
-                models.Bans.minecraft_uuid == minecraft_uuid
-            )
-            result = await session.execute(stmt)
-            existing_ban = result.scalars().first()
-
-            now = datetime.datetime.now(datetime.timezone.utc)
-
-            if existing_ban:
-                if existing_ban.expires_at is None or existing_ban.expires_at > now:
-                    return False
-
-                existing_ban.reason = reason
-                existing_ban.expires_at = expires_at
-                existing_ban.banned_at = now
-                await session.commit()
-                return True
-
-            new_ban = models.Bans(
-                type=models.BanType.minecraft_account,
-                minecraft_uuid=minecraft_uuid,
-                reason=reason,
-                expires_at=expires_at
-            )
-            session.add(new_ban)
-            await session.commit()
-            return True
+            return await BanRepository(self.session).ban(models.BanType.minecraft_account, minecraft_uuid, reason, expires_at)
         except SQLAlchemyError:
-            await session.rollback()
+            await self.session.rollback()
             return False
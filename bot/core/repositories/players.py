@@ -3,29 +3,71 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
+from core.repositories import cache
+from core.repositories.bans import BanRepository
+from core.repositories.cache import PlayerSnapshot
+from core.repositories.registrations import registration_index
 from db import models
 
 class PlayerRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_by_discord_id(self, discord_user_id: str) -> models.Players | None:
+    async def get_by_discord_id(self, discord_user_id: str) -> PlayerSnapshot | None:
         """Retrieve a player by their Discord user ID."""
+        cached = cache.players_by_discord_id.get(str(discord_user_id))
+        if cached is not None:
+            return cached
+
+        versions = cache.player_versions()
         try:
-            stmt = select(models.Players).where(models.Players.discord_user_id == discord_user_id)
+            stmt = select(models.Players).where(models.Players.discord_user_id == str(discord_user_id))
             result = await self.session.execute(stmt)
-            return result.scalars().first()
+            player = result.scalars().first()
         except SQLAlchemyError:
             return None
+        return self._cache(player, versions)
     
-    async def get_by_id(self, id: str) -> models.Players | None:
+    async def get_by_id(self, id: str) -> PlayerSnapshot | None:
         """Retrieve a player by their ID."""
+        cached = cache.players_by_id.get(int(id))
+        if cached is not None:
+            return cached
+
+        versions = cache.player_versions()
         try:
             stmt = select(models.Players).where(models.Players.id == id)
             result = await self.session.execute(stmt)
-            return result.scalars().first()
+            player = result.scalars().first()
         except SQLAlchemyError:
             return None
+        return self._cache(player, versions)
+
+    async def get_by_discord_ids(self, discord_user_ids: list[str]) -> dict[str, PlayerSnapshot]:
+        """Retrieve several players by Discord user ID, keyed by ID. Cache misses are read in one query, unknown IDs are left out."""
+        players: dict[str, PlayerSnapshot] = {}
+        missing: list[str] = []
+        for discord_user_id in map(str, discord_user_ids):
+            cached = cache.players_by_discord_id.get(discord_user_id)
+            if cached is not None:
+                players[discord_user_id] = cached
+            else:
+                missing.append(discord_user_id)
+        if not missing:
+            return players
+
+        versions = cache.player_versions()
+        result = await self.session.execute(select(models.Players).where(models.Players.discord_user_id.in_(missing)))
+        for player in result.scalars().all():
+            players[str(player.discord_user_id)] = self._cache(player, versions)
+        return players
+
+    def _cache(self, player: models.Players | None, versions: tuple[int, int]) -> PlayerSnapshot | None:
+        if player is None:
+            return None
+        snapshot = PlayerSnapshot.from_model(player)
+        cache.cache_player(snapshot, versions)
+        return snapshot
     
     async def create_player(self, discord_user_id: str, username: str) -> models.Players | None:
         """Create a new player."""
@@ -34,62 +76,26 @@ class PlayerRepository:
             self.session.add(new_player)
             await self.session.commit()
             await self.session.refresh(new_player)
+            registration_index.add_player(new_player.id, discord_user_id)
             return new_player
         except SQLAlchemyError:
             await self.session.rollback()
             return None
+        finally:
+            cache.invalidate_player(discord_user_id=discord_user_id)
     
     async def is_player_banned(self, discord_user_id: str) -> bool:
         """Check if the player is banned by Discord user ID."""
         try:
-            stmt = select(models.Bans).where(
-                models.Bans.type == models.BanType.discord_user,
-                models.Bans.discord_user_id == discord_user_id,
-                (
-                    models.Bans.expires_at == None
-                    | (models.Bans.expires_at > datetime.datetime.now(datetime.timezone.utc))
-                )
-            )
-            result = await self.session.execute(stmt)
-            ban = result.scalars().first()
-            return ban is not None
+            return await BanRepository(self.session).is_banned(models.BanType.discord_user, discord_user_id)
         except SQLAlchemyError:
             return False
     
-    async def ban_discord_user(session, discord_user_id: str, reason: str, expires_at: datetime.datetime | None = None) -> bool:
+    async def ban_discord_user(self, discord_user_id: str, reason: str, expires_at: datetime.datetime | None = None) -> bool:
         """Ban a player by their Discord user ID. Updates expired bans."""
+        cache.invalidate_player(discord_user_id=discord_user_id)
         try:
-            stmt = select(models.Bans).where(
-                models.Bans.type == models.BanType.discord_user,
-                models.Bans.discord_user_id == discord_user_id
-            )
-            result = await session.execute(stmt)
-            existing_ban = result.scalars().first()
-    
-            now = datetime.datetime.now(datetime.timezone.utc)
-    
-            if existing_ban:
-                # If ban is still active, don't re-ban
-                if existing_ban.expires_at is None or existing_ban.expires_at > now:
-                    return False
-    
-                # Update expired ban
-                existing_ban.reason = reason
-                existing_ban.expires_at = expires_at
-                existing_ban.banned_at = now
-                await session.commit()
-                return True
-    
-            # No ban exists; create new one
-            new_ban = models.Bans(
-                type=models.BanType.discord_user,
-                discord_user_id=discord_user_id,
-                reason=reason,
-                expires_at=expires_at
-            )
-            session.add(new_ban)
-            await session.commit()
-            return True
+            return await BanRepository(self.session).ban(models.BanType.discord_user, discord_user_id, reason, expires_at)
         except SQLAlchemyError:
-            await session.rollback()
+            await self.session.rollback()
             return False
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from typing import Callable, Iterable, NamedTuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import models
+
+INDEX_REFRESH_INTERVAL = 600.0
+
+class Registration(NamedTuple):
+    player_id: int
+    has_minecraft: bool
+    team_id: int | None  # non rejected team in the looked up tournament
+
+class RegistrationIndex:
+    """
+    In-memory map of every registered player (Discord user id -> player id and
+    whether a Minecraft account is linked) plus, per tournament open for
+    signups, the non rejected team of each player and the taken team names.
+
+    Tournaments are warmed when they enter signups, after that the index is
+    updated on the writes that change it and fully reloaded every
+    `refresh_interval` seconds to pick up changes made outside the bot.
+    Updates that happen during a reload are replayed on the reloaded data.
+    """
+
+    def __init__(self, refresh_interval: float = INDEX_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._players: dict[str, tuple[int, bool]] = {}
+        self._player_discord_ids: dict[int, str] = {}
+        self._teams: dict[int, dict[int, int]] = {}  # tournament id -> player id -> team id
+        self._team_names: dict[int, set[str]] = {}
+        self._team_tournaments: dict[int, int] = {}
+        self._loaded_at: float | None = None
+        self._journal: list[Callable[[], None]] | None = None
+        self._lock = asyncio.Lock()
+
+    def is_warm(self, tournament_id: int) -> bool:
+        return tournament_id in self._teams
+
+    @property
+    def tournament_ids(self) -> set[int]:
+        return set(self._teams)
+
+    def needs_refresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at >= self.refresh_interval
+
+    async def warm(self, session: AsyncSession, tournament_ids: Iterable[int]):
+        """(Re)load the players and the teams of the given tournaments, replacing all other tournaments."""
+        tournament_ids = set(tournament_ids)
+        async with self._lock:
+            if not tournament_ids:
+                self.clear()
+                return
+            self._journal = []
+            try:
+                players = await session.execute(
+                    select(models.Players.id, models.Players.discord_user_id, models.MinecraftAccounts.id)
+                    .outerjoin(models.MinecraftAccounts, models.MinecraftAccounts.player_id == models.Players.id)
+                )
+                team_names = await session.execute(
+                    select(models.Teams.tournament_id, models.Teams.team_name).where(models.Teams.tournament_id.in_(tournament_ids))
+                )
+                memberships = await session.execute(
+                    select(models.Teams.tournament_id, models.TeamMembers.team_id, models.TeamMembers.player_id)
+                    .join(models.Teams, models.TeamMembers.team_id == models.Teams.id)
+                    .where(
+                        models.Teams.tournament_id.in_(tournament_ids),
+                        models.Teams.status != models.TeamStatus.rejected
+                    )
+                )
+                self.clear()
+                for player_id, discord_user_id, account_id in players.all():
+                    self._players[str(discord_user_id)] = (player_id, account_id is not None)
+                    self._player_discord_ids[player_id] = str(discord_user_id)
+                self._teams = {tournament_id: {} for tournament_id in tournament_ids}
+                self._team_names = {tournament_id: set() for tournament_id in tournament_ids}
+                for tournament_id, team_name in team_names.all():
+                    self._team_names[tournament_id].add(team_name)
+                for tournament_id, team_id, player_id in memberships.all():
+                    self._teams[tournament_id][player_id] = team_id
+                    self._team_tournaments[team_id] = tournament_id
+                self._loaded_at = time.monotonic()
+                for update in self._journal:
+                    update()
+            finally:
+                self._journal = None
+
+    def clear(self):
+        self._players.clear()
+        self._player_discord_ids.clear()
+        self._teams.clear()
+        self._team_names.clear()
+        self._team_tournaments.clear()
+        self._loaded_at = None
+
+    def lookup(self, tournament_id: int, discord_user_ids: Iterable[str]) -> dict[str, Registration]:
+        """Registrations of the given Discord users for a warm tournament. Unregistered users are left out."""
+        teams = self._teams[tournament_id]
+        registrations = {}
+        for discord_user_id in map(str, discord_user_ids):
+            player = self._players.get(discord_user_id)
+            if player is not None:
+                registrations[discord_user_id] = Registration(player[0], player[1], teams.get(player[0]))
+        return registrations
+
+    def taken_team_names(self, tournament_id: int, team_names: Iterable[str]) -> set[str]:
+        return set(team_names) & self._team_names[tournament_id]
+
+    def _apply(self, update: Callable[[], None]):
+        if self._journal is not None:
+            self._journal.append(update)
+        update()
+
+    def add_player(self, player_id: int, discord_user_id: str):
+        def update():
+            discord_user_id_ = str(discord_user_id)
+            self._players[discord_user_id_] = (player_id, self._players.get(discord_user_id_, (player_id, False))[1])
+            self._player_discord_ids[player_id] = discord_user_id_
+        self._apply(update)
+
+    def set_minecraft_linked(self, player_id: int, linked: bool = True):
+        def update():
+            discord_user_id = self._player_discord_ids.get(player_id)
+            if discord_user_id is not None:
+                self._players[discord_user_id] = (player_id, linked)
+        self._apply(update)
+
+    def add_team(self, tournament_id: int, team_id: int, team_name: str, player_ids: Iterable[int]):
+        player_ids = list(player_ids)
+        def update():
+            teams = self._teams.get(tournament_id)
+            if teams is None:
+                return
+            self._team_names[tournament_id].add(team_name)
+            for player_id in player_ids:
+                teams[player_id] = team_id
+            self._team_tournaments[team_id] = tournament_id
+        self._apply(update)
+
+    def remove_teams(self, team_ids: Iterable[int]):
+        """Forget the members of teams that were rejected, they are free to sign up again. The names stay taken."""
+        team_ids = set(team_ids)
+        def update():
+            for team_id in team_ids:
+                tournament_id = self._team_tournaments.pop(team_id, None)
+                teams = self._teams.get(tournament_id)
+                if teams is None:
+                    continue
+                for player_id in [player_id for player_id, member_team_id in teams.items() if member_team_id == team_id]:
+                    del teams[player_id]
+        self._apply(update)
+
+    def remove_team_names(self, tournament_id: int, team_names: Iterable[str]):
+        """Free the names of teams that were deleted."""
+        team_names = set(team_names)
+        def update():
+            names = self._team_names.get(tournament_id)
+            if names is not None:
+                names.difference_update(team_names)
+        self._apply(update)
+
+registration_index = RegistrationIndex()
+
+class RegistrationRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def warm(self, tournament_ids: Iterable[int]):
+        """Load the index for exactly these tournaments (the ones open for signups)."""
+        await registration_index.warm(self.session, tournament_ids)
+
+    def get_registrations(self, tournament_id: int, discord_user_ids: Iterable[str]) -> dict[str, Registration] | None:
+        """Registrations from the index, or None if the tournament is not warm."""
+        if not registration_index.is_warm(tournament_id):
+            return None
+        return registration_index.lookup(tournament_id, discord_user_ids)
+
+    def get_taken_team_names(self, tournament_id: int, team_names: Iterable[str]) -> set[str] | None:
+        """The given names that are taken in the tournament, or None if the tournament is not warm."""
+        if not registration_index.is_warm(tournament_id):
+            return None
+        return registration_index.taken_team_names(tournament_id, team_names)
@@ -1,7 +1,10 @@
 import datetime
 from aiosqlite import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import asc, func, select
+from sqlalchemy import asc, case, delete, func, literal, select, update
+from sqlalchemy.exc import IntegrityError as SQLAlchemyIntegrityError
+from sqlalchemy.orm import aliased
+from core.repositories.registrations import registration_index
 from db import models
 
 class TeamRepository:
@@ -13,13 +16,27 @@ class TeamRepository:
         stmt = select(models.Teams).where(models.Teams.id == team_id)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
+
+    async def get_teams_by_ids(self, team_ids: list[int]) -> dict[int, models.Teams]:
+        """Retrieve several teams in one query, keyed by team id. Missing ids are left out."""
+        stmt = select(models.Teams).where(models.Teams.id.in_(team_ids))
+        result = await self.session.execute(stmt)
+        return {team.id: team for team in result.scalars().all()}
     
-    async def get_team_for_team_name(self, team_name: str) -> models.Teams | None:
-        """Retrieve a team by its name."""
-        stmt = select(models.Teams).where(models.Teams.team_name == team_name)
+    async def get_team_for_team_name(self, team_name: str, tournament_id: int) -> models.Teams | None:
+        """Retrieve a team of a tournament by its name."""
+        stmt = select(models.Teams).where(models.Teams.tournament_id == tournament_id, models.Teams.team_name == team_name)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_teams_for_team_names(self, team_names: list[str], tournament_id: int) -> dict[str, models.Teams]:
+        """Retrieve the teams of a tournament with one of the given names, keyed by name."""
+        if not team_names:
+            return {}
+        stmt = select(models.Teams).where(models.Teams.tournament_id == tournament_id, models.Teams.team_name.in_(team_names))
+        result = await self.session.execute(stmt)
+        return {team.team_name: team for team in result.scalars().all()}
+
     async def set_status(self, team_id: int, status: str | models.TeamStatus):
         """Set the status of a team."""
         stmt = select(models.Teams).where(models.Teams.id == team_id)
@@ -29,7 +46,23 @@ class TeamRepository:
         if team:
             team.status = status
             await self.session.commit()
+            if status == models.TeamStatus.rejected:
+                registration_index.remove_teams([team_id])
     
+    async def set_status_for_teams(self, team_ids: list[int], status: models.TeamStatus, commit: bool = True):
+        """Set the status of many teams with one UPDATE. With `commit=False` the caller commits and updates `registration_index`."""
+        if team_ids:
+            await self.session.execute(
+                update(models.Teams)
+                .where(models.Teams.id.in_(team_ids))
+                .values(status=status)
+                .execution_options(synchronize_session="fetch")
+            )
+        if commit:
+            await self.session.commit()
+            if status == models.TeamStatus.rejected:
+                registration_index.remove_teams(team_ids)
+
     async def set_signup_complete_date(self, team_id: int, dt: datetime.datetime):
         """Set the signup completed date of a team."""
         stmt = select(models.Teams).where(models.Teams.id == team_id)
@@ -57,6 +90,47 @@ class TeamRepository:
             await self.session.rollback()
             raise ValueError(f"Team with name '{team_name}' already exists in tournament {tournament_id}.")
 
+    async def create_teams_with_members(self, tournament_id: int, teams: list[tuple[str, list[int]]], status: models.TeamStatus = models.TeamStatus.pending) -> list[models.Teams]:
+        """
+        Create several teams with their members (team name, player ids) under a
+        tournament in a single transaction. Either all teams are created or none.
+        Returns the teams in input order.
+        """
+        signup_time = datetime.datetime.now(datetime.timezone.utc)
+        new_teams = [
+            models.Teams(tournament_id=tournament_id, team_name=team_name, signup_time=signup_time, status=status)
+            for team_name, _ in teams
+        ]
+        self.session.add_all(new_teams)
+        try:
+            await self.session.flush()
+            self.session.add_all([
+                models.TeamMembers(team_id=team.id, player_id=player_id, role=models.PlayerRole.member)
+                for team, (_, player_ids) in zip(new_teams, teams)
+                for player_id in player_ids
+            ])
+            await self.session.commit()
+        except SQLAlchemyIntegrityError:
+            await self.session.rollback()
+            raise ValueError(f"One of the teams {', '.join(name for name, _ in teams)} already exists in tournament {tournament_id}.")
+        for team, (team_name, player_ids) in zip(new_teams, teams):
+            registration_index.add_team(tournament_id, team.id, team_name, player_ids)
+        return new_teams
+
+    async def delete_teams(self, teams: list[models.Teams]):
+        """Delete teams and their members in one transaction, freeing their names and players."""
+        if not teams:
+            return
+        team_ids = [team.id for team in teams]
+        await self.session.execute(delete(models.TeamMembers).where(models.TeamMembers.team_id.in_(team_ids)))
+        await self.session.execute(
+            delete(models.Teams).where(models.Teams.id.in_(team_ids)).execution_options(synchronize_session="fetch")
+        )
+        await self.session.commit()
+        registration_index.remove_teams(team_ids)
+        for team in teams:
+            registration_index.remove_team_names(team.tournament_id, [team.team_name])
+
     async def get_accepted_team_count(self, tournament_id: int) -> int:
         """Get the count of accepted teams in a tournament."""
         stmt = select(func.count()).select_from(models.Teams).where(
@@ -67,6 +141,46 @@ class TeamRepository:
         count = result.scalar_one()
         return count
 
+    async def complete_signup(self, team_id: int, tournament_id: int, max_accepted_teams: int, completed_at: datetime.datetime) -> models.TeamStatus | None:
+        """
+        Move a pending team to accepted, or to substitute when the tournament is full.
+
+        The free slot check and the status change happen in one UPDATE statement,
+        so concurrent approvals can never accept more than `max_accepted_teams`.
+        Returns the new status, or None if the team was not pending anymore.
+        """
+        accepted_teams = aliased(models.Teams)
+        accepted_count = (
+            select(func.count())
+            .select_from(accepted_teams)
+            .where(
+                accepted_teams.tournament_id == tournament_id,
+                accepted_teams.status == models.TeamStatus.accepted
+            )
+            .scalar_subquery()
+        )
+        status_type = models.Teams.status.type
+        stmt = (
+            update(models.Teams)
+            .where(
+                models.Teams.id == team_id,
+                models.Teams.status == models.TeamStatus.pending
+            )
+            .values(
+                status=case(
+                    (accepted_count < max_accepted_teams, literal(models.TeamStatus.accepted, status_type)),
+                    else_=literal(models.TeamStatus.substitute, status_type)
+                ),
+                signup_completed_time=completed_at
+            )
+            .returning(models.Teams.status)
+            .execution_options(synchronize_session="fetch")
+        )
+        result = await self.session.execute(stmt)
+        status = result.scalar_one_or_none()
+        await self.session.commit()
+        return status
+
     async def get_all_teams_for_tournament(self, tournament_id: int) -> list[models.Teams]:
         """Get the count of accepted teams in a tournament."""
         stmt = select(models.Teams).where(
@@ -89,6 +203,90 @@ class TeamRepository:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
     
+    async def promote_substitutes(self, tournament_id: int, max_accepted_teams: int) -> list[models.Teams]:
+        """
+        Accept the earliest substitute teams (by signup_completed_time) until the
+        tournament is full again, in a single UPDATE. Returns the promoted teams.
+        """
+        accepted_teams = aliased(models.Teams)
+        queued_teams = aliased(models.Teams)
+        free_slots = func.max(
+            0,
+            max_accepted_teams - (
+                select(func.count())
+                .select_from(accepted_teams)
+                .where(
+                    accepted_teams.tournament_id == tournament_id,
+                    accepted_teams.status == models.TeamStatus.accepted
+                )
+                .scalar_subquery()
+            )
+        )
+        next_in_queue = (
+            select(queued_teams.id)
+            .where(
+                queued_teams.tournament_id == tournament_id,
+                queued_teams.status == models.TeamStatus.substitute
+            )
+            .order_by(asc(queued_teams.signup_completed_time))
+            .limit(free_slots)
+        )
+        stmt = (
+            update(models.Teams)
+            .where(
+                models.Teams.id.in_(next_in_queue),
+                models.Teams.status == models.TeamStatus.substitute
+            )
+            .values(status=models.TeamStatus.accepted)
+            .returning(models.Teams.id)
+            .execution_options(synchronize_session="fetch")
+        )
+        result = await self.session.execute(stmt)
+        promoted_ids = result.scalars().all()
+        await self.session.commit()
+        if not promoted_ids:
+            return []
+
+        result = await self.session.execute(
+            select(models.Teams)
+            .where(models.Teams.id.in_(promoted_ids))
+            .order_by(asc(models.Teams.signup_completed_time))
+        )
+        return result.scalars().all()
+    
+    async def get_teams_without_challonge_id(self, tournament_id: int, statuses: list[models.TeamStatus]) -> list[models.Teams]:
+        """Get the teams of a tournament with one of the given statuses that are not registered on challonge yet."""
+        stmt = (
+            select(models.Teams)
+            .where(
+                models.Teams.tournament_id == tournament_id,
+                models.Teams.status.in_(statuses),
+                models.Teams.challonge_team_id.is_(None)
+            )
+            .order_by(asc(models.Teams.signup_completed_time))
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+    
+    async def get_challonge_team_id(self, team_id: int) -> str | None:
+        """Read the challonge participant id straight from the database, bypassing cached team objects."""
+        stmt = select(models.Teams.challonge_team_id).where(models.Teams.id == team_id)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+    
+    async def set_challonge_team_ids(self, challonge_team_ids: dict[int, str | None]):
+        """Set (or clear, with None) the challonge participant ids of many teams in a single transaction."""
+        if not challonge_team_ids:
+            return
+        await self.session.execute(
+            update(models.Teams),
+            [
+                {"id": team_id, "challonge_team_id": str(challonge_id) if challonge_id is not None else None}
+                for team_id, challonge_id in challonge_team_ids.items()
+            ]
+        )
+        await self.session.commit()
+    
     async def set_challonge_team_id(self, team_id: int, challonge_team_id: str):
         stmt = select(models.Teams).where(models.Teams.id == team_id)
         result = await self.session.execute(stmt)
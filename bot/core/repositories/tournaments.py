@@ -22,6 +22,16 @@ class TournamentRepository:
         tournaments = result.scalars().all()
         return tournaments if tournaments else None
 
+    async def get_tournament_by_challonge_id(self, challonge_tournament_id: str) -> models.Tournaments | None:
+        stmt = select(models.Tournaments).where(models.Tournaments.challonge_tournament_id == str(challonge_tournament_id))
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+    
+    async def get_tournaments_by_status(self, *statuses: models.TournamentStatus) -> list[models.Tournaments]:
+        stmt = select(models.Tournaments).where(models.Tournaments.status.in_(statuses))
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
     async def create_tournament(self, tournament_data: dict) -> models.Tournaments:
         tournament = models.Tournaments(**tournament_data)
         self.session.add(tournament)
@@ -0,0 +1,117 @@
+import asyncio
+import datetime
+import logging
+from logging.handlers import RotatingFileHandler
+import time
+from challonge.client import ChallongeClient
+from core.repositories import cache
+from core.repositories.bans import BanRepository, ban_index
+from core.repositories.members import MemberRepository
+from core.repositories.registrations import registration_index
+from core.repositories.teams import TeamRepository
+from core.repositories.tournaments import TournamentRepository
+from core.services.dm_notification import DiscordGroup, DmNotificationService
+from core.services.teamsubstitute import TeamSubstituteService
+import metrics
+from db import models
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('services.bans.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+# Tournaments in these states have not started, banned teams are removed from them.
+# Teams in running tournaments are only flagged for staff.
+REJECT_IN_TOURNAMENT_STATUSES = (models.TournamentStatus.planned, models.TournamentStatus.signups)
+
+# Keeps references to queued dispatch tasks so they are not garbage collected
+_dispatch_tasks: set[asyncio.Task] = set()
+
+class AlreadyBanned(Exception):
+    pass
+
+class BanResult:
+    def __init__(self, rejected_teams: list[models.Teams], flagged_teams: list[models.Teams], promoted_teams: list[models.Teams], duration: float):
+        self.rejected_teams = rejected_teams
+        self.flagged_teams = flagged_teams
+        self.promoted_teams = promoted_teams
+        self.duration = duration
+
+class BanService:
+    def __init__(self, ban_repo: BanRepository, team_repo: TeamRepository, member_repo: MemberRepository, tournament_repo: TournamentRepository, dm_notifications_service: DmNotificationService, challonge_client: ChallongeClient):
+        self.ban_repo: BanRepository = ban_repo
+        self.team_repo: TeamRepository = team_repo
+        self.member_repo: MemberRepository = member_repo
+        self.tournament_repo: TournamentRepository = tournament_repo
+        self.dm_notifications_service: DmNotificationService = dm_notifications_service
+        self.challonge_client: ChallongeClient = challonge_client
+
+    async def ban(self, ban_type: models.BanType, key: str, reason: str, expires_at: datetime.datetime | None = None) -> BanResult:
+        """
+        Ban a discord user or minecraft account and cascade the ban over their teams.
+
+        The ban and the rejection of all affected teams in tournaments that have not
+        started are written in one transaction. Teams in running tournaments are
+        returned as flagged. Challonge check-outs and DMs are queued afterwards.
+
+        :raises: AlreadyBanned if an active ban exists
+        """
+        start = time.perf_counter()
+        affected = await self.ban_repo.get_affected_teams(ban_type, key)
+        to_reject = [(team, tournament) for team, tournament in affected if tournament.status in REJECT_IN_TOURNAMENT_STATUSES]
+        flagged = [team for team, tournament in affected if tournament.status not in REJECT_IN_TOURNAMENT_STATUSES]
+        freed_tournaments = {tournament.id for team, tournament in to_reject if team.status == models.TeamStatus.accepted}
+
+        if not await self.ban_repo.ban(ban_type, key, reason, expires_at, commit=False):
+            await self.ban_repo.session.rollback()
+            raise AlreadyBanned(f"{key} is already banned")
+        await self.team_repo.set_status_for_teams([team.id for team, _ in to_reject], models.TeamStatus.rejected, commit=False)
+        await self.ban_repo.session.commit()
+
+        ban_index.add(ban_type, key, expires_at)
+        registration_index.remove_teams([team.id for team, _ in to_reject])
+        if ban_type == models.BanType.discord_user:
+            cache.invalidate_player(discord_user_id=key)
+        else:
+            cache.invalidate_minecraft_uuid(key)
+
+        discord_ids = await self.member_repo.get_discord_ids_for_teams([team.id for team, _ in to_reject])
+        task = asyncio.create_task(self._dispatch(to_reject, discord_ids, reason))
+        _dispatch_tasks.add(task)
+        task.add_done_callback(_dispatch_tasks.discard)
+
+        promoted = []
+        for tournament_id in freed_tournaments:
+            substitute_service = TeamSubstituteService(self.team_repo, self.tournament_repo, self.member_repo, self.dm_notifications_service, self.challonge_client)
+            promoted += await substitute_service.update_teams_status_for_substitute(tournament_id)
+
+        duration = time.perf_counter() - start
+        metrics.BAN_CASCADE_DURATION.observe(duration)
+        logger.info(
+            f"Banned {ban_type.value} {key}: {len(to_reject)} teams rejected, {len(flagged)} flagged, "
+            f"{len(promoted)} substitutes promoted, cascade took {duration:.3f}s"
+        )
+        return BanResult([team for team, _ in to_reject], flagged, promoted, duration)
+
+    async def _dispatch(self, rejected: list[tuple[models.Teams, models.Tournaments]], discord_ids: dict[int, list[int]], reason: str):
+        async def check_out(team: models.Teams, tournament: models.Tournaments):
+            if tournament.challonge_tournament_id and team.challonge_team_id:
+                await asyncio.to_thread(self.challonge_client.check_out_participant, tournament.challonge_tournament_id, team.challonge_team_id)
+
+        async def notify(team: models.Teams):
+            await self.dm_notifications_service.notify(
+                DiscordGroup(discord_ids.get(team.id, [])),
+                self.dm_notifications_service.message_cancelled,
+                reason=f"A member of your team '{team.team_name}' has been banned: {reason}"
+            )
+
+        results = await asyncio.gather(
+            *(check_out(team, tournament) for team, tournament in rejected),
+            *(notify(team) for team, _ in rejected),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Dispatching ban cascade notifications failed: {result}")
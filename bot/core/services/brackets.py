@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from logging.handlers import RotatingFileHandler
+from challonge.client import ChallongeClient
+from core.repositories.brackets import BracketRepository
+from core.repositories.teams import TeamRepository
+from core.repositories.tournaments import TournamentRepository
+from db import models
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('services.brackets.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+CHALLONGE_MATCH_STATES = {
+    "pending": models.MatchStatus.pending,
+    "open": models.MatchStatus.open,
+    "complete": models.MatchStatus.finished,
+}
+
+# ETag, content hash and open match count of the last matches response per challonge tournament, shared by all service instances
+_match_etags: dict[str, str] = {}
+_match_hashes: dict[str, str] = {}
+_open_matches: dict[str, int] = {}
+
+class BracketSyncResult:
+    def __init__(self, changed: bool, written: int = 0, open_matches: int = 0):
+        self.changed = changed
+        self.written = written
+        self.open_matches = open_matches
+
+class AdaptivePollScheduler:
+    """
+    Decides when each tournament has to be polled. Tournaments with open
+    matches or recent changes are polled every `min_interval` seconds, idle
+    ones back off exponentially up to `max_interval`. While webhooks arrive
+    for a tournament, polling only runs as a slow safety net.
+    """
+
+    def __init__(self, min_interval: float = 30, max_interval: float = 600, webhook_grace: float = 900):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.webhook_grace = webhook_grace
+        self._intervals: dict[str, float] = {}
+        self._next_poll: dict[str, float] = {}
+        self._last_webhook: dict[str, float] = {}
+
+    def due(self, challonge_ids: list[str]) -> list[str]:
+        now = time.monotonic()
+        for challonge_id in list(self._next_poll):
+            if challonge_id not in challonge_ids:
+                self.forget(challonge_id)
+        return [challonge_id for challonge_id in challonge_ids if self._next_poll.get(challonge_id, 0) <= now]
+
+    def record_poll(self, challonge_id: str, result: BracketSyncResult):
+        now = time.monotonic()
+        if result.changed or result.open_matches:
+            interval = self.min_interval
+        else:
+            interval = min(self._intervals.get(challonge_id, self.min_interval) * 2, self.max_interval)
+
+        if now - self._last_webhook.get(challonge_id, float("-inf")) < self.webhook_grace:
+            interval = self.max_interval
+
+        self._intervals[challonge_id] = interval
+        self._next_poll[challonge_id] = now + interval
+
+    def record_webhook(self, challonge_id: str):
+        self._last_webhook[challonge_id] = time.monotonic()
+
+    def forget(self, challonge_id: str):
+        self._intervals.pop(challonge_id, None)
+        self._next_poll.pop(challonge_id, None)
+        self._last_webhook.pop(challonge_id, None)
+
+def hash_matches(matches: list[dict]) -> str:
+    """Hash the fields of a matches response that end up in the Brackets table."""
+    relevant = sorted(
+        (
+            entry["match"]["id"],
+            entry["match"].get("round"),
+            entry["match"].get("suggested_play_order"),
+            entry["match"].get("player1_id"),
+            entry["match"].get("player2_id"),
+            entry["match"].get("winner_id"),
+            entry["match"].get("state"),
+        )
+        for entry in matches
+    )
+    return hashlib.sha1(json.dumps(relevant, default=str).encode()).hexdigest()
+
+class BracketSyncService:
+    def __init__(self, tournament_repo: TournamentRepository, team_repo: TeamRepository, bracket_repo: BracketRepository, challonge_client: ChallongeClient):
+        self.tournament_repo: TournamentRepository = tournament_repo
+        self.team_repo: TeamRepository = team_repo
+        self.bracket_repo: BracketRepository = bracket_repo
+        self.challonge_client: ChallongeClient = challonge_client
+
+    async def sync_active_tournaments(self) -> dict[int, BracketSyncResult]:
+        """Sync every active tournament. Returns the sync result per tournament id."""
+        tournaments = await self.tournament_repo.get_tournaments_by_status(models.TournamentStatus.active)
+        results = {}
+        for tournament in tournaments:
+            if not tournament.challonge_tournament_id:
+                continue
+            try:
+                results[tournament.id] = await self.sync_tournament(tournament)
+            except Exception as e:
+                logger.error(f"Bracket sync failed for tournament {tournament.id}: {e}")
+        return results
+
+    async def sync_tournament(self, tournament: models.Tournaments, force: bool = False) -> BracketSyncResult:
+        """
+        Pull the matches of one tournament and upsert them into the Brackets table.
+        Skips all work when Challonge reports the matches as unchanged or their
+        content hash did not change, unless `force` is set.
+        """
+        challonge_id = str(tournament.challonge_tournament_id)
+        matches, etag = await asyncio.to_thread(
+            self.challonge_client.get_matches_if_changed,
+            challonge_id,
+            None if force else _match_etags.get(challonge_id)
+        )
+        if matches is None:
+            logger.debug(f"Matches of tournament {tournament.id} unchanged (304), skipping sync")
+            return BracketSyncResult(changed=False, open_matches=_open_matches.get(challonge_id, 0))
+
+        open_matches = sum(1 for entry in matches if entry["match"].get("state") == "open")
+        _open_matches[challonge_id] = open_matches
+        content_hash = hash_matches(matches)
+        if not force and _match_hashes.get(challonge_id) == content_hash:
+            logger.debug(f"Matches of tournament {tournament.id} unchanged (hash), skipping sync")
+            if etag:
+                _match_etags[challonge_id] = etag
+            return BracketSyncResult(changed=False, open_matches=open_matches)
+
+        participants = await asyncio.to_thread(self.challonge_client.list_participants, challonge_id)
+        team_ids = await self._map_participants_to_teams(tournament.id, participants)
+
+        rows = [self._to_bracket_row(entry["match"], team_ids) for entry in matches]
+        written = await self.bracket_repo.upsert_matches(tournament.id, rows)
+
+        if etag:
+            _match_etags[challonge_id] = etag
+        _match_hashes[challonge_id] = content_hash
+        logger.info(f"Synced brackets of tournament {tournament.id}: {len(rows)} matches, {written} written")
+        return BracketSyncResult(changed=True, written=written, open_matches=open_matches)
+
+    async def _map_participants_to_teams(self, tournament_id: int, participants: list[dict]) -> dict[str, int]:
+        teams = await self.team_repo.get_all_teams_for_tournament(tournament_id)
+        teams_by_challonge_id = {str(team.challonge_team_id): team.id for team in teams if team.challonge_team_id}
+        teams_by_name = {team.team_name: team.id for team in teams}
+
+        team_ids = {}
+        for entry in participants:
+            participant = entry["participant"]
+            team_id = teams_by_challonge_id.get(str(participant["id"])) or teams_by_name.get(participant["name"])
+            if team_id is None:
+                logger.warning(f"Challonge participant {participant['id']} ({participant['name']}) has no local team")
+                continue
+            team_ids[str(participant["id"])] = team_id
+            for group_player_id in participant.get("group_player_ids") or []:
+                team_ids[str(group_player_id)] = team_id
+        return team_ids
+
+    def _to_bracket_row(self, match: dict, team_ids: dict[str, int]) -> dict:
+        def team_id(participant_id):
+            return team_ids.get(str(participant_id)) if participant_id is not None else None
+
+        return {
+            "challonge_match_id": str(match["id"]),
+            "round_number": match["round"],
+            "match_number": match.get("suggested_play_order") or match["id"],
+            "team1_id": team_id(match.get("player1_id")),
+            "team2_id": team_id(match.get("player2_id")),
+            "winner_team_id": team_id(match.get("winner_id")),
+            "match_status": CHALLONGE_MATCH_STATES.get(match.get("state"), models.MatchStatus.pending),
+        }
@@ -4,9 +4,11 @@ from typing import Awaitable, Callable
 import discord
 from discord.ext import commands
 
+import metrics
 from core.repositories.members import MemberRepository
 from core.repositories.players import PlayerRepository
 from db import models
+from restscheduler import Priority, priority
 
 class MessageTargetGroupe(ABC):
     @abstractmethod
@@ -59,8 +61,8 @@ class DmNotificationService:
             "🎉 Good news! A slot has opened up, and your team has been **moved from the substitute list to officially accepted** in the tournament!"
         )
     
-    async def message_rejected_by(self, channel: discord.DMChannel, rejected_by: list[discord.Member]):
-        names = ', '.join(member.display_name for member in rejected_by)
+    async def message_rejected_by(self, channel: discord.DMChannel, rejected_by: list[int]):
+        names = ', '.join(f"<@{user_id}>" for user_id in rejected_by)
         await channel.send(
             f"❌ Unfortunately, your team registration was **rejected** by the following member(s): {names}. "
             "Please feel free to contact us if you have questions or need clarification."
@@ -72,12 +74,26 @@ class DmNotificationService:
         )
     
     async def notify(self, target: MessageTargetGroupe, message_send_func: Callable[[discord.DMChannel], Awaitable[None]], **kwargs):
+        with priority(Priority.background):
+            await self._notify(target, message_send_func, **kwargs)
+
+    async def _notify(self, target: MessageTargetGroupe, message_send_func: Callable[[discord.DMChannel], Awaitable[None]], **kwargs):
         for discord_id in target.get_target_discord_ids():
             user = self.bot.get_user(discord_id) or await self.bot.fetch_user(discord_id)
             try:
                 dm_channel = user.dm_channel or await user.create_dm()
-                self.bot.loop.create_task(message_send_func(dm_channel, kwargs))
+                self.bot.loop.create_task(self._send_tracked(message_send_func(dm_channel, **kwargs)))
             except discord.Forbidden:
+                metrics.DM_SENDS.labels(result="failure").inc()
                 print(f"Could not send DM to {user.name} (ID: {discord_id}). They might have DMs disabled.")
             except Exception as e:
-                print(f"An error occurred while sending DM to {user.name} (ID: {discord_id}): {e}")
\ No newline at end of file
+                metrics.DM_SENDS.labels(result="failure").inc()
+                print(f"An error occurred while sending DM to {user.name} (ID: {discord_id}): {e}")
+    
+    async def _send_tracked(self, send: Awaitable[None]):
+        try:
+            await send
+        except Exception:
+            metrics.DM_SENDS.labels(result="failure").inc()
+            raise
+        metrics.DM_SENDS.labels(result="success").inc()
\ No newline at end of file
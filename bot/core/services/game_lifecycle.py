@@ -0,0 +1,161 @@
+import asyncio
+import datetime
+import gzip
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+import os
+import time
+import discord
+from discord.ext import commands
+
+from config import CONFIG
+from core.repositories.games import GameRepository
+from core.services.games import all_category_pools, find_category_pool
+import metrics
+from db import models
+from restscheduler import Priority, priority
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('services.game_lifecycle.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_TRANSCRIPT_DIR = "persistent/transcripts"
+DEFAULT_CLOSE_DELAY = 300
+MAX_CONCURRENT_CLOSES = 4
+
+# When a finished match was first seen per game pk, shared by all service instances.
+# Only in memory, after a restart the close delay starts over.
+_finished_seen: dict[int, float] = {}
+
+class GameCloseResult:
+    def __init__(self, closed: list[models.Games], failed: list[tuple[models.Games, Exception]], waiting: int, removed_categories: int, duration: float):
+        self.closed = closed
+        self.failed = failed
+        self.waiting = waiting
+        self.removed_categories = removed_categories
+        self.duration = duration
+
+def transcript_path(game: models.Games) -> str:
+    transcript_dir = (CONFIG.games.transcript_dir if CONFIG.games is not None else None) or DEFAULT_TRANSCRIPT_DIR
+    return os.path.join(transcript_dir, str(game.tournament_id), f"{game.game_id}.jsonl.gz")
+
+class GameLifecycleService:
+    def __init__(self, bot: commands.Bot, game_repo: GameRepository):
+        self.bot = bot
+        self.game_repo: GameRepository = game_repo
+
+    async def close_finished_games(self, close_delay: float | None = None) -> GameCloseResult:
+        """
+        Archive and delete the channels of every game whose match finished at least
+        `close_delay` seconds ago (config `games.close_delay` by default), so the
+        players still see the result for a while. Up to MAX_CONCURRENT_CLOSES games
+        are closed at once, their Discord requests are scheduled as bulk work.
+        Afterwards trailing empty overflow categories are removed.
+        """
+        start = time.perf_counter()
+        if close_delay is None:
+            close_delay = (CONFIG.games.close_delay if CONFIG.games is not None else None) or DEFAULT_CLOSE_DELAY
+
+        now = time.monotonic()
+        games = await self.game_repo.get_games_with_finished_matches()
+        for game_pk in set(_finished_seen) - {game.id for game in games}:
+            del _finished_seen[game_pk]
+        due = [game for game in games if now - _finished_seen.setdefault(game.id, now) >= close_delay]
+
+        result = await self.close_games(due)
+        result.waiting = len(games) - len(due)
+        with priority(Priority.bulk):
+            result.removed_categories = await self.remove_empty_overflow_categories()
+        result.duration = time.perf_counter() - start
+        return result
+
+    async def close_games(self, games: list[models.Games]) -> GameCloseResult:
+        """Archive the transcript of each game, delete its channels and mark it finished."""
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CLOSES)
+        closed: list[models.Games] = []
+        failed: list[tuple[models.Games, Exception]] = []
+
+        async def close(game: models.Games):
+            async with semaphore:
+                try:
+                    await self._close_game(game)
+                except Exception as e:
+                    logger.error(f"Closing game {game.game_id} failed: {e}")
+                    failed.append((game, e))
+                else:
+                    closed.append(game)
+
+        with priority(Priority.bulk):
+            await asyncio.gather(*(close(game) for game in games))
+        await self.game_repo.set_status_for_games([game.id for game in closed], models.GameStatus.finished)
+        metrics.GAMES_CLOSED.labels(result="closed").inc(len(closed))
+        metrics.GAMES_CLOSED.labels(result="failed").inc(len(failed))
+        for game in closed:
+            _finished_seen.pop(game.id, None)
+
+        if closed or failed:
+            logger.info(f"Closed {len(closed)} games, {len(failed)} failed in {time.perf_counter() - start:.1f}s")
+        return GameCloseResult(closed, failed, 0, 0, time.perf_counter() - start)
+
+    async def _close_game(self, game: models.Games):
+        channels = [(row, self.bot.get_channel(int(row.discord_channel_id))) for row in game.channels]
+        for row, channel in channels:
+            if row.type == models.GameChannelType.text and isinstance(channel, discord.TextChannel):
+                await self.archive_transcript(game, channel)
+
+        # Channels that are already gone (e.g. deleted by staff) count as deleted
+        await asyncio.gather(*(self._delete_channel(channel, game) for _, channel in channels if channel is not None))
+
+    async def _delete_channel(self, channel: discord.abc.GuildChannel, game: models.Games):
+        category_id = channel.category_id
+        try:
+            await channel.delete(reason=f"Game {game.game_id} finished")
+        except discord.NotFound:
+            pass
+        if category_id is not None and (pool := find_category_pool(category_id)) is not None:
+            pool.release(category_id)
+
+    async def archive_transcript(self, game: models.Games, channel: discord.TextChannel) -> str:
+        """Write every message of the channel as gzip compressed JSON lines. Returns the file path."""
+        lines = [json.dumps({
+            "game_id": game.game_id,
+            "tournament_id": game.tournament_id,
+            "bracket_id": game.bracket_id,
+            "channel_id": str(channel.id),
+            "channel_name": channel.name,
+            "archived_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        })]
+        async for message in channel.history(limit=None, oldest_first=True):
+            lines.append(json.dumps({
+                "id": str(message.id),
+                "author_id": str(message.author.id),
+                "author": message.author.name,
+                "created_at": message.created_at.isoformat(),
+                "content": message.content,
+                "embeds": [embed.to_dict() for embed in message.embeds],
+                "attachments": [attachment.url for attachment in message.attachments],
+            }, ensure_ascii=False))
+
+        path = transcript_path(game)
+        await asyncio.to_thread(self._write_transcript, path, lines)
+        metrics.GAME_TRANSCRIPT_MESSAGES.observe(len(lines) - 1)
+        logger.debug(f"Archived {len(lines) - 1} messages of game {game.game_id} to {path}")
+        return path
+
+    def _write_transcript(self, path: str, lines: list[str]):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, path)
+
+    async def remove_empty_overflow_categories(self) -> int:
+        removed = 0
+        for pool in all_category_pools():
+            removed += await pool.remove_empty_overflows()
+        return removed
@@ -1,16 +1,26 @@
 import asyncio
+import logging
+from logging.handlers import RotatingFileHandler
 import random
 import string
+import time
 import discord
 from discord.ext import commands
 
-from core.repositories.players import PlayerRepository
-from core.services.dm_notification import ModelTeamMembersGroup
 from config import CONFIG
+from core.repositories.games import GameRepository
 from core.repositories.members import MemberRepository
-from core.repositories.minecraft import MinecraftRepository
 from core.repositories.teams import TeamRepository
 from core.repositories.tournaments import TournamentRepository
+import metrics
+from db import models
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('services.games.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
 
 FACTIONS = [
     "THR",  # Throneshard
@@ -27,16 +37,129 @@ FACTIONS = [
 
 CONSONANTS = "BCDFGHJKLMNPQRSTVWXYZ"
 
+class CreatedGame:
+    def __init__(self, game_id: str, text_channel: discord.TextChannel, voice_channels: list[discord.VoiceChannel], setup_duration: float):
+        self.game_id = game_id
+        self.text_channel = text_channel
+        self.voice_channels = voice_channels
+        self.setup_duration = setup_duration
+
+CATEGORY_CHANNEL_LIMIT = 50
+
+class CategoryPool:
+    """
+    A game category plus its overflow categories ("<name> #2", "<name> #3", ...).
+    Discord caps a category at 50 channels, `reserve` hands out a category that
+    still has room for the requested channels and creates the next overflow
+    category when all are full. Counts are tracked here instead of read from the
+    gateway cache, which lags behind concurrent channel creations.
+    """
+
+    def __init__(self, base: discord.CategoryChannel, limit: int = CATEGORY_CHANNEL_LIMIT):
+        self.base = base
+        self.limit = limit
+        self._counts: dict[int, int] = {}
+        self._lock = asyncio.Lock()
+
+    def overflow_name(self, number: int) -> str:
+        return f"{self.base.name} #{number}"
+
+    def categories(self) -> list[discord.CategoryChannel]:
+        """The base category followed by its overflow categories in order."""
+        overflows = {category.name: category for category in self.base.guild.categories if category.name.startswith(f"{self.base.name} #")}
+        result = [self.base]
+        number = 2
+        while self.overflow_name(number) in overflows:
+            result.append(overflows[self.overflow_name(number)])
+            number += 1
+        return result
+
+    def _count(self, category: discord.CategoryChannel) -> int:
+        if category.id not in self._counts:
+            self._counts[category.id] = len(category.channels)
+        return self._counts[category.id]
+
+    async def reserve(self, count: int) -> discord.CategoryChannel:
+        async with self._lock:
+            categories = self.categories()
+            for category in categories:
+                if self._count(category) + count <= self.limit:
+                    self._counts[category.id] += count
+                    return category
+
+            category = await self.base.guild.create_category(
+                self.overflow_name(len(categories) + 1),
+                overwrites=self.base.overwrites,
+                position=categories[-1].position + 1,
+                reason="Game category is full"
+            )
+            logger.info(f"Created overflow category {category.name} ({category.id})")
+            self._counts[category.id] = count
+            return category
+
+    def release(self, category_id: int, count: int = 1):
+        """Give back room after channels were deleted or failed to be created."""
+        if category_id in self._counts:
+            self._counts[category_id] = max(0, self._counts[category_id] - count)
+
+    async def remove_empty_overflows(self) -> int:
+        """
+        Delete trailing overflow categories without channels or reservations. Only
+        trailing ones are removed so the numbering of the rest stays contiguous.
+        Returns the number of removed categories.
+        """
+        removed = 0
+        async with self._lock:
+            for category in reversed(self.categories()[1:]):
+                if category.channels or self._counts.get(category.id, 0):
+                    break
+                try:
+                    await category.delete(reason="Overflow game category is empty")
+                except discord.NotFound:
+                    pass
+                self._counts.pop(category.id, None)
+                removed += 1
+                logger.info(f"Removed empty overflow category {category.name} ({category.id})")
+        return removed
+
+# One pool per base category id, shared by all service instances
+_category_pools: dict[int, CategoryPool] = {}
+
+def get_category_pool(base: discord.CategoryChannel) -> CategoryPool:
+    pool = _category_pools.get(base.id)
+    if pool is None:
+        limit = (CONFIG.games.category_channel_limit if CONFIG.games is not None else None) or CATEGORY_CHANNEL_LIMIT
+        pool = _category_pools[base.id] = CategoryPool(base, limit)
+    return pool
+
+def all_category_pools() -> list[CategoryPool]:
+    return list(_category_pools.values())
+
+def find_category_pool(category_id: int) -> CategoryPool | None:
+    """The pool a (base or overflow) category belongs to."""
+    for pool in _category_pools.values():
+        if any(category.id == category_id for category in pool.categories()):
+            return pool
+    return None
+
 class GameService:
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, team_repo: TeamRepository, tournament_repo: TournamentRepository, member_repo: MemberRepository, game_repo: GameRepository):
         self.bot = bot
-        self.tournament_repo: TournamentRepository
-        self.team_repo: TeamRepository
-        self.member_repo: MemberRepository
-        self.minecraft_repo: MinecraftRepository
-        self.player_repo: PlayerRepository
+        self.team_repo: TeamRepository = team_repo
+        self.tournament_repo: TournamentRepository = tournament_repo
+        self.member_repo: MemberRepository = member_repo
+        self.game_repo: GameRepository = game_repo
     
-    async def create_game(self, team_ids: list[str]) -> None:
+    async def create_game(self, team_ids: list[int], started_at: float | None = None, bracket_id: int | None = None) -> CreatedGame:
+        """
+        Reserve a game id, create the text channel and one voice channel per team
+        and post the roster and party command embeds. The channels are stored with
+        the game, so it can be looked up by id or channel later.
+
+        `started_at` is the `time.perf_counter()` value of the command that triggered
+        the game, the setup latency until the first message is measured from there.
+        """
+        started_at = started_at if started_at is not None else time.perf_counter()
         if len(team_ids) < 2:
             raise ValueError("At least two team IDs are required to create a game.")
         elif any(team_id is None for team_id in team_ids):
@@ -44,50 +167,59 @@ class GameService:
         elif len(set(team_ids)) < len(team_ids):
             raise ValueError("Duplicate team IDs found.")
         
-        teams = [await self.team_repo.get_team_for_team_id(team_id) for team_id in team_ids]
+        teams_by_id = await self.team_repo.get_teams_by_ids(team_ids)
+        teams = [teams_by_id.get(team_id) for team_id in team_ids]
         
         if any(team is None for team in teams):
             raise ValueError("One or more teams not found.")
-        elif not all(team.tournament_id is teams[0].tournament_id for team in teams):
+        elif not all(team.tournament_id == teams[0].tournament_id for team in teams):
             raise ValueError("Teams are not in the same tournament.")
         
         tournament = await self.tournament_repo.get_tournament_by_id(teams[0].tournament_id)
+        rosters = await self.member_repo.get_rosters_for_teams(team_ids)
+        texts_category, voice_category = await self.get_categories(tournament)
         
-        texts_category = self.bot.get_channel(tournament.game_texts_category_id) or await self.bot.fetch_channel(tournament.game_texts_category_id)
-        if texts_category is None:
-            raise ValueError("Game texts category not found.")
-        elif not isinstance(texts_category, discord.CategoryChannel):
-            raise ValueError("Game texts category is not a category channel.")
-        
-        voice_category = self.bot.get_channel(tournament.game_vc_category_id) or await self.bot.fetch_channel(tournament.game_vc_category_id)
-        if voice_category is None:
-            raise ValueError("Game vc category not found.")
-        elif not isinstance(voice_category, discord.CategoryChannel):
-            raise ValueError("Game vc category is not a category channel.")
-        
-        game_id = self._generate_game_id()
-        
-        game_text_channel = await texts_category.create_text_channel(
-            f"game-{game_id}",
+        [game] = await self.game_repo.reserve_games(tournament.id, [bracket_id], self.generate_game_id)
+        if game is None:
+            raise ValueError("This match already has a game.")
+        try:
+            created = await self.setup_game(game.game_id, teams, rosters, texts_category, voice_category, started_at)
+        except Exception:
+            await self.game_repo.release_games([game.id])
+            raise
+        await self.game_repo.add_channels(self.channel_rows(game, teams, created))
+        return created
+    
+    def channel_rows(self, game: models.Games, teams: list[models.Teams], created: CreatedGame) -> list[tuple[int, int, models.GameChannelType, int | None]]:
+        """Rows for `GameRepository.add_channels` of a game set up by `setup_game`."""
+        return [(game.id, created.text_channel.id, models.GameChannelType.text, None)] + [
+            (game.id, channel.id, models.GameChannelType.voice, team.id) for team, channel in zip(teams, created.voice_channels)
+        ]
+    
+    async def get_categories(self, tournament: models.Tournaments) -> tuple[discord.CategoryChannel, discord.CategoryChannel]:
+        """Resolve the game text and voice categories of a tournament concurrently."""
+        return await asyncio.gather(
+            self._get_category(tournament.game_texts_category_id, "Game texts"),
+            self._get_category(tournament.game_vc_category_id, "Game vc")
         )
-        # This hole func can be imrpoved a lot! Especially the section below generating the embeds. Eg by just looping trough all teams once and adding fields to both embeds
-        embed = discord.Embed(
+    
+    async def setup_game(self, game_id: str, teams: list[models.Teams], rosters: dict[int, list[tuple[int, str | None]]], texts_category: discord.CategoryChannel, voice_category: discord.CategoryChannel, started_at: float | None = None) -> CreatedGame:
+        """
+        Discord side of `create_game` for callers that already reserved the game id
+        and loaded the teams, their rosters (see `MemberRepository.get_rosters_for_teams`)
+        and the categories. Does not touch the database.
+        """
+        started_at = started_at if started_at is not None else time.perf_counter()
+        game_text_channel, voice_channels = await self._create_channels(game_id, teams, texts_category, voice_category)
+        
+        roster_embed = discord.Embed(
             color=discord.Color.from_rgb(224, 122, 36),
             title=f"`🎮` Game `{game_id}`"
         ).set_footer(
             text="discord.gg/tourney",
             icon_url=self.bot.user.display_avatar.url
         )
-        for i, team in enumerate(teams, start=1):
-            group = await ModelTeamMembersGroup.create(await self.member_repo.get_members_for_team(team.id), self.player_repo)
-            embed.add_field(
-                name=f"`{self._number_to_emoji(i)}` **{team.team_name}**",
-                value="\n".join([f"{CONFIG.styles.pr_enter_emoji} `👤` <@{user_id}>" for user_id in group.get_target_discord_ids()]),
-                inline=True
-            )
-        await game_text_channel.send(embed=embed)
-        
-        embed = discord.Embed(
+        party_embed = discord.Embed(
             color=discord.Color.from_rgb(224, 122, 36),
             title="Party Commands",
         ).set_footer(
@@ -95,18 +227,55 @@ class GameService:
             icon_url=self.bot.user.display_avatar.url
         )
         for i, team in enumerate(teams, start=1):
-            async def get_minecraft_username(member):
-                mc_account = await self.minecraft_repo.get_by_player_id(member.player_id)
-                return mc_account.minecraft_username if mc_account else "_Unknown_"
-
-            minecraft_usernames = await asyncio.gather(*(get_minecraft_username(member) for member in await self.member_repo.get_members_for_team(team.id)))
-            embed.add_field(
+            roster = rosters.get(team.id, [])
+            roster_embed.add_field(
+                name=f"`{self._number_to_emoji(i)}` **{team.team_name}**",
+                value="\n".join([f"{CONFIG.styles.pr_enter_emoji} `👤` <@{discord_id}>" for discord_id, _ in roster]),
+                inline=True
+            )
+            party_embed.add_field(
                 name=f"Party Command {i}",
-                value=f"```/p {" ".join(minecraft_usernames)}```",
+                value=f"```/p {" ".join(username or "_Unknown_" for _, username in roster)}```",
                 inline=False
             )
-        await game_text_channel.send(embed=embed)
+        
+        await game_text_channel.send(embed=roster_embed)
+        setup_duration = time.perf_counter() - started_at
+        metrics.GAME_SETUP_DURATION.observe(setup_duration)
+        await game_text_channel.send(embed=party_embed)
+        
+        logger.info(f"Created game {game_id} for teams {[team.id for team in teams]} in {setup_duration:.3f}s")
+        return CreatedGame(game_id, game_text_channel, voice_channels, setup_duration)
+    
+    async def _get_category(self, channel_id: int, label: str) -> discord.CategoryChannel:
+        category = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
+        if category is None:
+            raise ValueError(f"{label} category not found.")
+        elif not isinstance(category, discord.CategoryChannel):
+            raise ValueError(f"{label} category is not a category channel.")
+        return category
     
+    async def _create_channels(self, game_id: str, teams: list[models.Teams], texts_category: discord.CategoryChannel, voice_category: discord.CategoryChannel) -> tuple[discord.TextChannel, list[discord.VoiceChannel]]:
+        """
+        Create the text channel and the team voice channels concurrently, in an overflow
+        category if the configured one is full. On failure the created ones are deleted again.
+        """
+        texts_pool, voice_pool = get_category_pool(texts_category), get_category_pool(voice_category)
+        text_target, voice_target = await asyncio.gather(texts_pool.reserve(1), voice_pool.reserve(len(teams)))
+
+        results = await asyncio.gather(
+            text_target.create_text_channel(f"game-{game_id}"),
+            *(voice_target.create_voice_channel(f"{game_id} • {team.team_name}") for team in teams),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            created = [result for result in results if not isinstance(result, BaseException)]
+            await asyncio.gather(*(channel.delete(reason=f"Creating game {game_id} failed") for channel in created), return_exceptions=True)
+            texts_pool.release(text_target.id)
+            voice_pool.release(voice_target.id, len(teams))
+            raise errors[0]
+        return results[0], list(results[1:])
     
     def _generate_rune(self):
         pattern = [
@@ -117,7 +286,7 @@ class GameService:
         ]
         return ''.join(pattern)
 
-    def _generate_game_id(self):
+    def generate_game_id(self):
         faction = random.choice(FACTIONS)
         rune = self._generate_rune()
         return f"{faction}-{rune}"
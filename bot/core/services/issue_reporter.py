@@ -1,58 +1,293 @@
-import requests
+import asyncio
+from collections import OrderedDict
+import re
+import aiohttp
 import datetime
 import traceback
 import hashlib
 from config import CONFIG
+import metrics
+import resilience
+from core.repositories.errors import ErrorSignatureRepository
+from db.session import SessionLocal
 
 import time
-import jwt
-from cryptography.hazmat.primitives import serialization
 
-def get_github_app_token(app_id: str, installation_id: str, private_key_path: str) -> str:
+TOKEN_REFRESH_MARGIN = 300
+AGGREGATION_WINDOW = 30.0
+MAX_PENDING_ISSUES = 50
+DEDUP_TTL = 24 * 60 * 60
+DEDUP_MAX_ENTRIES = 1024
+
+_NORMALIZE_PATTERNS = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "0x?"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}\b"), "<uuid>"),
+    (re.compile(r"\b\d{5,}\b"), "<id>"),
+]
+
+class GithubAppAuth:
+    """
+    Mints GitHub App installation tokens. The private key is parsed once and
+    kept in memory, the token is reused until shortly before it expires.
     """
-    Generate a GitHub App Installation Access Token.
 
-    :param app_id: GitHub App ID (as string or int)
-    :param installation_id: Installation ID for the app on a specific repo/org
-    :param private_key_path: Path to the .pem file downloaded from GitHub
-    :return: Installation access token (string)
-    :raises: RuntimeError if the token cannot be fetched
+    def __init__(self, app_id: str, installation_id: str, private_key_path: str):
+        self.app_id = app_id
+        self.installation_id = installation_id
+        self.private_key_path = private_key_path
+        self._private_key = None
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _load_private_key(self):
+        if self._private_key is None:
+            def read_key():
+                # Only needed once an error gets reported, not worth its import time at startup
+                from cryptography.hazmat.primitives import serialization
+
+                with open(self.private_key_path, "rb") as f:
+                    return serialization.load_pem_private_key(f.read(), password=None)
+            self._private_key = await asyncio.to_thread(read_key)
+        return self._private_key
+
+    def _encode_jwt(self, payload: dict, private_key) -> str:
+        import jwt
+
+        return jwt.encode(payload, private_key, algorithm="RS256")
+
+    async def get_token(self, session: aiohttp.ClientSession) -> str:
+        """
+        Return a valid installation access token, fetching a new one if needed.
+
+        :raises: RuntimeError if the token cannot be fetched
+        """
+        async with self._lock:
+            if self._token and time.time() < self._expires_at - TOKEN_REFRESH_MARGIN:
+                return self._token
+
+            now = int(time.time())
+            payload = {
+                "iat": now - 60,
+                "exp": now + 120,
+                "iss": self.app_id
+            }
+            jwt_token = await asyncio.to_thread(self._encode_jwt, payload, await self._load_private_key())
+
+            headers = {
+                "Authorization": f"Bearer {jwt_token}",
+                "Accept": "application/vnd.github+json"
+            }
+            url = f"https://api.github.com/app/installations/{self.installation_id}/access_tokens"
+            async def attempt(timeout: float) -> dict:
+                with metrics.track_external_request("github") as request:
+                    async with session.post(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                        request.status = response.status
+                        if response.status in resilience.RETRY_STATUSES:
+                            raise resilience.RetryableStatus(response.status, resilience.parse_retry_after(response.headers.get("Retry-After")), host="github")
+                        if response.status != 201:
+                            raise RuntimeError(f"Failed to get access token: {response.status} {await response.text()}")
+                        return await response.json()
+
+            data = await resilience.call_async("github", attempt, retry_on=(aiohttp.ClientConnectionError,))
+
+            self._token = data["token"]
+            expires_at = data.get("expires_at")
+            self._expires_at = (
+                datetime.datetime.fromisoformat(expires_at.replace("Z", "+00:00")).timestamp()
+                if expires_at else time.time() + 3600
+            )
+            return self._token
+
+class DedupEntry:
+    __slots__ = ("last_reported", "occurrences")
+
+    def __init__(self, last_reported: float):
+        self.last_reported = last_reported
+        self.occurrences = 1
+
+class ErrorDedupStore:
+    """
+    Remembers recently reported signatures for `ttl` seconds, holding at most
+    `max_entries` of them (least recently seen are evicted first).
     """
 
-    with open(private_key_path, "rb") as f:
-        private_key = serialization.load_pem_private_key(
-            f.read(),
-            password=None
-        )
+    def __init__(self, ttl: float = DEDUP_TTL, max_entries: int = DEDUP_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, DedupEntry] = OrderedDict()
+
+    def should_report(self, signature: str) -> bool:
+        """Count an occurrence and return whether it has to be reported again."""
+        now = time.monotonic()
+        entry = self._entries.get(signature)
+        if entry is not None and now - entry.last_reported < self.ttl:
+            entry.occurrences += 1
+            self._entries.move_to_end(signature)
+            return False
+
+        self._entries[signature] = DedupEntry(now)
+        self._entries.move_to_end(signature)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return True
+
+    def occurrences(self, signature: str) -> int:
+        entry = self._entries.get(signature)
+        return entry.occurrences if entry else 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class PendingIssue:
+    def __init__(self, title: str, body: str, first_seen: float):
+        self.title = title
+        self.body = body
+        self.first_seen = first_seen
+        self.occurrences = 1
 
-    now = int(time.time())
-    payload = {
-        "iat": now - 60,
-        "exp": now + 120,
-        "iss": app_id
-    }
+class IssueReporter:
+    """
+    Reports exceptions as GitHub issues from a background task.
+
+    Identical signatures seen within the aggregation window are merged into
+    one issue carrying the number of occurrences.
+    """
+
+    def __init__(self, auth: GithubAppAuth, repository: str, labels: list[str], window: float = AGGREGATION_WINDOW, dedup_store: ErrorDedupStore | None = None, session_factory=None):
+        self.auth = auth
+        self.repository = repository
+        self.labels = labels
+        self.window = window
+        self.dedup_store = dedup_store or ErrorDedupStore()
+        self.session_factory = session_factory
+        self._pending: dict[str, PendingIssue] = {}
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._session: aiohttp.ClientSession | None = None
+        self._worker: asyncio.Task | None = None
+
+    def submit(self, signature: str, title: str, body: str):
+        """Queue an issue without waiting for GitHub."""
+        pending = self._pending.get(signature)
+        if pending is not None:
+            pending.occurrences += 1
+            return
+        if not self.dedup_store.should_report(signature):
+            metrics.REPORTED_ERRORS.labels(result="suppressed").inc()
+            return
+        if len(self._pending) >= MAX_PENDING_ISSUES:
+            print(f"Dropping issue report {signature}, too many pending reports.")
+            return
+
+        self._pending[signature] = PendingIssue(title, body, asyncio.get_running_loop().time())
+        self._queue.put_nowait(signature)
 
-    jwt_token = jwt.encode(payload, private_key, algorithm="RS256")
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name="github-issue-reporter")
 
-    headers = {
-        "Authorization": f"Bearer {jwt_token}",
-        "Accept": "application/vnd.github+json"
-    }
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            signature = await self._queue.get()
+            pending = self._pending[signature]
+            await asyncio.sleep(max(0.0, pending.first_seen + self.window - loop.time()))
+            del self._pending[signature]
 
-    url = f"https://api.github.com/app/installations/{installation_id}/access_tokens"
-    response = requests.post(url, headers=headers)
+            try:
+                await self._flush(signature, pending)
+            except Exception as e:
+                print(f"Failed to submit issue to GitHub: {e}")
+
+    async def _flush(self, signature: str, pending: PendingIssue):
+        if self.session_factory is None:
+            await self._report(pending)
+            return
+
+        async with self.session_factory() as session:
+            repo = ErrorSignatureRepository(session)
+            existing = await repo.get_by_signature(signature)
+            if existing is not None and existing.last_reported_at is not None:
+                last_reported = existing.last_reported_at.replace(tzinfo=datetime.timezone.utc)
+                if (datetime.datetime.now(datetime.timezone.utc) - last_reported).total_seconds() < self.dedup_store.ttl:
+                    metrics.REPORTED_ERRORS.labels(result="suppressed").inc()
+                    await repo.record_occurrences(signature, pending.title, pending.occurrences, reported=False)
+                    return
+
+            reported = await self._report(pending, (existing.occurrences if existing else 0) + pending.occurrences)
+            await repo.record_occurrences(signature, pending.title, pending.occurrences, reported=reported)
+
+    async def _report(self, pending: PendingIssue, total_occurrences: int | None = None) -> bool:
+        body = pending.body
+        if pending.occurrences > 1:
+            body += f"\n**Occurrences**: {pending.occurrences} within {self.window:g}s\n"
+        if total_occurrences and total_occurrences > pending.occurrences:
+            body += f"\n**Total occurrences**: {total_occurrences}\n"
+
+        reported = await self.create_issue(pending.title, body)
+        metrics.REPORTED_ERRORS.labels(result="reported" if reported else "failed").inc()
+        if not reported:
+            print("Failed to submit issue to GitHub.")
+        return reported
 
-    if response.status_code != 201:
-        raise RuntimeError(f"Failed to get access token: {response.status_code} {response.text}")
+    async def create_issue(self, title: str, body: str) -> bool:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
 
-    return response.json()["token"]
+        url = f"https://api.github.com/repos/{self.repository}/issues"
+        headers = {
+            "Authorization": f"token {await self.auth.get_token(self._session)}",
+            "Accept": "application/vnd.github+json",
+        }
+        payload = {"title": title, "body": body, "labels": self.labels}
 
+        # Only rate limited attempts are retried, a 5xx may still have created the issue
+        async def attempt(timeout: float) -> bool:
+            with metrics.track_external_request("github") as request:
+                async with self._session.post(url, headers=headers, json=payload, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    request.status = response.status
+                    if response.status == 429:
+                        raise resilience.RetryableStatus(response.status, resilience.parse_retry_after(response.headers.get("Retry-After")), host="github")
+                    return response.ok
 
-_recent_errors = set()
+        try:
+            return await resilience.call_async("github", attempt, retry_on=(aiohttp.ClientConnectorError,))
+        except resilience.UpstreamError as e:
+            print(f"Giving up on GitHub issue: {e}")
+            return False
+
+
+_reporter: IssueReporter | None = None
+
+
+def get_reporter() -> IssueReporter:
+    global _reporter
+    if _reporter is None:
+        _reporter = IssueReporter(
+            GithubAppAuth(
+                CONFIG.issues.github_app_id,
+                CONFIG.issues.github_installation_id,
+                CONFIG.issues.github_private_key_path
+            ),
+            CONFIG.issues.github_repository,
+            CONFIG.issues.github_labels,
+            dedup_store=ErrorDedupStore(
+                CONFIG.issues.dedup_ttl or DEDUP_TTL,
+                CONFIG.issues.dedup_max_entries or DEDUP_MAX_ENTRIES
+            ),
+            session_factory=SessionLocal if CONFIG.issues.persist_signatures else None
+        )
+    return _reporter
+
+
+def normalize_traceback(error_text: str) -> str:
+    """Strip memory addresses, UUIDs and numeric IDs so equal bugs share a signature."""
+    for pattern, replacement in _NORMALIZE_PATTERNS:
+        error_text = pattern.sub(replacement, error_text)
+    return error_text
 
 
 def generate_signature(error_text: str) -> str:
-    return hashlib.md5(error_text.encode()).hexdigest()
+    return hashlib.md5(normalize_traceback(error_text).encode()).hexdigest()
 
 
 def format_exception(ctx=None, interaction=None, error=None, source="unknown"):
@@ -64,10 +299,6 @@ def format_exception(ctx=None, interaction=None, error=None, source="unknown"):
         )
 
     signature = generate_signature(tb_str)
-    if signature in _recent_errors:
-        return None, None, None
-
-    _recent_errors.add(signature)
 
     title = f"[Unhandled Exception] {source} - {type(error).__name__ if not isinstance(error, str) else 'Exception'}"
 
@@ -111,26 +342,8 @@ def format_exception(ctx=None, interaction=None, error=None, source="unknown"):
     return title, body, signature
 
 
-def create_github_issue(title, body):
-    url = f"https://api.github.com/repos/{CONFIG.issues.github_repository}/issues"
-    headers = {
-        "Authorization": f"token {get_github_app_token(
-            CONFIG.issues.github_app_id,
-            CONFIG.issues.github_installation_id,
-            CONFIG.issues.github_private_key_path
-        )}",
-        "Accept": "application/vnd.github+json",
-    }
-    payload = {"title": title, "body": body, "labels": CONFIG.issues.github_labels}
-    response = requests.post(url, headers=headers, json=payload)
-    return response.ok
-
-
 async def report_unhandled_exception(
     ctx=None, interaction=None, error=None, source="unknown"
 ):
     title, body, signature = format_exception(ctx, interaction, error, source)
-    if title and body:
-        success = create_github_issue(title, body)
-        if not success:
-            print("Failed to submit issue to GitHub.")
+    get_reporter().submit(signature, title, body)
@@ -4,6 +4,7 @@ from config import CONFIG
 from hypixel import fetch_hypixel_discord_tag
 from core.repositories.minecraft import MinecraftRepository
 from core.repositories.players import PlayerRepository
+from resilience import UpstreamError
 
 class AccountLinkError(Exception):
     def __init__(self, message, code=None):
@@ -34,7 +35,10 @@ class MinecraftAccountService:
         if not player:
             raise PlayerNotFound("Player not found for the provided Discord user ID")
         
-        uuid = await fetch_minecraft_uuid(username)
+        try:
+            uuid = await fetch_minecraft_uuid(username)
+        except UpstreamError as e:
+            raise AccountLinkError(f"Failed to fetch Minecraft UUID from Mojang: {str(e)}", code="mojang_unavailable")
         if not uuid:
             raise MinecraftAccountNotFound(username)
         
@@ -67,7 +71,10 @@ class MinecraftAccountService:
                 await member.edit(nick=None)
                 return
 
-            username = await fetch_minecraft_username(minecraft_account.minecraft_uuid) or minecraft_account.minecraft_username
+            try:
+                username = await fetch_minecraft_username(minecraft_account.minecraft_uuid) or minecraft_account.minecraft_username
+            except UpstreamError:
+                username = minecraft_account.minecraft_username
             await self.minecraft_repo.update_account(player.id, minecraft_account.minecraft_uuid, username)
             
         await member.edit(nick=username)
\ No newline at end of file
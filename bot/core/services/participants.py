@@ -0,0 +1,248 @@
+import asyncio
+import logging
+from logging.handlers import RotatingFileHandler
+import re
+import time
+import weakref
+from challonge.client import ChallongeClient
+from core.repositories.messages import MessageRepository
+from core.repositories.teams import TeamRepository
+from db import models
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('services.participants.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+BULK_ADD_CHUNK_SIZE = 50
+CHECK_IN_CONCURRENCY = 8
+REGISTERED_STATUSES = (models.TeamStatus.accepted, models.TeamStatus.substitute)
+
+_JUMP_URL_PATTERN = re.compile(r"/channels/(?:\d+|@me)/(\d+)/(\d+)")
+
+# One lock per team so concurrent approvals of the same team never register it twice
+_registration_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+
+def _is_unprocessable(error: Exception) -> bool:
+    """Whether challonge answered 422. Checked by duck typing, so requests does not have to be imported here."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 422
+
+def _message_key(jump_url: str | None) -> tuple[str, str] | None:
+    """(channel id, message id) of a discord jump url, ignoring the guild part."""
+    match = _JUMP_URL_PATTERN.search(jump_url or "")
+    return match.groups() if match else None
+
+class BulkRegistrationResult:
+    def __init__(self, added: int, checked_in: int, failed_check_ins: int, duration: float):
+        self.added = added
+        self.checked_in = checked_in
+        self.failed_check_ins = failed_check_ins
+        self.duration = duration
+
+class ReconciliationResult:
+    def __init__(self, repaired: int, cleared: int, removed: int, orphans: list[str], duration: float):
+        self.repaired = repaired
+        self.cleared = cleared
+        self.removed = removed
+        self.orphans = orphans
+        self.duration = duration
+
+class ParticipantRegistrationService:
+    def __init__(self, team_repo: TeamRepository, message_repo: MessageRepository, challonge_client: ChallongeClient):
+        self.team_repo: TeamRepository = team_repo
+        self.message_repo: MessageRepository = message_repo
+        self.challonge_client: ChallongeClient = challonge_client
+
+    async def ensure_participant(self, tournament: models.Tournaments, team: models.Teams, misc: str = "", check_in: bool = False) -> str:
+        """
+        Register a team on challonge unless it already is. If challonge already
+        knows the team (e.g. the bot crashed before storing the id) the existing
+        participant is adopted instead of creating a duplicate.
+        Returns the challonge participant id.
+        """
+        lock = _registration_locks.get(team.id)
+        if lock is None:
+            lock = _registration_locks[team.id] = asyncio.Lock()
+
+        async with lock:
+            challonge_id = await self.team_repo.get_challonge_team_id(team.id)
+            if challonge_id is None:
+                try:
+                    participant = (await asyncio.to_thread(
+                        self.challonge_client.add_participant, tournament.challonge_tournament_id, team.team_name, misc
+                    ))["participant"]
+                except Exception as e:
+                    if not _is_unprocessable(e):
+                        raise
+                    participant = await self._find_participant(tournament, team, misc)
+                    if participant is None:
+                        raise
+                    logger.info(f"Adopted existing challonge participant {participant['id']} for team {team.id}")
+                challonge_id = str(participant["id"])
+                await self.team_repo.set_challonge_team_id(team.id, challonge_id)
+
+        if check_in:
+            await asyncio.to_thread(self.challonge_client.check_in_participant, tournament.challonge_tournament_id, challonge_id)
+        return challonge_id
+
+    async def _find_participant(self, tournament: models.Tournaments, team: models.Teams, misc: str) -> dict | None:
+        participants = await asyncio.to_thread(self.challonge_client.list_participants, tournament.challonge_tournament_id)
+        key = _message_key(misc)
+        for entry in participants:
+            participant = entry["participant"]
+            if (key and _message_key(participant.get("misc")) == key) or participant["name"] == team.team_name:
+                return participant
+        return None
+
+    async def reconcile_tournament(self, tournament: models.Tournaments, remove_orphans: bool = True) -> ReconciliationResult:
+        """
+        Compare the challonge participants of a tournament with the local teams.
+        Participants are matched by stored id, then by the signup message jump
+        url in `misc`, then by name. Missing or stale `challonge_team_id`s are
+        repaired, and participants without a registered team are removed while
+        the tournament has not started yet.
+        """
+        start = time.perf_counter()
+        participants = [entry["participant"] for entry in await asyncio.to_thread(
+            self.challonge_client.list_participants, tournament.challonge_tournament_id
+        )]
+        teams = await self.team_repo.get_all_teams_for_tournament(tournament.id)
+        messages = await self.message_repo.get_signup_messages_for_teams([team.id for team in teams])
+
+        registered = [team for team in teams if team.status in REGISTERED_STATUSES]
+        by_challonge_id = {str(team.challonge_team_id): team for team in registered if team.challonge_team_id}
+        by_message = {(str(message.discord_channel_id), str(message.discord_message_id)): team
+                      for team in registered if (message := messages.get(team.id)) is not None}
+        by_name = {team.team_name: team for team in registered}
+
+        claimed: dict[int, str] = {}
+        unclaimed = []
+        for participant in participants:
+            team = by_challonge_id.get(str(participant["id"]))
+            if team is not None and team.id not in claimed:
+                claimed[team.id] = str(participant["id"])
+            else:
+                unclaimed.append(participant)
+
+        orphans = []
+        for participant in unclaimed:
+            team = by_message.get(_message_key(participant.get("misc"))) or by_name.get(participant["name"])
+            if team is not None and team.id not in claimed:
+                claimed[team.id] = str(participant["id"])
+            else:
+                orphans.append(participant)
+
+        teams_by_id = {team.id: team for team in teams}
+        repairs = {team_id: challonge_id for team_id, challonge_id in claimed.items()
+                   if str(teams_by_id[team_id].challonge_team_id) != challonge_id}
+        stale = {team.id: None for team in teams if team.challonge_team_id and team.id not in claimed}
+        await self.team_repo.set_challonge_team_ids(repairs | stale)
+
+        removed = 0
+        if remove_orphans and orphans and tournament.status in (models.TournamentStatus.planned, models.TournamentStatus.signups):
+            semaphore = asyncio.Semaphore(CHECK_IN_CONCURRENCY)
+
+            async def delete(participant: dict) -> bool:
+                async with semaphore:
+                    try:
+                        await asyncio.to_thread(self.challonge_client.delete_participant, tournament.challonge_tournament_id, participant["id"])
+                        return True
+                    except Exception as e:
+                        logger.error(f"Removing orphaned participant {participant['id']} from tournament {tournament.id} failed: {e}")
+                        return False
+
+            removed = sum(await asyncio.gather(*(delete(participant) for participant in orphans)))
+
+        result = ReconciliationResult(
+            repaired=len(repairs),
+            cleared=len(stale),
+            removed=removed,
+            orphans=[participant["name"] for participant in orphans],
+            duration=time.perf_counter() - start
+        )
+        if repairs or stale or orphans:
+            logger.info(
+                f"Reconciled tournament {tournament.id}: {result.repaired} ids repaired, {result.cleared} stale ids cleared, "
+                f"{result.removed}/{len(orphans)} orphans removed, took {result.duration:.2f}s"
+            )
+        return result
+
+class ParticipantBulkService:
+    def __init__(self, team_repo: TeamRepository, message_repo: MessageRepository, challonge_client: ChallongeClient):
+        self.team_repo: TeamRepository = team_repo
+        self.message_repo: MessageRepository = message_repo
+        self.challonge_client: ChallongeClient = challonge_client
+
+    async def register_teams(self, tournament: models.Tournaments, guild_id: int | None = None) -> BulkRegistrationResult:
+        """
+        Add every accepted or substitute team that has no challonge participant yet
+        (after adopting participants that already exist on challonge)
+        using chunked bulk_add calls and check in the accepted teams concurrently.
+        The returned ids are stored after every chunk, so when a later chunk fails
+        the participants that were already added on challonge are not lost.
+        """
+        start = time.perf_counter()
+        if tournament.challonge_tournament_id:
+            # Adopt participants left over from an earlier, interrupted run instead of adding them again
+            await ParticipantRegistrationService(self.team_repo, self.message_repo, self.challonge_client).reconcile_tournament(tournament, remove_orphans=False)
+
+        teams = await self.team_repo.get_teams_without_challonge_id(
+            tournament.id, [models.TeamStatus.accepted, models.TeamStatus.substitute]
+        )
+        if not teams or not tournament.challonge_tournament_id:
+            return BulkRegistrationResult(0, 0, 0, time.perf_counter() - start)
+
+        messages = await self.message_repo.get_signup_messages_for_teams([team.id for team in teams])
+
+        def misc(team: models.Teams) -> str:
+            message = messages.get(team.id)
+            if message is None or guild_id is None:
+                return ""
+            return f"https://discord.com/channels/{guild_id}/{message.discord_channel_id}/{message.discord_message_id}"
+
+        teams_by_name = {team.team_name: team for team in teams}
+        challonge_ids: dict[int, str] = {}
+        for i in range(0, len(teams), BULK_ADD_CHUNK_SIZE):
+            chunk = teams[i:i + BULK_ADD_CHUNK_SIZE]
+            response = await asyncio.to_thread(
+                self.challonge_client.bulk_add_participants,
+                tournament.challonge_tournament_id,
+                [{"name": team.team_name, "misc": misc(team)} for team in chunk]
+            )
+            chunk_ids = {}
+            for entry in response:
+                participant = entry["participant"]
+                team = teams_by_name.get(participant["name"])
+                if team is not None:
+                    chunk_ids[team.id] = str(participant["id"])
+            await self.team_repo.set_challonge_team_ids(chunk_ids)
+            challonge_ids.update(chunk_ids)
+
+        accepted = [team for team in teams if team.status == models.TeamStatus.accepted and team.id in challonge_ids]
+        semaphore = asyncio.Semaphore(CHECK_IN_CONCURRENCY)
+
+        async def check_in(team: models.Teams) -> bool:
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(self.challonge_client.check_in_participant, tournament.challonge_tournament_id, challonge_ids[team.id])
+                    return True
+                except Exception as e:
+                    logger.error(f"Check-in of team {team.id} in tournament {tournament.id} failed: {e}")
+                    return False
+
+        results = await asyncio.gather(*(check_in(team) for team in accepted))
+
+        result = BulkRegistrationResult(
+            added=len(challonge_ids),
+            checked_in=sum(results),
+            failed_check_ins=len(results) - sum(results),
+            duration=time.perf_counter() - start
+        )
+        logger.info(
+            f"Bulk registered {result.added} teams for tournament {tournament.id}, "
+            f"{result.checked_in} checked in, {result.failed_check_ins} failed, took {result.duration:.2f}s"
+        )
+        return result
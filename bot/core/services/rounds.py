@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from logging.handlers import RotatingFileHandler
+import time
+from typing import Awaitable, Callable
+from core.repositories.brackets import BracketRepository
+from core.repositories.games import GameRepository
+from core.repositories.members import MemberRepository
+from core.repositories.teams import TeamRepository
+from core.services.games import CreatedGame, GameService
+from db import models
+from restscheduler import Priority, priority
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('services.rounds.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_MAX_CONCURRENT_GAMES = 8
+
+class RoundLaunchResult:
+    def __init__(self, created: list[tuple[models.Brackets, CreatedGame]], failed: list[tuple[models.Brackets, Exception]], skipped: list[models.Brackets], already_launched: list[models.Brackets], duration: float):
+        self.created = created
+        self.failed = failed
+        self.skipped = skipped
+        self.already_launched = already_launched
+        self.duration = duration
+
+# Called after every finished game with (done, total, match, created game or error)
+ProgressCallback = Callable[[int, int, models.Brackets, CreatedGame | Exception], Awaitable[None]]
+
+class RoundLaunchService:
+    def __init__(self, bracket_repo: BracketRepository, team_repo: TeamRepository, member_repo: MemberRepository, game_repo: GameRepository, game_service: GameService):
+        self.bracket_repo: BracketRepository = bracket_repo
+        self.team_repo: TeamRepository = team_repo
+        self.member_repo: MemberRepository = member_repo
+        self.game_repo: GameRepository = game_repo
+        self.game_service: GameService = game_service
+
+    async def launch_round(self, tournament: models.Tournaments, round_number: int, max_concurrent: int = DEFAULT_MAX_CONCURRENT_GAMES, on_progress: ProgressCallback | None = None) -> RoundLaunchResult:
+        """
+        Create the games of every open match of a round.
+
+        All teams and rosters of the round are loaded and all game ids reserved up
+        front, so the game setups only do Discord work. At most `max_concurrent` games
+        are set up at once, their Discord requests are scheduled as bulk work so
+        interactive requests are not stuck behind them.
+        The channels of all games are stored in one transaction at the end.
+        Open matches that are still missing a team or already have a game are skipped.
+        """
+        start = time.perf_counter()
+        matches = await self.bracket_repo.get_matches_for_round(tournament.id, round_number, models.MatchStatus.open)
+        playable = [match for match in matches if match.team1_id and match.team2_id]
+        skipped = [match for match in matches if not (match.team1_id and match.team2_id)]
+
+        team_ids = [team_id for match in playable for team_id in (match.team1_id, match.team2_id)]
+        teams = await self.team_repo.get_teams_by_ids(team_ids)
+        rosters = await self.member_repo.get_rosters_for_teams(team_ids)
+        texts_category, voice_category = await self.game_service.get_categories(tournament)
+
+        games = await self.game_repo.reserve_games(tournament.id, [match.id for match in playable], self.game_service.generate_game_id)
+        already_launched = [match for match, game in zip(playable, games) if game is None]
+        launches = [(match, game) for match, game in zip(playable, games) if game is not None]
+
+        semaphore = asyncio.Semaphore(max_concurrent)
+        created: list[tuple[models.Brackets, CreatedGame]] = []
+        failed: list[tuple[models.Brackets, Exception]] = []
+        channel_rows: list[tuple[int, int, models.GameChannelType, int | None]] = []
+        failed_games: list[int] = []
+
+        async def launch(match: models.Brackets, game: models.Games):
+            async with semaphore:
+                try:
+                    created_game = await self.game_service.setup_game(
+                        game.game_id,
+                        [teams[match.team1_id], teams[match.team2_id]],
+                        rosters,
+                        texts_category,
+                        voice_category,
+                        start
+                    )
+                except Exception as e:
+                    logger.error(f"Creating the game of match {match.id} (round {round_number}, tournament {tournament.id}) failed: {e}")
+                    failed.append((match, e))
+                    failed_games.append(game.id)
+                    outcome = e
+                else:
+                    created.append((match, created_game))
+                    channel_rows.extend(self.game_service.channel_rows(game, [teams[match.team1_id], teams[match.team2_id]], created_game))
+                    outcome = created_game
+            if on_progress is not None:
+                try:
+                    await on_progress(len(created) + len(failed), len(launches), match, outcome)
+                except Exception as e:
+                    logger.warning(f"Round launch progress callback failed: {e}")
+
+        with priority(Priority.bulk):
+            await asyncio.gather(*(launch(match, game) for match, game in launches))
+        await self.game_repo.add_channels(channel_rows)
+        await self.game_repo.release_games(failed_games)
+
+        duration = time.perf_counter() - start
+        logger.info(
+            f"Launched round {round_number} of tournament {tournament.id}: {len(created)} games created, "
+            f"{len(failed)} failed, {len(skipped)} skipped, {len(already_launched)} already launched in {duration:.1f}s"
+        )
+        return RoundLaunchResult(created, failed, skipped, already_launched, duration)
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from logging.handlers import RotatingFileHandler
+import time
+from typing import Awaitable, Callable
+import discord
+
+from challonge.client import ChallongeClient
+from core.repositories.members import MemberRepository
+from core.repositories.messages import MessageRepository
+from core.repositories.minecraft import MinecraftRepository
+from core.repositories.players import PlayerRepository
+from core.repositories.registrations import RegistrationRepository
+from core.repositories.teams import TeamRepository
+from core.repositories.tournaments import TournamentRepository
+from core.services.signups import SignupError, SignupService
+import metrics
+from db import models
+from restscheduler import Priority, priority
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('services.signup_queue.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_BATCH_SIZE = 25
+DEFAULT_BATCH_WINDOW = 0.05
+ADMIT_ATTEMPTS = 2
+
+class SignupAdmission:
+    def __init__(self, team: models.Teams, message: discord.Message, wait: float, batch_size: int):
+        self.team = team
+        self.message = message
+        self.wait = wait
+        self.batch_size = batch_size
+
+class _PendingSignup:
+    __slots__ = ("team_name", "members", "future", "enqueued_at")
+
+    def __init__(self, team_name: str, members: list, future: asyncio.Future):
+        self.team_name = team_name
+        self.members = members
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+class SignupAdmissionQueue:
+    """
+    Admission pipeline for /signup. Requests are queued per signup channel (one
+    tournament each) and a worker per channel admits them in micro-batches: it
+    takes what arrived within `batch_window` seconds (up to `batch_size`),
+    validates the batch in memory (see RegistrationIndex) or with a handful of
+    queries and creates all valid teams in one transaction. Since a tournament
+    only has one worker, concurrent signups never race on the team name or
+    membership checks.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        challonge_client: ChallongeClient,
+        message_send: Callable[[str, models.Teams, list[int]], Awaitable[discord.Message]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+    ):
+        self.session_factory = session_factory
+        self.challonge_client = challonge_client
+        self.message_send = message_send
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._queues: dict[str, asyncio.Queue[_PendingSignup]] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+
+    async def submit(self, channel_id: str, team_name: str, members: list) -> SignupAdmission:
+        """
+        Queue a signup and wait until its batch was admitted.
+
+        :raises: SignupError if the signup was rejected
+        """
+        channel_id = str(channel_id)
+        pending = _PendingSignup(team_name, members, asyncio.get_running_loop().create_future())
+        self._queue(channel_id).put_nowait(pending)
+        metrics.SIGNUP_QUEUE_DEPTH.inc()
+        return await pending.future
+
+    def _queue(self, channel_id: str) -> asyncio.Queue[_PendingSignup]:
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = self._queues[channel_id] = asyncio.Queue()
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._workers[channel_id] = asyncio.create_task(self._work(channel_id, queue), name=f"signup-admission-{channel_id}")
+        return queue
+
+    async def close(self):
+        """Stop the workers. Signups still queued are failed."""
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        for queue in self._queues.values():
+            while not queue.empty():
+                pending = queue.get_nowait()
+                metrics.SIGNUP_QUEUE_DEPTH.dec()
+                if not pending.future.done():
+                    pending.future.set_exception(SignupError("Signups are not accepted right now, please try again."))
+
+    async def _work(self, channel_id: str, queue: asyncio.Queue[_PendingSignup]):
+        # The signup message is part of the answer the user waits for
+        with priority(Priority.interaction):
+            while True:
+                batch = await self._next_batch(queue)
+                try:
+                    await self._admit(channel_id, batch)
+                except Exception as e:
+                    logger.error(f"Admitting {len(batch)} signups in channel {channel_id} failed: {e}")
+                    for pending in batch:
+                        if not pending.future.done():
+                            pending.future.set_exception(e)
+
+    async def _next_batch(self, queue: asyncio.Queue[_PendingSignup]) -> list[_PendingSignup]:
+        batch = [await queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 and queue.empty():
+                break
+            try:
+                batch.append(queue.get_nowait() if not queue.empty() else await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        metrics.SIGNUP_QUEUE_DEPTH.dec(len(batch))
+        # Requests whose interaction was given up on do not take a team name
+        return [pending for pending in batch if not pending.future.done()]
+
+    async def _admit(self, channel_id: str, batch: list[_PendingSignup]):
+        if not batch:
+            return
+        start = time.perf_counter()
+        async with self.session_factory() as session:
+            service = SignupService(
+                TournamentRepository(session), TeamRepository(session), PlayerRepository(session),
+                MinecraftRepository(session), MessageRepository(session), MemberRepository(session),
+                self.challonge_client, RegistrationRepository(session)
+            )
+            for attempt in range(ADMIT_ATTEMPTS):
+                try:
+                    results = await service.admit_teams(channel_id, [(pending.team_name, pending.members) for pending in batch], use_index=attempt == 0)
+                    break
+                except ValueError:
+                    # Someone outside the queue created a conflicting team, validate again against the database
+                    if attempt + 1 == ADMIT_ATTEMPTS:
+                        raise
+
+            admitted = [(pending, team) for pending, team in zip(batch, results) if isinstance(team, models.Teams)]
+            messages = await asyncio.gather(
+                *(self.message_send(channel_id, team, [member.id for member in pending.members]) for pending, team in admitted),
+                return_exceptions=True
+            )
+            await service.add_signup_messages([
+                (team, message) for (_, team), message in zip(admitted, messages) if not isinstance(message, BaseException)
+            ])
+            # A team without its signup message can never be approved, undo it so the signup can be retried
+            await service.withdraw_teams([
+                team for (_, team), message in zip(admitted, messages) if isinstance(message, BaseException)
+            ])
+
+        messages_by_team = {team.id: message for (_, team), message in zip(admitted, messages)}
+        for pending, result in zip(batch, results):
+            if pending.future.done():
+                continue
+            if isinstance(result, SignupError):
+                metrics.SIGNUPS_ADMITTED.labels(result="rejected").inc()
+                pending.future.set_exception(result)
+                continue
+            message = messages_by_team[result.id]
+            if isinstance(message, BaseException):
+                logger.error(f"Signup message of team {result.team_name} ({result.id}) could not be sent, the team was deleted again: {message}")
+                metrics.SIGNUPS_ADMITTED.labels(result="failed").inc()
+                pending.future.set_exception(message)
+                continue
+            metrics.SIGNUPS_ADMITTED.labels(result="admitted").inc()
+            metrics.SIGNUP_ADMISSION_WAIT.observe(time.monotonic() - pending.enqueued_at)
+            pending.future.set_result(SignupAdmission(result, message, time.monotonic() - pending.enqueued_at, len(batch)))
+
+        metrics.SIGNUP_BATCH_SIZE.observe(len(batch))
+        logger.debug(f"Admitted {len(admitted)}/{len(batch)} signups in channel {channel_id} in {time.perf_counter() - start:.3f}s")
@@ -1,11 +1,10 @@
-from typing import Awaitable, Callable
-
 import discord
 from challonge.client import ChallongeClient
 from core.repositories.members import MemberRepository
 from core.repositories.messages import MessageRepository
 from core.repositories.minecraft import MinecraftRepository
 from core.repositories.players import PlayerRepository
+from core.repositories.registrations import Registration, RegistrationRepository
 from core.repositories.teams import TeamRepository
 from core.repositories.tournaments import TournamentRepository
 from db import models
@@ -47,7 +46,7 @@ class PlayerAlreadyInATeam(SignupError):
         self.player = player
 
 class SignupService:
-    def __init__(self, tournament_repo: TournamentRepository, team_repo: TeamRepository, player_repo: PlayerRepository, minecraft_repo: MinecraftRepository, message_repo: MessageRepository, member_repo: MemberRepository, challonge_client: ChallongeClient):
+    def __init__(self, tournament_repo: TournamentRepository, team_repo: TeamRepository, player_repo: PlayerRepository, minecraft_repo: MinecraftRepository, message_repo: MessageRepository, member_repo: MemberRepository, challonge_client: ChallongeClient, registration_repo: RegistrationRepository):
         self.tournament_repo: TournamentRepository = tournament_repo
         self.team_repo: TeamRepository = team_repo
         self.player_repo: PlayerRepository = player_repo
@@ -55,53 +54,96 @@ class SignupService:
         self.message_repo: MessageRepository = message_repo
         self.member_repo: MemberRepository = member_repo
         self.challonge_client: ChallongeClient = challonge_client
+        self.registration_repo: RegistrationRepository = registration_repo
     
-    async def signup_team(self, channel_id: str, team_name, members, message_send: Callable[[str, list[int]], Awaitable[discord.Message]]) -> discord.Message:
+    async def admit_teams(self, channel_id: str, signups: list[tuple[str, list]], use_index: bool = True) -> list[models.Teams | SignupError]:
+        """
+        Validate a batch of (team name, members) signups for the tournament of the
+        channel and create the valid teams in one transaction.
+
+        Lookups are done once for the whole batch, from the registration index
+        when the tournament is warm (and `use_index`), and signups are also checked
+        against the ones before them in the batch: a later team with the same name
+        or a player that is already used loses. Returns, in input order, the
+        created team or the SignupError that rejected the signup.
+        """
         tournament = await self.tournament_repo.get_tournament_for_signup_channel_id(channel_id)
-            
         if not tournament:
-            raise TournamentNotFound("Tournament not found in this channel")
-        
+            return [TournamentNotFound("Tournament not found in this channel") for _ in signups]
         if tournament.status != models.TournamentStatus.signups:
-            raise SignupClosed("Tournament signup is closed")
-        
-        if len(team_name) > TEAM_NAME_MAX_LENGTH:
-            raise TeamNameTooLong(TEAM_NAME_MAX_LENGTH)
-        
-        existing_team = await self.team_repo.get_team_for_team_name(team_name)
-        if existing_team:
-            raise TeamNameTaken(existing_team)
-        
-        if len({m.id for m in members}) < len(members):
-            raise DuplicateTeamMemberError("A team cannot have duplicate members")
-        
-        unregistered_ids = []
-        for member in members:
-            player = await self.player_repo.get_by_discord_id(member.id)
-            if player is None:
-                unregistered_ids.append(member.id)
+            return [SignupClosed("Tournament signup is closed") for _ in signups]
+
+        discord_ids = {str(member.id) for _, members in signups for member in members}
+        team_names = [team_name for team_name, _ in signups]
+        registrations = self.registration_repo.get_registrations(tournament.id, discord_ids) if use_index else None
+        if registrations is not None:
+            taken_names = {
+                team_name: models.Teams(tournament_id=tournament.id, team_name=team_name)
+                for team_name in self.registration_repo.get_taken_team_names(tournament.id, team_names)
+            }
+        else:
+            registrations = await self._load_registrations(tournament.id, discord_ids)
+            taken_names = await self.team_repo.get_teams_for_team_names(team_names, tournament.id)
+        taken_players = {registration.player_id for registration in registrations.values() if registration.team_id is not None}
+
+        results: list[models.Teams | SignupError | None] = [None] * len(signups)
+        admitted: list[int] = []
+        for i, (team_name, members) in enumerate(signups):
+            if len(team_name) > TEAM_NAME_MAX_LENGTH:
+                results[i] = TeamNameTooLong(TEAM_NAME_MAX_LENGTH)
                 continue
-            if await self.minecraft_repo.get_by_player_id(player.id) is None:
-                unregistered_ids.append(member.id)
+            if team_name in taken_names:
+                results[i] = TeamNameTaken(taken_names[team_name])
+                continue
+            if len({m.id for m in members}) < len(members):
+                results[i] = DuplicateTeamMemberError("A team cannot have duplicate members")
+                continue
+
+            unregistered_ids = []
+            already_in_team = None
+            for member in members:
+                registration = registrations.get(str(member.id))
+                if registration is None or not registration.has_minecraft:
+                    unregistered_ids.append(member.id)
+                elif registration.player_id in taken_players and already_in_team is None:
+                    already_in_team = PlayerAlreadyInATeam(str(member.id))
+            if already_in_team is not None:
+                results[i] = already_in_team
                 continue
-            if await self.member_repo.is_player_in_tournament_non_rejected_team(player.id, tournament.id):
-                raise PlayerAlreadyInATeam(player.discord_user_id)
-        
-        if len(unregistered_ids) > 0:
-            raise UnregisteredPlayersError(unregistered_ids)
-        
-        team = await self.team_repo.create_team(tournament_id=tournament.id, team_name=team_name)
-
-        for member in members:
-            player = await self.player_repo.get_by_discord_id(member.id)
-            await self.member_repo.add_member_to_team(team_id=team.id, player_id=player.id)
-
-        message = await message_send(team, [member.id for member in members])
-        await self.message_repo.create_message(
-            discord_message_id=str(message.id),
-            discord_channel_id=str(message.channel.id),
-            team_id=team.id,
+            if unregistered_ids:
+                results[i] = UnregisteredPlayersError(unregistered_ids)
+                continue
+
+            # Reserve the name and players for this signup, so later ones in the batch see them as taken
+            taken_names[team_name] = models.Teams(tournament_id=tournament.id, team_name=team_name)
+            taken_players.update(registrations[str(member.id)].player_id for member in members)
+            admitted.append(i)
+
+        if admitted:
+            teams = await self.team_repo.create_teams_with_members(
+                tournament.id,
+                [(signups[i][0], [registrations[str(member.id)].player_id for member in signups[i][1]]) for i in admitted]
+            )
+            for i, team in zip(admitted, teams):
+                results[i] = team
+        return results
+
+    async def _load_registrations(self, tournament_id: int, discord_ids: set[str]) -> dict[str, Registration]:
+        players = await self.player_repo.get_by_discord_ids(list(discord_ids))
+        accounts = await self.minecraft_repo.get_by_player_ids([player.id for player in players.values()])
+        teams = await self.member_repo.get_non_rejected_teams_of_players([player.id for player in players.values()], tournament_id)
+        return {
+            discord_id: Registration(player.id, player.id in accounts, teams.get(player.id))
+            for discord_id, player in players.items()
+        }
+
+    async def add_signup_messages(self, messages: list[tuple[models.Teams, discord.Message]]):
+        """Store the signup message of each created team in one transaction."""
+        await self.message_repo.create_messages(
+            [(str(message.id), str(message.channel.id), team.id) for team, message in messages],
             purpose="signup propose message"
         )
-        
-        return message
\ No newline at end of file
+
+    async def withdraw_teams(self, teams: list[models.Teams]):
+        """Delete teams created by `admit_teams` whose signup could not be completed, so the name and players can sign up again."""
+        await self.team_repo.delete_teams(teams)
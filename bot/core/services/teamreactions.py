@@ -1,16 +1,53 @@
 import datetime
+import hashlib
+import json
 import discord
 
 from config import CONFIG
 from challonge.client import ChallongeClient
-from core.services.dm_notification import DiscordGroup, DmNotificationService, ModelTeamMembersGroup
+from core.services.dm_notification import DiscordGroup, DmNotificationService
 from core.repositories.members import MemberRepository
 from core.repositories.players import PlayerRepository
 from core.repositories.tournaments import TournamentRepository
 from core.repositories.messages import MessageRepository
 from core.repositories.teams import TeamRepository
+from core.services.participants import ParticipantRegistrationService
 from db import models
 
+SIGNUP_REACTIONS: dict[models.TeamStatus, tuple[str, ...]] = {
+    models.TeamStatus.pending: ("✅", "⛔"),
+    models.TeamStatus.accepted: ("🟢",),
+    models.TeamStatus.substitute: ("🟠",),
+    models.TeamStatus.rejected: ("🔴",),
+}
+
+def signup_embed(team_name: str, status: models.TeamStatus, members_discord_ids: list[int]) -> discord.Embed:
+    """The embed of a signup message for the given team status."""
+    embed = discord.Embed(
+        title=team_name,
+        description="\n".join([f"{CONFIG.styles.pr_enter_emoji} `👤` <@{user_id}>" for user_id in members_discord_ids])
+    )
+    match status:
+        case models.TeamStatus.accepted:
+            embed.color = discord.Color.green()
+            embed.set_footer(text="Team Approved!")
+        case models.TeamStatus.substitute:
+            embed.color = discord.Color.orange()
+            embed.set_footer(text="Team Approved as **Substitue**!")
+        case models.TeamStatus.rejected:
+            embed.color = discord.Color.red()
+            embed.set_footer(text="Team Rejected!")
+        case _:
+            embed.set_footer(text="React ✅ to approve or ⛔ to deny")
+    return embed
+
+def _embed_key(embed: discord.Embed) -> tuple:
+    """The parts of a signup embed that matter, Discord adds other fields when it echoes embeds back."""
+    return (embed.title, embed.description, embed.color.value if embed.color else None, embed.footer.text)
+
+def signup_state_hash(embed: discord.Embed, reactions: tuple[str, ...]) -> str:
+    return hashlib.sha1(json.dumps([_embed_key(embed), sorted(reactions)]).encode()).hexdigest()
+
 class TeamReactionService:
     def __init__(self, team_repo: TeamRepository, msg_repo: MessageRepository, member_repo: MemberRepository, tournament_repo: TournamentRepository, player_repo: PlayerRepository, dm_notifications_service: DmNotificationService, challonge_client: ChallongeClient):
         self.team_repo: TeamRepository = team_repo
@@ -21,7 +58,10 @@ class TeamReactionService:
         self.dm_notifications_service: DmNotificationService = dm_notifications_service
         self.challonge_client: ChallongeClient = challonge_client
 
-    async def handle_signup_reaction_check(self, discord_message):
+    def _registration_service(self) -> ParticipantRegistrationService:
+        return ParticipantRegistrationService(self.team_repo, self.msg_repo, self.challonge_client)
+
+    async def handle_signup_reaction_check(self, discord_message: discord.Message):
         msg_model: models.Messages = await self.msg_repo.get_by_discord_message_id(discord_message.id)
         if not msg_model:
             return
@@ -32,12 +72,10 @@ class TeamReactionService:
         if not team:
             return
         
-        members_discord_ids = [int((await self.player_repo.get_by_id(member.player_id)).discord_user_id) for member in await self.member_repo.get_members_for_team(team_id)]
-
-        await self._clean_invalid_reactions(discord_message, members_discord_ids, team.status)
-
-        reactions = await self._collect_reactions(discord_message)
-        await self._ensure_reaction_presence(discord_message, team.status)
+        members_discord_ids = (await self.member_repo.get_discord_ids_for_teams([team_id]))[team_id]
+        
+        present = {str(reaction.emoji): reaction for reaction in discord_message.reactions}
+        reactions = await self._reconcile_message(discord_message, msg_model, team.team_name, team.status, members_discord_ids, present)
         
         tournament = await self.tournament_repo.get_tournament_for_signup_channel_id(discord_message.channel.id)
         if not tournament or tournament.status != models.TournamentStatus.signups or tournament.signups_locked_reason:
@@ -46,137 +84,112 @@ class TeamReactionService:
         if team.status != models.TeamStatus.pending:
             return
 
-        match await self._update_team_status(team_id, reactions, members_discord_ids, tournament):
+        status = await self._update_team_status(team_id, reactions, members_discord_ids, tournament)
+        if status is None or status == models.TeamStatus.pending:
+            return
+        await self._reconcile_message(discord_message, msg_model, team.team_name, status, members_discord_ids, present)
+
+        match status:
             case models.TeamStatus.accepted:
                 await self._handle_team_approved(discord_message, team, members_discord_ids, tournament)
             case models.TeamStatus.substitute:
                 await self._handle_team_approved_substitute(discord_message, team, members_discord_ids, tournament)
             case models.TeamStatus.rejected:
-                await self._handle_team_rejected(discord_message, team.team_name, members_discord_ids, [uid for uid in members_discord_ids if uid in reactions.get("⛔", [])])
-
-    async def _clean_invalid_reactions(self, message, member_ids, team_status):
-        for reaction in message.reactions:
-            emoji = str(reaction.emoji)
-            if (
-                (team_status == models.TeamStatus.accepted  and emoji != "🟢") or
-                (team_status == models.TeamStatus.substitute and emoji != "🟠") or
-                (team_status == models.TeamStatus.rejected and emoji != "🔴") or
-                (team_status == models.TeamStatus.pending and emoji not in {"✅", "⛔"})
-            ):
-                await message.clear_reaction(reaction.emoji)
-                continue
+                await self._handle_team_rejected(members_discord_ids, [uid for uid in members_discord_ids if uid in reactions.get("⛔", [])])
 
-            users = [user async for user in reaction.users()]
-            for user in users:
-                if not user.bot and user.id not in member_ids:
-                    await message.remove_reaction(reaction.emoji, user)
+    async def _reconcile_message(self, message: discord.Message, msg_model: models.Messages, team_name: str, status: models.TeamStatus, member_ids: list[int], present: dict[str, discord.Reaction | None]) -> dict[str, list[int]]:
+        """
+        Bring the signup message to the desired state of the team status with the fewest REST calls.
 
-    async def _collect_reactions(self, message):
-        result = {}
-        for reaction in message.reactions:
-            emoji = str(reaction.emoji)
-            users = [user async for user in reaction.users()]
-            result[emoji] = [user.id for user in users if not user.bot]
-        return result
-    
-    async def _ensure_reaction_presence(self, message: discord.Message, team_status):
-        match team_status:
-            case models.TeamStatus.accepted:
-                required_emojis = {"🟢"}
-            case models.TeamStatus.substitute:
-                required_emojis = {"🟠"}
-            case models.TeamStatus.rejected:
-                required_emojis = {"🔴"}
-            case models.TeamStatus.pending:
-                required_emojis = {"✅", "⛔"}
-            case _:
-                required_emojis = set()
+        The embed is only edited when the stored state hash differs and the current
+        embed does not already match. Reactions are diffed against `present` (emoji ->
+        reaction from the fetched message, None for reactions the bot added since),
+        which is updated in place so a second call on the same message sees the changes.
+        Reaction users are only fetched for reactions that have users besides the bot.
+
+        Returns the member ids that reacted, per emoji.
+        """
+        wanted = SIGNUP_REACTIONS.get(status, ())
+        embed = signup_embed(team_name, status, member_ids)
+        state_hash = signup_state_hash(embed, wanted)
+        if msg_model.state_hash != state_hash:
+            if not message.embeds or _embed_key(message.embeds[0]) != _embed_key(embed):
+                await message.edit(embed=embed)
+            await self.msg_repo.set_state_hash(msg_model.id, state_hash)
+            msg_model.state_hash = state_hash
+
+        unwanted = [emoji for emoji in present if emoji not in wanted]
+        if unwanted and len(unwanted) == len(present):
+            await message.clear_reactions()
+        else:
+            for emoji in unwanted:
+                await message.clear_reaction(emoji)
+        for emoji in unwanted:
+            del present[emoji]
 
         bot_user = message.guild.me
+        member_reactions: dict[str, list[int]] = {}
+        for emoji in wanted:
+            if emoji not in present:
+                await message.add_reaction(emoji)
+                present[emoji] = None
+                member_reactions[emoji] = []
+                continue
 
-        for emoji in required_emojis:
-            reaction = next((r for r in message.reactions if str(r.emoji) == emoji), None)
+            reaction = present[emoji]
+            if reaction is None or reaction.count <= int(reaction.me):
+                member_reactions[emoji] = []
+                continue
 
-            if reaction:
-                users = [user async for user in reaction.users()]
-                non_bot_users = [u for u in users if not u.bot]
-                bot_reacted = any(u.id == bot_user.id for u in users)
+            users = [user async for user in reaction.users()]
+            for user in users:
+                if not user.bot and user.id not in member_ids:
+                    await message.remove_reaction(emoji, user)
+            member_reactions[emoji] = [user.id for user in users if not user.bot and user.id in member_ids]
 
-                if not non_bot_users and not bot_reacted:
-                    await message.add_reaction(emoji)
-                elif non_bot_users and bot_reacted:
-                    await message.remove_reaction(emoji, bot_user)
-            else:
+            # The bot's own reaction is only a placeholder until a member reacts
+            bot_reacted = any(user.id == bot_user.id for user in users)
+            if not member_reactions[emoji] and not bot_reacted:
                 await message.add_reaction(emoji)
+            elif member_reactions[emoji] and bot_reacted:
+                await message.remove_reaction(emoji, bot_user)
+        return member_reactions
                 
     # DO NOT CALL WHEN TEAM STATUS IS NOT PENDING (will break signup complete date)
-    async def _update_team_status(self, team_id, reactions, member_ids, tournament: models.Tournaments) -> models.TeamStatus:
+    async def _update_team_status(self, team_id, reactions, member_ids, tournament: models.Tournaments) -> models.TeamStatus | None:
         accepted = all(uid in reactions.get("✅", []) for uid in member_ids)
         denied = any(uid in reactions.get("⛔", []) for uid in member_ids)
         
-        if denied:
-            status = models.TeamStatus.rejected
-        elif accepted:
-            if await self.team_repo.get_accepted_team_count(tournament.id) >= tournament.max_accepted_teams:
-                status = models.TeamStatus.substitute
-            else:
-                status = models.TeamStatus.accepted
-        else:
-            status = models.TeamStatus.pending
-        
+        if accepted and not denied:
+            # Atomic slot allocation, returns None if another reaction event already completed this team
+            return await self.team_repo.complete_signup(
+                team_id, tournament.id, tournament.max_accepted_teams, datetime.datetime.now(datetime.timezone.utc)
+            )
+
+        status = models.TeamStatus.rejected if denied else models.TeamStatus.pending
         await self.team_repo.set_status(team_id, status)
         await self.team_repo.set_signup_complete_date(team_id, datetime.datetime.now(datetime.timezone.utc))
         return status
     
-    async def _handle_team_approved(self, message: discord.Message, team: models.Teams, members_discord_ids: list[str], tournament: models.Tournaments):
-        await message.edit(embed=
-                     discord.Embed(
-                         title= team.team_name,
-                         description="\n".join([f"{CONFIG.styles.pr_enter_emoji} `👤` <@{user_id}>" for user_id in members_discord_ids]),
-                         color=discord.Color.green()
-                     ).set_footer(text="Team Approved!")
-                    )
-        await message.clear_reactions()
-        await message.add_reaction("🟢")
+    async def _handle_team_approved(self, message: discord.Message, team: models.Teams, members_discord_ids: list[int], tournament: models.Tournaments):
         await self.dm_notifications_service.notify(
             DiscordGroup(members_discord_ids),
             self.dm_notifications_service.message_accept
         )
-        if tournament.challonge_tournament_id:  
-            response = self.challonge_client.add_participant(tournament.challonge_tournament_id, team.team_name, f"{message.jump_url}")["participant"]
-            self.team_repo.set_challonge_team_id(team.id, response["id"])
-            self.challonge_client.check_in_participant(tournament.challonge_tournament_id, response["id"])
+        if tournament.challonge_tournament_id:
+            await self._registration_service().ensure_participant(tournament, team, f"{message.jump_url}", check_in=True)
     
-    async def _handle_team_approved_substitute(self, message: discord.Message, team: models.Teams, members_discord_ids: list[str], tournament: models.Tournaments):
-        await message.edit(embed=
-                     discord.Embed(
-                         title= team.team_name,
-                         description="\n".join([f"{CONFIG.styles.pr_enter_emoji} `👤` <@{user_id}>" for user_id in members_discord_ids]),
-                         color=discord.Color.orange()
-                     ).set_footer(text="Team Approved as **Substitue**!")
-                    )
-        await message.clear_reactions()
-        await message.add_reaction("🟠")
+    async def _handle_team_approved_substitute(self, message: discord.Message, team: models.Teams, members_discord_ids: list[int], tournament: models.Tournaments):
         await self.dm_notifications_service.notify(
             DiscordGroup(members_discord_ids),
             self.dm_notifications_service.message_accept_as_substitute
         )
         if tournament.challonge_tournament_id:
-            response = self.challonge_client.add_participant(tournament.challonge_tournament_id, team.team_name, f"{message.jump_url}")["participant"]
-            self.team_repo.set_challonge_team_id(team.id, response["id"])
+            await self._registration_service().ensure_participant(tournament, team, f"{message.jump_url}")
     
-    async def _handle_team_rejected(self, message: discord.Message, team_name: str, members_discord_ids: list[str], rejected_by: list[discord.Member]):
-        await message.edit(embed=
-                     discord.Embed(
-                         title= team_name,
-                         description="\n".join([f"{CONFIG.styles.pr_enter_emoji} `👤` <@{user_id}>" for user_id in members_discord_ids]),
-                         color=discord.Color.red()
-                     ).set_footer(text="Team Rejected!")
-                    )
-        await message.clear_reactions()
-        await message.add_reaction("🔴")
+    async def _handle_team_rejected(self, members_discord_ids: list[int], rejected_by: list[int]):
         await self.dm_notifications_service.notify(
             DiscordGroup(members_discord_ids),
             self.dm_notifications_service.message_rejected_by,
             rejected_by=rejected_by
-        )
\ No newline at end of file
+        )
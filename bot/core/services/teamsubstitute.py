@@ -1,8 +1,9 @@
+import asyncio
 import logging
 from logging.handlers import RotatingFileHandler
 from challonge.client import ChallongeClient
-from core.repositories.players import PlayerRepository
-from core.services.dm_notification import DmNotificationService, ModelTeamMembersGroup
+from core.repositories.members import MemberRepository
+from core.services.dm_notification import DiscordGroup, DmNotificationService
 from core.repositories.tournaments import TournamentRepository
 from db import models
 from core.repositories.teams import TeamRepository
@@ -15,43 +16,52 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 class TeamSubstituteService:
-    def __init__(self, team_repo: TeamRepository, tournament_repo: TournamentRepository, player_repo: PlayerRepository, dm_notifications_service: DmNotificationService, challonge_client: ChallongeClient):
+    def __init__(self, team_repo: TeamRepository, tournament_repo: TournamentRepository, member_repo: MemberRepository, dm_notifications_service: DmNotificationService, challonge_client: ChallongeClient):
         self.team_repo: TeamRepository = team_repo
         self.tournament_repo: TournamentRepository = tournament_repo
-        self.player_repo: PlayerRepository = player_repo
+        self.member_repo: MemberRepository = member_repo
         self.dm_notifications_service: DmNotificationService = dm_notifications_service
         self.challonge_client: ChallongeClient = challonge_client
-    
-    async def update_teams_status_for_substitute(self, tournament_id: int):
+
+    async def update_teams_status_for_substitute(self, tournament_id: int) -> list[models.Teams]:
         """
-        Update the status of all teams in the tournament to ensure that the first team to get accepted as a substitute
-        gets accepted and notified.
+        Fill free accepted slots of the tournament with the earliest substitute teams.
+        All promotions happen in one transaction, the challonge check-ins and DMs
+        of the promoted teams are sent concurrently afterwards.
+        Returns the promoted teams.
         """
         logger.debug(f"Starting update_teams_status_for_substitute for tournament_id={tournament_id}")
-        
-        tournament = await self.tournament_repo.get_tournament_for_signup_channel_id(tournament_id)
+
+        tournament = await self.tournament_repo.get_tournament_by_id(tournament_id)
         if not tournament:
             logger.warning(f"Tournament not found for id={tournament_id}")
-            return
-        
-        accepted_count = await self.team_repo.get_accepted_team_count(tournament_id)
-        logger.debug(f"Accepted teams count: {accepted_count} / max allowed: {tournament.max_accepted_teams}")
-        if accepted_count >= tournament.max_accepted_teams:
-            logger.info(f"Max accepted teams reached for tournament_id={tournament_id}. No substitutes accepted.")
-            return
-        
-        while True:
-            team = await self.team_repo.get_earliest_substitute_team(tournament_id)
-            if team is None:
-                logger.info(f"No more substitute teams to process for tournament_id={tournament_id}")
-                return
-            
-            logger.info(f"Accepting substitute team_id={team.id} for tournament_id={tournament_id}")
-            self.team_repo.set_status(team.id, models.TeamStatus.accepted)
-            
-            self.challonge_client.check_in_participant(tournament.challonge_tournament_id, team.challonge_team_id)
-            
-            await self.dm_notifications_service.notify(
-                await ModelTeamMembersGroup.create(team.members, self.player_repo),
+            return []
+
+        promoted = await self.team_repo.promote_substitutes(tournament.id, tournament.max_accepted_teams)
+        if not promoted:
+            logger.info(f"No substitute teams promoted for tournament_id={tournament_id}")
+            return []
+
+        logger.info(f"Accepted substitute teams {[team.id for team in promoted]} for tournament_id={tournament_id}")
+        discord_ids = await self.member_repo.get_discord_ids_for_teams([team.id for team in promoted])
+        results = await asyncio.gather(
+            *(self._notify_promoted(tournament, team, discord_ids.get(team.id, [])) for team in promoted),
+            return_exceptions=True
+        )
+        for team, result in zip(promoted, results):
+            if isinstance(result, Exception):
+                logger.error(f"Finishing the promotion of team_id={team.id} failed: {result}")
+        return promoted
+
+    async def _notify_promoted(self, tournament: models.Tournaments, team: models.Teams, discord_ids: list[int]):
+        async def check_in():
+            if tournament.challonge_tournament_id and team.challonge_team_id:
+                await asyncio.to_thread(self.challonge_client.check_in_participant, tournament.challonge_tournament_id, team.challonge_team_id)
+
+        await asyncio.gather(
+            check_in(),
+            self.dm_notifications_service.notify(
+                DiscordGroup(discord_ids),
                 self.dm_notifications_service.message_substitue_accept
-            )
\ No newline at end of file
+            )
+        )
@@ -1,3 +1,4 @@
+import asyncio
 from uuid import uuid4
 from challonge.client import ChallongeClient
 from db.models import Tournaments
@@ -21,7 +22,7 @@ class TournamentService:
         if existing:
             raise DuplicateSignupChannelError(signup_channel_id)
 
-        response = self.challonge_client.create_tournament(name, uuid4().hex, max_accepted_teams)["tournament"]
+        response = (await asyncio.to_thread(self.challonge_client.create_tournament, name, uuid4().hex, max_accepted_teams))["tournament"]
         print(response)
         tournament_data = {
             "name": name,
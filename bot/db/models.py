@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, DateTime, Enum, ForeignKey, UniqueConstraint
+    Column, Integer, String, DateTime, Enum, ForeignKey, Index, UniqueConstraint
 )
 from sqlalchemy.orm import relationship, declarative_base
 import enum
@@ -21,6 +21,7 @@ class TeamStatus(enum.Enum):
     substitute = "substitute"
 
 class MatchStatus(enum.Enum):
+    pending = "pending"
     open = "open"
     finished = "finished"
 
@@ -41,6 +42,15 @@ class BanType(enum.Enum):
     discord_user = "discord_user"
     minecraft_account = "minecraft_account"
 
+class GameStatus(enum.Enum):
+    setup = "setup"
+    active = "active"
+    finished = "finished"
+
+class GameChannelType(enum.Enum):
+    text = "text"
+    voice = "voice"
+
 class Tournaments(Base):
     __tablename__ = 'tournaments'
     id = Column(Integer, primary_key=True)
@@ -60,6 +70,7 @@ class Tournaments(Base):
     
     brackets = relationship("Brackets", back_populates="tournament")
     teams = relationship("Teams", back_populates="tournament")
+    games = relationship("Games", back_populates="tournament")
 
 
 class Brackets(Base):
@@ -72,12 +83,18 @@ class Brackets(Base):
     team2_id = Column(Integer, ForeignKey('teams.id'), nullable=True)
     winner_team_id = Column(Integer, ForeignKey('teams.id'), nullable=True)
     match_status = Column(Enum(MatchStatus), default=MatchStatus.open)
+    
+    challonge_match_id = Column(String, nullable=True)
 
     tournament = relationship("Tournaments", back_populates="brackets")
     team1 = relationship("Teams", foreign_keys=[team1_id])
     team2 = relationship("Teams", foreign_keys=[team2_id])
     winner_team = relationship("Teams", foreign_keys=[winner_team_id])
 
+    __table_args__ = (
+        Index('uix_tournament_challonge_match', 'tournament_id', 'challonge_match_id', unique=True),
+    )
+
 
 class Players(Base):
     __tablename__ = 'players'
@@ -132,6 +149,7 @@ class Teams(Base):
 
     __table_args__ = (
         UniqueConstraint('tournament_id', 'team_name', name='uix_tournament_teamname'),
+        Index('ix_teams_tournament_status_completed', 'tournament_id', 'status', 'signup_completed_time'),
     )
 
 
@@ -170,6 +188,7 @@ class Messages(Base):
     discord_channel_id = Column(String, nullable=False)
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
     purpose = Column(String, default="signup confirmation message")  # e.g. 'signup confirmation message'
+    state_hash = Column(String, nullable=True)  # hash of the embed and bot reactions last applied to the message
     
     team = relationship("Teams", back_populates="messages")
 
@@ -198,4 +217,41 @@ class Bans(Base):
     __table_args__ = (
         UniqueConstraint('type', 'discord_user_id', name='uix_discord_ban'),
         UniqueConstraint('type', 'minecraft_uuid', name='uix_minecraft_ban'),
-    )
\ No newline at end of file
+    )
+class Games(Base):
+    __tablename__ = 'games'
+    id = Column(Integer, primary_key=True)
+    game_id = Column(String, nullable=False, unique=True)  # e.g. 'THR-BC4D', also used in the channel names
+    tournament_id = Column(Integer, ForeignKey('tournaments.id'), nullable=False)
+    bracket_id = Column(Integer, ForeignKey('brackets.id'), nullable=True, unique=True)
+    status = Column(Enum(GameStatus), default=GameStatus.setup)
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    tournament = relationship("Tournaments", back_populates="games")
+    bracket = relationship("Brackets")
+    channels = relationship("GameChannels", back_populates="game")
+
+    __table_args__ = (
+        Index('ix_games_tournament_status', 'tournament_id', 'status'),
+    )
+
+
+class GameChannels(Base):
+    __tablename__ = 'game_channels'
+    id = Column(Integer, primary_key=True)
+    game_id = Column(Integer, ForeignKey('games.id'), nullable=False, index=True)
+    discord_channel_id = Column(String, nullable=False, unique=True)
+    type = Column(Enum(GameChannelType), nullable=False)
+    team_id = Column(Integer, ForeignKey('teams.id'), nullable=True)  # set for the voice channel of a team
+
+    game = relationship("Games", back_populates="channels")
+
+
+class ErrorSignatures(Base):
+    __tablename__ = 'error_signatures'
+    id = Column(Integer, primary_key=True)
+    signature = Column(String, nullable=False, unique=True)
+    title = Column(String, nullable=False)
+    occurrences = Column(Integer, default=0, nullable=False)
+    first_seen_at = Column(DateTime, nullable=False)
+    last_reported_at = Column(DateTime, nullable=True)
@@ -2,24 +2,33 @@ from typing import Optional
 from aiohttp import ClientTimeout
 import aiohttp
 
+import metrics
+import resilience
+
 async def fetch_hypixel_discord_tag(api_key: str, uuid: str) -> Optional[str]:
     hypixel_url = f"https://api.hypixel.net/player?uuid={uuid}"
-    fetched_discord_tag = None
 
     headers = {
         "API-Key": api_key
     }
 
-    async with aiohttp.ClientSession(timeout=ClientTimeout(total=10), headers=headers) as sess:
-        async with sess.get(hypixel_url) as resp:
-            if resp.status == 200:
-                result = await resp.json()
-                if result.get("success") and result.get("player"):
-                    links = result["player"].get("socialMedia", {}).get("links", {})
-                    fetched_discord_tag = links.get("DISCORD")
-            else:
-                raise Exception(
-                    f"Failed to fetch data from Hypixel API. Status code: {resp.status}"
-                )
+    async def attempt(timeout: float) -> Optional[str]:
+        fetched_discord_tag = None
+        with metrics.track_external_request("hypixel") as request:
+            async with aiohttp.ClientSession(timeout=ClientTimeout(total=min(timeout, 10)), headers=headers) as sess:
+                async with sess.get(hypixel_url) as resp:
+                    request.status = resp.status
+                    if resp.status == 200:
+                        result = await resp.json()
+                        if result.get("success") and result.get("player"):
+                            links = result["player"].get("socialMedia", {}).get("links", {})
+                            fetched_discord_tag = links.get("DISCORD")
+                    elif resp.status in resilience.RETRY_STATUSES:
+                        raise resilience.RetryableStatus(resp.status, resilience.parse_retry_after(resp.headers.get("Retry-After")), host="hypixel")
+                    else:
+                        raise Exception(
+                            f"Failed to fetch data from Hypixel API. Status code: {resp.status}"
+                        )
+        return fetched_discord_tag
 
-    return fetched_discord_tag
+    return await resilience.call_async("hypixel", attempt, retry_on=(aiohttp.ClientConnectionError,))
@@ -0,0 +1,288 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import tracing
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), registry: "Registry" = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], "_Metric"] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, **labels) -> "_Metric":
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames} but got {tuple(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._new_child()
+                self._children[key] = child
+            return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        if not self.labelnames:
+            yield from self._child_samples(self, {})
+            return
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            yield from self._child_samples(child, dict(zip(self.labelnames, key)))
+
+    def _child_samples(self, child, labels: dict[str, str]):
+        raise NotImplementedError
+
+    def collect(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts.")
+        with self._lock:
+            self.value += amount
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._value = _CounterChild()
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._value.inc(amount)
+
+    def _child_samples(self, child, labels):
+        child = child._value if child is self else child
+        yield self.name, labels, child.value
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._value = _GaugeChild()
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._value.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._value.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._value.dec(amount)
+
+    def _child_samples(self, child, labels):
+        child = child._value if child is self else child
+        yield self.name, labels, child.value
+
+class _HistogramChild:
+    def __init__(self, buckets: tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS, registry: "Registry" = None):
+        self.buckets = tuple(sorted(buckets)) + ((math.inf,) if buckets[-1] != math.inf else ())
+        super().__init__(name, documentation, labelnames, registry)
+        self._value = _HistogramChild(self.buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._value.observe(value)
+
+    def time(self):
+        return self._value.time()
+
+    def _child_samples(self, child, labels):
+        child = child._value if child is self else child
+        with child._lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield f"{self.name}_sum", labels, total
+        yield f"{self.name}_count", labels, count
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered.")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Render all registered metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels.items()) + "}"
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+REGISTRY = Registry()
+
+GATEWAY_LATENCY = Gauge("horizon_gateway_latency_seconds", "Discord gateway heartbeat latency.")
+EVENT_LOOP_LAG = Histogram(
+    "horizon_event_loop_lag_seconds",
+    "Delay between the scheduled and actual wake-up of the event loop lag probe.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_STALLS = Counter(
+    "horizon_event_loop_stalls_total",
+    "Event loop stalls above the watchdog threshold, by the coroutine that was running.",
+    labelnames=("coroutine",),
+)
+APP_COMMAND_LATENCY = Histogram(
+    "horizon_app_command_duration_seconds",
+    "Time from interaction creation until the slash command handler finished.",
+    labelnames=("command", "status"),
+)
+REACTION_EVENTS = Counter("horizon_reaction_events_total", "Raw reaction events received by the signup cog.", labelnames=("result",))
+DB_QUERIES = Counter("horizon_db_queries_total", "Database statements executed.", labelnames=("operation",))
+DB_QUERY_DURATION = Histogram(
+    "horizon_db_query_duration_seconds",
+    "Database statement execution time.",
+    labelnames=("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+EXTERNAL_REQUESTS = Counter("horizon_external_requests_total", "Outbound HTTP requests to external APIs.", labelnames=("host", "status"))
+EXTERNAL_REQUEST_DURATION = Histogram("horizon_external_request_duration_seconds", "Outbound HTTP request latency.", labelnames=("host",))
+REPORTED_ERRORS = Counter("horizon_reported_errors_total", "Unhandled errors handed to the GitHub issue reporter.", labelnames=("result",))
+EXTERNAL_RETRIES = Counter("horizon_external_retries_total", "Retried outbound HTTP requests.", labelnames=("host", "reason"))
+CIRCUIT_OPEN = Gauge("horizon_circuit_open", "Whether the circuit breaker of an upstream host is open (1) or closed (0).", labelnames=("host",))
+CACHE_REQUESTS = Counter("horizon_cache_requests_total", "Lookups in the read-through domain caches.", labelnames=("cache", "result"))
+CACHE_ENTRIES = Gauge("horizon_cache_entries", "Entries held by the read-through domain caches.", labelnames=("cache",))
+BAN_CASCADE_DURATION = Histogram("horizon_ban_cascade_duration_seconds", "Time to apply a ban to all affected teams.")
+GAME_SETUP_DURATION = Histogram("horizon_game_setup_duration_seconds", "Time from the start of game creation until the first message is posted in the game channel.")
+GAMES_CLOSED = Counter("horizon_games_closed_total", "Finished games whose channels were archived and deleted.", labelnames=("result",))
+GAME_TRANSCRIPT_MESSAGES = Histogram("horizon_game_transcript_messages", "Messages archived per game transcript.", buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+DISCORD_QUEUE_DEPTH = Gauge("horizon_discord_queue_depth", "Discord REST requests waiting for a scheduler slot.", labelnames=("priority",))
+DISCORD_QUEUE_WAIT = Histogram(
+    "horizon_discord_queue_wait_seconds",
+    "Time Discord REST requests waited for a scheduler slot.",
+    labelnames=("priority",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+DISCORD_REQUESTS_IN_FLIGHT = Gauge("horizon_discord_requests_in_flight", "Discord REST requests currently holding a scheduler slot.")
+DM_SENDS = Counter("horizon_dm_sends_total", "Direct messages sent to members.", labelnames=("result",))
+SIGNUP_QUEUE_DEPTH = Gauge("horizon_signup_queue_depth", "Signups waiting in the admission queue.")
+SIGNUP_BATCH_SIZE = Histogram("horizon_signup_batch_size", "Signups admitted per batch.", buckets=(1, 2, 5, 10, 25, 50))
+SIGNUP_ADMISSION_WAIT = Histogram("horizon_signup_admission_wait_seconds", "Time from queueing a signup until its team and signup message exist.")
+SIGNUPS_ADMITTED = Counter("horizon_signups_admitted_total", "Signups handled by the admission queue.", labelnames=("result",))
+
+class _ExternalRequest:
+    def __init__(self):
+        self.status: int | str | None = None
+
+@contextmanager
+def track_external_request(host: str):
+    """
+    Measure an outbound HTTP call. Set ``status`` on the yielded object to the
+    response status code, otherwise the request is counted as ``error``.
+    The call is also recorded as a span when it happens inside a trace.
+    """
+    request = _ExternalRequest()
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"http {host}"):
+            yield request
+    except BaseException:
+        request.status = "error"
+        raise
+    finally:
+        EXTERNAL_REQUEST_DURATION.labels(host=host).observe(time.perf_counter() - start)
+        EXTERNAL_REQUESTS.labels(host=host, status=request.status if request.status is not None else "error").inc()
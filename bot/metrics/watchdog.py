@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from logging.handlers import RotatingFileHandler
+import sys
+import threading
+import time
+import traceback
+
+import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('metrics.watchdog.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+STACK_SAMPLE_LIMIT = 25
+
+class LoopWatchdog:
+    """
+    Detects event loop stalls.
+
+    A heartbeat coroutine records how late the loop wakes it up. A separate
+    thread watches that heartbeat and, while the loop is blocked, samples the
+    stack of the loop thread and the task that is currently running, so the
+    blocking code can be identified once the loop recovers.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, stall_threshold: float = 0.25, interval: float = 0.1, asyncio_debug: bool = False):
+        self.loop = loop
+        self.stall_threshold = stall_threshold
+        self.interval = interval
+        self.asyncio_debug = asyncio_debug
+
+        self._loop_thread_id: int | None = None
+        self._last_beat = time.monotonic()
+        self._sample: tuple[str, str, str] | None = None
+        self._sample_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat_task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+
+        if self.asyncio_debug:
+            self.loop.set_debug(True)
+            self.loop.slow_callback_duration = self.stall_threshold
+            logging.getLogger("asyncio").addHandler(handler)
+            logger.info(f"asyncio debug mode enabled, slow callback threshold {self.stall_threshold:.3f}s")
+
+        self._heartbeat_task = self.loop.create_task(self._heartbeat(), name="loop-watchdog-heartbeat")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        if self._thread:
+            self._thread.join(timeout=1)
+        if self.asyncio_debug:
+            self.loop.set_debug(False)
+            logging.getLogger("asyncio").removeHandler(handler)
+
+    async def _heartbeat(self):
+        while True:
+            scheduled = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            lag = max(0.0, now - scheduled)
+            metrics.EVENT_LOOP_LAG.observe(lag)
+
+            if lag >= self.stall_threshold:
+                self._report_stall(lag)
+            elif self._sample is not None:
+                with self._sample_lock:
+                    self._sample = None
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            if time.monotonic() - self._last_beat - self.interval < self.stall_threshold:
+                continue
+            with self._sample_lock:
+                if self._sample is None:
+                    self._sample = self._capture_sample()
+
+    def _capture_sample(self) -> tuple[str, str, str]:
+        task = asyncio.current_task(self.loop)
+        if task is not None:
+            coro = task.get_coro()
+            task_name, coro_name = task.get_name(), getattr(coro, "__qualname__", type(coro).__name__)
+        else:
+            task_name, coro_name = "-", "callback"
+
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame, limit=STACK_SAMPLE_LIMIT)) if frame else "<no frame>"
+        return task_name, coro_name, stack
+
+    def _report_stall(self, duration: float):
+        with self._sample_lock:
+            sample, self._sample = self._sample, None
+
+        task_name, coro_name, stack = sample if sample else ("-", "unknown", "<stall ended before a sample was taken>\n")
+        metrics.EVENT_LOOP_STALLS.labels(coroutine=coro_name).inc()
+        logger.warning(f"Event loop blocked for {duration:.3f}s in task {task_name} ({coro_name})\n{stack}")
@@ -1,6 +1,33 @@
 from typing import Optional
 import aiohttp
 
+import metrics
+import resilience
+
+async def _fetch_profile_field(url: str, field: str) -> Optional[str]:
+    """
+    Fetch a Mojang profile and return one of its fields.
+
+    :raises: resilience.UpstreamError if Mojang keeps failing or its circuit is open
+    """
+    async def attempt(timeout: float) -> Optional[str]:
+        with metrics.track_external_request("mojang") as request:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+                async with session.get(url) as resp:
+                    request.status = resp.status
+                    if resp.status == 200:
+                        data = await resp.json()
+                        return data.get(field)
+                    elif resp.status == 204:
+                        return None
+                    elif resp.status in resilience.RETRY_STATUSES:
+                        raise resilience.RetryableStatus(resp.status, resilience.parse_retry_after(resp.headers.get("Retry-After")), host="mojang")
+                    else:
+                        print(f"Error fetching Mojang profile: HTTP {resp.status}")
+                        return None
+
+    return await resilience.call_async("mojang", attempt, retry_on=(aiohttp.ClientConnectionError,))
+
 async def fetch_minecraft_uuid(username: str) -> Optional[str]:
     """
     Fetch the Minecraft UUID for a given username.
@@ -9,19 +36,13 @@ async def fetch_minecraft_uuid(username: str) -> Optional[str]:
         username (str): The Minecraft username to look up.
 
     Returns:
-        Optional[str]: The UUID without dashes if found, or None if not found or an error occurs.
+        Optional[str]: The UUID without dashes if found, or None if not found.
+
+    Raises:
+        resilience.UpstreamError: If the Mojang API is unavailable.
     """
     url = f"https://api.mojang.com/users/profiles/minecraft/{username}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                return data.get("id")
-            elif resp.status == 204:
-                return None
-            else:
-                print(f"Error fetching UUID: HTTP {resp.status}")
-                return None
+    return await _fetch_profile_field(url, "id")
 
 async def fetch_minecraft_username(uuid: str) -> Optional[str]:
     """
@@ -31,16 +52,10 @@ async def fetch_minecraft_username(uuid: str) -> Optional[str]:
         username (str): The Minecraft username to look up.
 
     Returns:
-        Optional[str]: The UUID without dashes if found, or None if not found or an error occurs.
+        Optional[str]: The UUID without dashes if found, or None if not found.
+
+    Raises:
+        resilience.UpstreamError: If the Mojang API is unavailable.
     """
     url = f"https://api.mojang.com/users/profiles/minecraft/{uuid}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                return data.get("name")
-            elif resp.status == 204:
-                return None
-            else:
-                print(f"Error fetching UUID: HTTP {resp.status}")
-                return None
\ No newline at end of file
+    return await _fetch_profile_field(url, "name")
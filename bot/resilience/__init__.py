@@ -0,0 +1,238 @@
+"""
+Retries, backoff, circuit breakers and deadlines shared by all outbound clients.
+
+The wrapped function performs one attempt. It raises `RetryableStatus` for
+responses that may be retried (429 and 5xx) and receives the time left until
+the call deadline, which it should use as its request timeout:
+
+    def attempt(timeout):
+        response = session.get(url, timeout=timeout)
+        if response.status_code in RETRY_STATUSES:
+            raise RetryableStatus(response.status_code, parse_retry_after(response.headers.get("Retry-After")))
+        return response
+
+    response = resilience.call_sync("challonge", attempt, retry_on=(requests.ConnectionError, requests.Timeout))
+"""
+import asyncio
+import datetime
+import email.utils
+import logging
+from logging.handlers import RotatingFileHandler
+import random
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('resilience.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+T = TypeVar("T")
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class UpstreamError(Exception):
+    def __init__(self, host: str, message: str):
+        super().__init__(f"{host}: {message}")
+        self.host = host
+
+class RetryableStatus(UpstreamError):
+    def __init__(self, status: int, retry_after: float | None = None, host: str = "upstream"):
+        super().__init__(host, f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+class CircuitOpenError(UpstreamError):
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(host, f"circuit open, retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+class DeadlineExceeded(UpstreamError):
+    pass
+
+class RetryPolicy:
+    def __init__(self, attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0, deadline: float = 20.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full jitter exponential backoff. `Retry-After` from the server wins when present."""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+POLICIES: dict[str, RetryPolicy] = {
+    "challonge": RetryPolicy(attempts=4, deadline=30.0),
+    "mojang": RetryPolicy(attempts=3, deadline=10.0),
+    "hypixel": RetryPolicy(attempts=3, deadline=10.0),
+    "github": RetryPolicy(attempts=3, deadline=20.0),
+}
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds. Afterwards a single trial call is let through;
+    its outcome closes the breaker again or keeps it open.
+    Thread safe, because the Challonge client runs in worker threads.
+    """
+
+    def __init__(self, host: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_call(self):
+        """:raises: CircuitOpenError while the upstream is considered down"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            retry_in = self._opened_at + self.reset_timeout - time.monotonic()
+            if retry_in > 0 or self._trial_running:
+                raise CircuitOpenError(self.host, max(retry_in, 0))
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit for {self.host} closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+        metrics.CIRCUIT_OPEN.labels(host=self.host).set(0)
+
+    def release_trial(self):
+        """End a trial call that neither proved the upstream healthy nor failed, the next call becomes the trial."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            reopen = self._trial_running
+            self._trial_running = False
+            if not reopen and (self._opened_at is not None or self._failures < self.failure_threshold):
+                return
+            self._opened_at = time.monotonic()
+        logger.warning(f"Circuit for {self.host} opened after {self._failures} consecutive failures")
+        metrics.CIRCUIT_OPEN.labels(host=self.host).set(1)
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(host: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host)
+        return breaker
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (date - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+class _Attempts:
+    """Bookkeeping shared by the sync and async call loops."""
+
+    def __init__(self, host: str, policy: RetryPolicy | None):
+        self.host = host
+        self.policy = policy or POLICIES.get(host, RetryPolicy())
+        self.breaker = get_breaker(host)
+        self.deadline = time.monotonic() + self.policy.deadline
+        self.attempt = 0
+
+    def remaining(self) -> float:
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(self.host, f"deadline of {self.policy.deadline:g}s exceeded")
+        return remaining
+
+    def next_delay(self, error: Exception) -> float:
+        """Record a failed attempt and return how long to wait, or raise an UpstreamError when giving up."""
+        self.breaker.record_failure()
+        self.attempt += 1
+        if isinstance(error, RetryableStatus):
+            error.host = self.host
+        retry_after = error.retry_after if isinstance(error, RetryableStatus) else None
+        delay = self.policy.delay(self.attempt - 1, retry_after)
+        if self.attempt >= self.policy.attempts or time.monotonic() + delay >= self.deadline:
+            if isinstance(error, TimeoutError):
+                raise DeadlineExceeded(self.host, f"gave up after {self.attempt} timed out attempts") from error
+            if isinstance(error, UpstreamError):
+                raise error
+            raise UpstreamError(self.host, f"gave up after {self.attempt} attempts: {type(error).__name__}: {error}") from error
+        reason = str(error.status) if isinstance(error, RetryableStatus) else type(error).__name__
+        metrics.EXTERNAL_RETRIES.labels(host=self.host, reason=reason).inc()
+        logger.debug(f"Retrying {self.host} call in {delay:.2f}s after {reason} (attempt {self.attempt})")
+        return delay
+
+def call_sync(host: str, func: Callable[[float], T], policy: RetryPolicy | None = None, retry_on: tuple[type[BaseException], ...] = ()) -> T:
+    """
+    Run `func(timeout)` with retries for blocking clients.
+
+    :raises: CircuitOpenError, DeadlineExceeded or another UpstreamError once retries are exhausted,
+        errors not in `retry_on` are raised unchanged
+    """
+    attempts = _Attempts(host, policy)
+    while True:
+        attempts.breaker.before_call()
+        try:
+            result = func(attempts.remaining())
+        except (RetryableStatus, *retry_on) as e:
+            delay = attempts.next_delay(e)
+        except BaseException:
+            # Not a failure of the upstream, but a trial must not keep the breaker half open forever
+            attempts.breaker.release_trial()
+            raise
+        else:
+            attempts.breaker.record_success()
+            return result
+        time.sleep(delay)
+
+async def call_async(host: str, func: Callable[[float], Awaitable[T]], policy: RetryPolicy | None = None, retry_on: tuple[type[BaseException], ...] = ()) -> T:
+    """
+    Await `func(timeout)` with retries. The attempt is cancelled when the deadline passes.
+
+    :raises: CircuitOpenError, DeadlineExceeded or another UpstreamError once retries are exhausted,
+        errors not in `retry_on` are raised unchanged
+    """
+    attempts = _Attempts(host, policy)
+    while True:
+        attempts.breaker.before_call()
+        try:
+            remaining = attempts.remaining()
+            result = await asyncio.wait_for(func(remaining), remaining)
+        except (RetryableStatus, asyncio.TimeoutError, *retry_on) as e:
+            delay = attempts.next_delay(e)
+        except BaseException:
+            # Also covers cancellation, a trial must not keep the breaker half open forever
+            attempts.breaker.release_trial()
+            raise
+        else:
+            attempts.breaker.record_success()
+            return result
+        await asyncio.sleep(delay)
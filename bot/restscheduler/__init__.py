@@ -0,0 +1,196 @@
+"""
+Central scheduler for outbound Discord REST requests.
+
+Every request made through the bot's HTTP client waits for a slot here before
+it is sent. Slots are handed out by priority class first, then fairly (round
+robin) between the routes waiting in the same class, with a cap on concurrent
+requests per route and a global request rate below Discord's global limit.
+
+Code sets the priority class of the requests it causes with `priority(...)`;
+the class is a context variable, so tasks spawned inside inherit it.
+Interaction responses and follow-ups go through the interaction webhook and
+never wait here.
+"""
+import asyncio
+import enum
+import functools
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import metrics
+
+class Priority(enum.IntEnum):
+    interaction = 0  # work done while answering a slash command
+    interactive = 1  # direct reactions to user actions (default)
+    background = 2  # notifications and periodic syncs
+    bulk = 3  # round launches, reconciliation, cleanups
+
+_priority: ContextVar[Priority] = ContextVar("discord_rest_priority", default=Priority.interactive)
+
+@contextmanager
+def priority(level: Priority):
+    """Run the enclosed code (and tasks created in it) with the given request priority."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+class _Waiter:
+    __slots__ = ("route", "priority", "future", "enqueued_at")
+
+    def __init__(self, route: str, priority: Priority, future: asyncio.Future):
+        self.route = route
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+class RestScheduler:
+    def __init__(self, max_in_flight: int = 10, per_route: int = 2, rate: float = 40.0, burst: int = 10):
+        self.max_in_flight = max_in_flight
+        self.per_route = per_route
+        self.rate = rate
+        self.burst = burst
+        # One ordered dict of route -> waiters per priority class, the order of the routes is the round robin order
+        self._queues: list[OrderedDict[str, deque[_Waiter]]] = [OrderedDict() for _ in Priority]
+        self._in_flight = 0
+        self._route_in_flight: dict[str, int] = {}
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    def queue_depth(self, level: Priority) -> int:
+        return sum(len(waiters) for waiters in self._queues[level].values())
+
+    async def acquire(self, route: str, level: Priority | None = None):
+        level = current_priority() if level is None else level
+        waiter = _Waiter(route, level, asyncio.get_running_loop().create_future())
+        self._queues[level].setdefault(route, deque()).append(waiter)
+        metrics.DISCORD_QUEUE_DEPTH.labels(priority=level.name).inc()
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted right before the cancellation
+                self.release(route)
+            else:
+                self._remove(waiter)
+            raise
+
+    def release(self, route: str):
+        self._in_flight -= 1
+        remaining = self._route_in_flight.get(route, 1) - 1
+        if remaining:
+            self._route_in_flight[route] = remaining
+        else:
+            self._route_in_flight.pop(route, None)
+        metrics.DISCORD_REQUESTS_IN_FLIGHT.set(self._in_flight)
+        self._dispatch()
+
+    @contextmanager
+    def _held(self, route: str):
+        try:
+            yield
+        finally:
+            self.release(route)
+
+    async def run(self, route: str, coro_factory, level: Priority | None = None):
+        """Wait for a slot, then await `coro_factory()` while holding it."""
+        await self.acquire(route, level)
+        with self._held(route):
+            return await coro_factory()
+
+    def _remove(self, waiter: _Waiter):
+        waiters = self._queues[waiter.priority].get(waiter.route)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            metrics.DISCORD_QUEUE_DEPTH.labels(priority=waiter.priority.name).dec()
+            if not waiters:
+                del self._queues[waiter.priority][waiter.route]
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._tokens
+
+    def _next(self) -> _Waiter | None:
+        for queue in self._queues:
+            for route in list(queue):
+                if self._route_in_flight.get(route, 0) >= self.per_route:
+                    continue
+                waiters = queue[route]
+                waiter = waiters.popleft()
+                if waiters:
+                    # Move the route to the back so the other routes of this class get their turn
+                    queue.move_to_end(route)
+                else:
+                    del queue[route]
+                return waiter
+        return None
+
+    def _dispatch(self):
+        while self._in_flight < self.max_in_flight:
+            if self._refill() < 1:
+                if self._wakeup is None:
+                    self._wakeup = asyncio.get_running_loop().call_later((1 - self._tokens) / self.rate, self._on_wakeup)
+                return
+
+            waiter = self._next()
+            if waiter is None:
+                return
+            metrics.DISCORD_QUEUE_DEPTH.labels(priority=waiter.priority.name).dec()
+            if waiter.future.done():
+                continue
+
+            self._tokens -= 1
+            self._in_flight += 1
+            self._route_in_flight[waiter.route] = self._route_in_flight.get(waiter.route, 0) + 1
+            metrics.DISCORD_REQUESTS_IN_FLIGHT.set(self._in_flight)
+            metrics.DISCORD_QUEUE_WAIT.labels(priority=waiter.priority.name).observe(time.monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._dispatch()
+
+scheduler = RestScheduler()
+
+def route_key(route) -> str:
+    """Route template plus major parameters, which is what Discord rate limits by."""
+    return f"{route.key} {route.major_parameters}"
+
+def install(http_client, rest_scheduler: RestScheduler = scheduler):
+    """Make every request of a discord.py HTTP client wait for a scheduler slot."""
+    request = http_client.request
+    if getattr(request, "__scheduled__", False):
+        return
+
+    @functools.wraps(request)
+    async def scheduled_request(route, **kwargs):
+        return await rest_scheduler.run(route_key(route), lambda: request(route, **kwargs))
+    scheduled_request.__scheduled__ = True
+    http_client.request = scheduled_request
+
+def prioritize_app_commands(tree):
+    """Run every slash command handler with the interaction priority."""
+    from discord import app_commands
+
+    for command in tree.walk_commands():
+        if not isinstance(command, app_commands.Command) or getattr(command._callback, "__prioritized__", False):
+            continue
+        command._callback = _with_priority(command._callback, Priority.interaction)
+
+def _with_priority(callback, level: Priority):
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        with priority(level):
+            return await callback(*args, **kwargs)
+    wrapper.__prioritized__ = True
+    return wrapper
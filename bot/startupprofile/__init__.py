@@ -0,0 +1,147 @@
+"""
+Startup profile mode.
+
+Set the HORIZON_STARTUP_PROFILE environment variable to make the bot time every
+module import (cumulative and self time, like `python -X importtime`) and the
+startup phases up to `on_ready`. The report is printed once the bot is ready
+and written to `startupprofile.log`.
+"""
+import importlib.abc
+import logging
+from logging.handlers import RotatingFileHandler
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('startupprofile.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+ENV_VAR = "HORIZON_STARTUP_PROFILE"
+DEFAULT_TOP = 25
+
+class _ImportTiming:
+    __slots__ = ("name", "cumulative", "self_time", "depth")
+
+    def __init__(self, name: str, cumulative: float, self_time: float, depth: int):
+        self.name = name
+        self.cumulative = cumulative
+        self.self_time = self_time
+        self.depth = depth
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Meta path finder in front of all others. It resolves specs through the
+    remaining finders and times the `exec_module` of their loaders, nested
+    imports are subtracted from the self time of the importing module.
+    """
+
+    def __init__(self):
+        self.timings: list[_ImportTiming] = []
+        self._local = threading.local()
+
+    def _stack(self) -> list[list[float]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                self._wrap(spec.loader)
+                return spec
+        return None
+
+    def _wrap(self, loader):
+        # Builtin and frozen importers are classes shared by all their modules, they are cheap anyway
+        if loader is None or isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return
+        exec_module = loader.exec_module
+        if getattr(exec_module, "__timed__", False):
+            return
+
+        def timed_exec_module(module):
+            stack = self._stack()
+            stack.append([0.0])  # time spent in nested imports
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                cumulative = time.perf_counter() - start
+                nested = stack.pop()[0]
+                if stack:
+                    stack[-1][0] += cumulative
+                self.timings.append(_ImportTiming(module.__name__, cumulative, cumulative - nested, len(stack)))
+        timed_exec_module.__timed__ = True
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass
+
+_timer: _ImportTimer | None = None
+_started: float | None = None
+_phases: list[tuple[str, float]] = []
+_reported = False
+
+def enable():
+    """Start timing imports and phases. Call before the heavy imports."""
+    global _timer, _started
+    if _timer is not None:
+        return
+    _started = time.perf_counter()
+    _timer = _ImportTimer()
+    sys.meta_path.insert(0, _timer)
+
+def enable_from_env() -> bool:
+    if os.getenv(ENV_VAR):
+        enable()
+    return is_enabled()
+
+def is_enabled() -> bool:
+    return _timer is not None
+
+def mark(phase: str):
+    """Record that a startup phase is done."""
+    if _started is not None:
+        _phases.append((phase, time.perf_counter() - _started))
+
+def report(top: int = DEFAULT_TOP) -> str:
+    """Phase times, the slowest top level imports by cumulative time and the packages by total self time."""
+    if _timer is None:
+        return "Startup profile is not enabled."
+    timings = list(_timer.timings)
+    lines = ["Startup profile (seconds since the profile was enabled):"]
+    lines += [f"  {elapsed:8.3f}s  {phase}" for phase, elapsed in _phases]
+
+    lines.append(f"Slowest imports by cumulative time ({len(timings)} modules imported):")
+    roots = sorted((timing for timing in timings if timing.depth == 0), key=lambda timing: timing.cumulative, reverse=True)
+    lines += [f"  {timing.cumulative * 1000:8.1f}ms  {timing.name}" for timing in roots[:top]]
+
+    packages: dict[str, float] = {}
+    for timing in timings:
+        package = timing.name.split(".", 1)[0]
+        packages[package] = packages.get(package, 0.0) + timing.self_time
+    lines.append("Import self time by top level package:")
+    lines += [
+        f"  {self_time * 1000:8.1f}ms  {package}"
+        for package, self_time in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    ]
+    return "\n".join(lines)
+
+def report_once(top: int = DEFAULT_TOP):
+    """Print and log the report the first time this is called (on_ready fires again on reconnects)."""
+    global _reported
+    if _timer is None or _reported:
+        return
+    _reported = True
+    text = report(top)
+    print(text)
+    logger.info(text)
@@ -0,0 +1,207 @@
+import contextvars
+import functools
+import importlib
+import inspect
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+import pkgutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+handler = RotatingFileHandler('tracing.log', maxBytes=1000000, backupCount=3)
+formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+class Span:
+    __slots__ = ("name", "attributes", "start", "end", "children", "error")
+
+    def __init__(self, name: str, attributes: dict[str, Any] | None = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.children: list["Span"] = []
+        self.error: str | None = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    @property
+    def self_time(self) -> float:
+        return max(0.0, self.duration - sum(child.duration for child in self.children))
+
+    def to_dict(self, origin: float | None = None) -> dict:
+        origin = self.start if origin is None else origin
+        data = {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+class JsonLinesExporter:
+    """Appends every exported trace as one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, root: Span):
+        line = json.dumps({"timestamp": time.time(), "trace": root.to_dict()}, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("horizon_current_span", default=None)
+
+_enabled = False
+_slow_threshold = 1.0
+_exporter: JsonLinesExporter | None = None
+
+def configure(enabled: bool, slow_threshold: float = 1.0, output_path: str = "traces.jsonl"):
+    global _enabled, _slow_threshold, _exporter
+    _enabled = enabled
+    _slow_threshold = slow_threshold
+    _exporter = JsonLinesExporter(output_path) if enabled else None
+
+def is_enabled() -> bool:
+    return _enabled
+
+@contextmanager
+def root_span(name: str, **attributes):
+    """
+    Start a new trace. When it finishes and took longer than the configured
+    threshold, the whole span tree is exported and a flame-style breakdown is logged.
+    """
+    if not _enabled:
+        yield None
+        return
+
+    root = Span(name, attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error = type(e).__name__
+        raise
+    finally:
+        root.end = time.perf_counter()
+        _current_span.reset(token)
+        if root.duration >= _slow_threshold:
+            _export(root)
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record a child span of the current trace. Does nothing outside of a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+def traced(name: str | None = None, root: bool = False):
+    """Decorator wrapping a sync or async function in a span."""
+    def decorator(func: Callable):
+        span_name = name or func.__qualname__
+        span_factory = root_span if root else span
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span_factory(span_name):
+                    return await func(*args, **kwargs)
+            async_wrapper.__traced__ = True
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span_factory(span_name):
+                return func(*args, **kwargs)
+        wrapper.__traced__ = True
+        return wrapper
+    return decorator
+
+def format_breakdown(root: Span) -> str:
+    """Render a span tree as an indented flame-style breakdown with total and self times."""
+    lines = []
+
+    def walk(node: Span, depth: int):
+        share = node.duration / root.duration * 100 if root.duration else 0.0
+        bar = "█" * max(1, round(share / 5))
+        error = f" !{node.error}" if node.error else ""
+        lines.append(f"{'  ' * depth}{node.name}{error}  {node.duration * 1000:.1f}ms (self {node.self_time * 1000:.1f}ms) {bar} {share:.0f}%")
+        for child in node.children:
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
+
+def _export(root: Span):
+    logger.info(f"Slow trace {root.name} took {root.duration * 1000:.1f}ms\n{format_breakdown(root)}")
+    if _exporter is not None:
+        try:
+            _exporter.export(root)
+        except OSError as e:
+            logger.error(f"Could not export trace {root.name}: {e}")
+
+def instrument_class(cls: type, prefix: str | None = None):
+    """Wrap every non-dunder method defined on the class in a span."""
+    prefix = prefix or cls.__name__
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("__") or not inspect.isfunction(value) or getattr(value, "__traced__", False):
+            continue
+        setattr(cls, attr, traced(f"{prefix}.{attr}")(value))
+
+def instrument_package(package_name: str):
+    """Instrument every class defined in the modules of a package."""
+    package = importlib.import_module(package_name)
+    for module_info in pkgutil.iter_modules(list(package.__path__)):
+        module = importlib.import_module(f"{package_name}.{module_info.name}")
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ == module.__name__ and not issubclass(cls, BaseException):
+                instrument_class(cls)
+
+def instrument_app_commands(tree):
+    """Make every slash command handler the root span of its own trace."""
+    from discord import app_commands
+
+    for command in tree.walk_commands():
+        if not isinstance(command, app_commands.Command) or getattr(command._callback, "__traced__", False):
+            continue
+        command._callback = traced(f"/{command.qualified_name}", root=True)(command._callback)
+
+def instrument_discord_http(http_client):
+    """Record a span for every Discord REST call made within a trace."""
+    request = http_client.request
+    if getattr(request, "__traced__", False):
+        return
+
+    @functools.wraps(request)
+    async def traced_request(route, **kwargs):
+        with span(f"discord {route.method} {route.path}"):
+            return await request(route, **kwargs)
+    traced_request.__traced__ = True
+    http_client.request = traced_request
@@ -0,0 +1,104 @@
+"""
+Startup benchmark: time a cold start of the bot up to the end of `setup_hook`
+(every module imported and every cog loaded, no Discord login) in fresh
+processes and report the median and minimum.
+
+    python scripts/bench_startup.py                  # this tree
+    python scripts/bench_startup.py --against HEAD~1 # interleaved A/B against a git ref
+
+Run it from the repository root. With `--against` the ref is checked out in a
+temporary git worktree and both trees are measured in alternating runs, so
+noise from the machine affects both sides alike.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ("plotly", "jwt", "cryptography", "requests", "pandas", "numpy")
+
+def child():
+    """Measure one cold start in this process, the working directory is the tree to measure."""
+    started = time.perf_counter()
+    import asyncio
+    sys.path.insert(0, os.path.join(os.getcwd(), "bot"))
+    from discord.ext import commands
+    from bot import HorizonBot
+
+    async def load():
+        bot = HorizonBot()
+        load_extension = bot.load_extension
+
+        async def tolerant_load_extension(name, **kwargs):
+            try:
+                await load_extension(name, **kwargs)
+            except commands.ExtensionFailed:
+                pass  # cogs that refuse to load without a full config still imported their modules
+        bot.load_extension = tolerant_load_extension
+        async with bot:
+            await bot.setup_hook()
+
+    asyncio.run(load())
+    print(json.dumps({
+        "wall_ms": (time.perf_counter() - started) * 1000,
+        "cpu_ms": time.process_time() * 1000,
+        "heavy_modules": [module for module in HEAVY_MODULES if module in sys.modules],
+    }))
+
+def measure(tree: str) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        cwd=tree, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+def summarize(name: str, results: list[dict]):
+    for key in ("wall_ms", "cpu_ms", "process_ms"):
+        values = [result[key] for result in results]
+        print(f"{name:>8} {key:<10} median {statistics.median(values):7.0f}  min {min(values):7.0f}")
+    print(f"{name:>8} heavy modules loaded: {', '.join(results[-1]['heavy_modules']) or 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=21)
+    parser.add_argument("--against", metavar="REF", help="git ref to compare this tree with")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    trees = {"current": os.getcwd()}
+    worktree = None
+    if args.against:
+        worktree = tempfile.mkdtemp(prefix="bench-startup-")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, args.against], check=True, capture_output=True)
+        trees = {args.against: worktree, **trees}
+
+    try:
+        # One warm up run per tree, so both start with compiled bytecode
+        for tree in trees.values():
+            measure(tree)
+        results: dict[str, list[dict]] = {name: [] for name in trees}
+        for _ in range(args.runs):
+            for name, tree in trees.items():
+                results[name].append(measure(tree))
+    finally:
+        if worktree is not None:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], check=False, capture_output=True)
+            shutil.rmtree(worktree, ignore_errors=True)
+
+    print(f"{args.runs} cold starts per tree (ms)")
+    for name, tree_results in results.items():
+        summarize(name, tree_results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The bot is run from bot/ as its import root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bot"))
@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+
+from core.repositories.bans import BanIndex
+from db import models
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+class _SlowSession:
+    """Returns the given ban rows after yielding, so writes can happen while the SELECT runs."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def execute(self, stmt):
+        self.started.set()
+        await self.release.wait()
+        return _Result(self.rows)
+
+class BanIndexReloadTest(unittest.TestCase):
+    def test_bans_changed_during_reload_survive_it(self):
+        async def run():
+            index = BanIndex()
+            index.add(models.BanType.discord_user, "2")
+            session = _SlowSession([
+                (models.BanType.discord_user, "1", None, None),
+                (models.BanType.discord_user, "2", None, None),
+            ])
+            reload = asyncio.create_task(index.ensure_loaded(session))
+            await session.started.wait()
+            index.add(models.BanType.discord_user, "3")
+            index.remove(models.BanType.discord_user, "2")
+            session.release.set()
+            await reload
+            return index
+
+        index = asyncio.run(run())
+        self.assertEqual(index.banned_among(models.BanType.discord_user, ["1", "2", "3"]), {"1", "3"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import socket
+import tempfile
+import unittest
+from unittest import mock
+import aiohttp
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from challonge.webhooks import ChallongeWebhookServer
+from cogs.brackets import BracketCog
+from core.repositories.brackets import BracketRepository
+from core.repositories.teams import TeamRepository
+from core.repositories.tournaments import TournamentRepository
+from core.services import brackets
+from core.services.brackets import BracketSyncService
+from db import models
+from tests.test_challonge import SimulatorTestCase
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class BracketSyncTest(SimulatorTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        brackets._match_etags.clear()
+        brackets._match_hashes.clear()
+        brackets._open_matches.clear()
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.directory.name, 'test.db')}")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        self.session_factory = sessionmaker(bind=self.engine, class_=AsyncSession, expire_on_commit=False)
+
+        # Two started tournaments with four teams each, the second one must not be touched by a webhook for the first
+        self.tournaments = []
+        async with self.session_factory() as session:
+            for t in range(2):
+                challonge_tournament = (await asyncio.to_thread(self.client.create_tournament, f"test{t}", f"test{t}", 8))["tournament"]
+                tournament = models.Tournaments(
+                    name=f"test{t}", status=models.TournamentStatus.active, signup_channel_id=str(t),
+                    game_texts_category_id="1", game_vc_category_id="1", challonge_tournament_id=str(challonge_tournament["id"])
+                )
+                session.add(tournament)
+                await session.flush()
+                for i in range(4):
+                    participant = (await asyncio.to_thread(self.client.add_participant, challonge_tournament["id"], f"team{t}-{i}"))["participant"]
+                    session.add(models.Teams(tournament_id=tournament.id, team_name=f"team{t}-{i}", challonge_team_id=str(participant["id"])))
+                await asyncio.to_thread(self.client.start_tournament, challonge_tournament["id"])
+                self.tournaments.append(tournament)
+            await session.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.directory.cleanup()
+        await super().asyncTearDown()
+
+    async def bracket_rows(self, tournament: models.Tournaments) -> list[models.Brackets]:
+        async with self.session_factory() as session:
+            return (await session.execute(select(models.Brackets).where(models.Brackets.tournament_id == tournament.id))).scalars().all()
+
+    async def sync(self, tournament: models.Tournaments, force: bool = False):
+        async with self.session_factory() as session:
+            service = BracketSyncService(TournamentRepository(session), TeamRepository(session), BracketRepository(session), self.client)
+            return await service.sync_tournament(tournament, force=force)
+
+    async def report_winner(self, tournament: models.Tournaments):
+        """Complete the first open match through the simulator's API, like an organizer on Challonge."""
+        challonge_id = int(tournament.challonge_tournament_id)
+        match = next(match for match in self.simulator.matches[challonge_id].values() if match["state"] == "open")
+        async with aiohttp.ClientSession() as session:
+            url = f"{self.simulator.base_url}/tournaments/{challonge_id}/matches/{match['id']}.json"
+            async with session.put(url, data={"match[winner_id]": str(match["player1_id"]), "match[scores_csv]": "1-0"}) as response:
+                self.assertEqual(response.status, 200)
+        return match
+
+    async def test_webhook_triggers_a_targeted_resync(self):
+        cog = BracketCog(None, self.session_factory)
+        cog.challonge_client = self.client
+        server = ChallongeWebhookServer("127.0.0.1", free_port(), cog.on_challonge_webhook)
+        await server.start()
+        try:
+            synced, untouched = self.tournaments
+            await self.sync(synced)
+            match = await self.report_winner(synced)
+
+            async with aiohttp.ClientSession() as session:
+                url = f"http://127.0.0.1:{server.port}/challonge/webhook"
+                async with session.post(url, json={"match": {"id": match["id"], "tournament_id": int(synced.challonge_tournament_id)}}) as response:
+                    self.assertEqual(response.status, 200)
+            await asyncio.gather(*cog._webhook_tasks)
+        finally:
+            await server.stop()
+
+        rows = {row.challonge_match_id: row for row in await self.bracket_rows(synced)}
+        self.assertEqual(rows[str(match["id"])].match_status, models.MatchStatus.finished)
+        self.assertIsNotNone(rows[str(match["id"])].winner_team_id)
+        self.assertEqual(await self.bracket_rows(untouched), [])
+        # While webhooks arrive, polling of the tournament backs off
+        self.assertEqual(cog.scheduler.due([synced.challonge_tournament_id]), [])
+
+    async def test_unchanged_matches_skip_the_write(self):
+        tournament = self.tournaments[0]
+        first = await self.sync(tournament)
+        self.assertTrue(first.changed)
+        self.assertEqual(first.written, 3)
+
+        # Without the ETag Challonge answers 200 with the same content, the hash catches it
+        brackets._match_etags.clear()
+        with mock.patch.object(BracketRepository, "upsert_matches") as upsert_matches:
+            second = await self.sync(tournament)
+        self.assertFalse(second.changed)
+        upsert_matches.assert_not_called()
+
+        # A forced sync (webhook) compares row by row and writes nothing either
+        forced = await self.sync(tournament, force=True)
+        self.assertTrue(forced.changed)
+        self.assertEqual(forced.written, 0)
+
+        await self.report_winner(tournament)
+        changed = await self.sync(tournament)
+        self.assertTrue(changed.changed)
+        self.assertGreaterEqual(changed.written, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import resilience
+from challonge.client import ChallongeClient
+from challonge.simulator import ChallongeSimulator
+
+# Short backoff, so tests do not wait for the production delays
+FAST_POLICY = resilience.RetryPolicy(attempts=6, base_delay=0.01, max_delay=0.05, deadline=10.0)
+
+class SimulatorTestCase(unittest.IsolatedAsyncioTestCase):
+    simulator_options: dict = {}
+
+    async def asyncSetUp(self):
+        resilience._breakers.pop("challonge", None)
+        self.simulator = ChallongeSimulator(seed=1, **self.simulator_options)
+        await self.simulator.start()
+        self.client = ChallongeClient("test-key", base_url=self.simulator.base_url)
+
+    async def asyncTearDown(self):
+        await self.simulator.stop()
+        resilience._breakers.pop("challonge", None)
+
+class ClientRetryTest(SimulatorTestCase):
+    async def test_injected_server_errors_are_retried(self):
+        with mock.patch.dict(resilience.POLICIES, {"challonge": FAST_POLICY}):
+            # Creates are not idempotent and not retried on 5xx, so errors are only injected for the reads below
+            tournament = (await asyncio.to_thread(self.client.create_tournament, "test", "test", 8))["tournament"]
+            for i in range(4):
+                await asyncio.to_thread(self.client.add_participant, tournament["id"], f"team{i}")
+            self.simulator.error_rate = 0.3
+            self.simulator.stats.update(requests=0, errors_injected=0)
+
+            results = [await asyncio.to_thread(self.client.list_participants, tournament["id"]) for _ in range(20)]
+
+        self.assertTrue(all(len(participants) == 4 for participants in results))
+        self.assertGreater(self.simulator.stats["errors_injected"], 0)
+        self.assertEqual(self.simulator.stats["requests"], 20 + self.simulator.stats["errors_injected"])
+        self.assertFalse(resilience.get_breaker("challonge").is_open)
+
+class ClientRateLimitTest(SimulatorTestCase):
+    simulator_options = {"rate_limit": 20, "burst": 2}
+
+    async def test_rate_limited_requests_wait_for_retry_after(self):
+        with mock.patch.dict(resilience.POLICIES, {"challonge": FAST_POLICY}):
+            tournament = (await asyncio.to_thread(self.client.create_tournament, "test", "test", 8))["tournament"]
+            results = [await asyncio.to_thread(self.client.get_tournament, tournament["id"]) for _ in range(3)]
+
+        self.assertEqual([result["tournament"]["id"] for result in results], [tournament["id"]] * 3)
+        self.assertGreater(self.simulator.stats["rate_limited"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+import requests
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.repositories.messages import MessageRepository
+from core.repositories.teams import TeamRepository
+from core.services import participants
+from core.services.participants import ParticipantBulkService
+from db import models
+from tests.test_challonge import SimulatorTestCase
+
+class ParticipantBulkServiceTest(SimulatorTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.directory.name, 'test.db')}")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        self.session_factory = sessionmaker(bind=self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.directory.cleanup()
+        await super().asyncTearDown()
+
+    async def test_ids_of_added_chunks_are_kept_when_a_later_chunk_fails(self):
+        # The signup cap makes the second chunk fail on challonge
+        challonge_tournament = (await asyncio.to_thread(self.client.create_tournament, "test", "test", 2))["tournament"]
+        async with self.session_factory() as session:
+            tournament = models.Tournaments(
+                name="test", status=models.TournamentStatus.active, signup_channel_id="1",
+                game_texts_category_id="1", game_vc_category_id="1", challonge_tournament_id=str(challonge_tournament["id"])
+            )
+            session.add(tournament)
+            await session.flush()
+            session.add_all([models.Teams(tournament_id=tournament.id, team_name=f"team{i}", status=models.TeamStatus.accepted) for i in range(4)])
+            await session.commit()
+
+            service = ParticipantBulkService(TeamRepository(session), MessageRepository(session), self.client)
+            with mock.patch.object(participants, "BULK_ADD_CHUNK_SIZE", 2), self.assertRaises(requests.HTTPError):
+                await service.register_teams(tournament)
+
+        async with self.session_factory() as session:
+            stored = dict((await session.execute(select(models.Teams.team_name, models.Teams.challonge_team_id))).all())
+        added = {participant["name"]: str(participant["id"]) for participant in self.simulator.participants[challonge_tournament["id"]].values()}
+        self.assertEqual(len(added), 2)
+        self.assertEqual(stored, {team_name: added.get(team_name) for team_name in stored})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import unittest
+
+import resilience
+
+class CircuitBreakerTrialTest(unittest.TestCase):
+    def setUp(self):
+        self.host = f"test-{self.id()}"
+        self.breaker = resilience.get_breaker(self.host)
+        self.breaker.failure_threshold = 1
+        self.breaker.reset_timeout = 0.0
+        self.policy = resilience.RetryPolicy(attempts=1, deadline=5.0)
+
+    def open_breaker(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.is_open)
+
+    def test_sync_trial_with_non_retryable_error_allows_next_call(self):
+        self.open_breaker()
+
+        def attempt(timeout):
+            raise KeyError("not retried")
+
+        with self.assertRaises(KeyError):
+            resilience.call_sync(self.host, attempt, policy=self.policy)
+        self.assertEqual(resilience.call_sync(self.host, lambda timeout: "ok", policy=self.policy), "ok")
+        self.assertFalse(self.breaker.is_open)
+
+    def test_async_trial_cancelled_allows_next_call(self):
+        self.open_breaker()
+
+        async def attempt(timeout):
+            raise asyncio.CancelledError()
+
+        async def ok(timeout):
+            return "ok"
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(resilience.call_async(self.host, attempt, policy=self.policy))
+        self.assertEqual(asyncio.run(resilience.call_async(self.host, ok, policy=self.policy)), "ok")
+
+    def test_trial_past_deadline_allows_next_call(self):
+        self.open_breaker()
+
+        async def ok(timeout):
+            return "ok"
+
+        with self.assertRaises(resilience.DeadlineExceeded):
+            asyncio.run(resilience.call_async(self.host, ok, policy=resilience.RetryPolicy(deadline=0.0)))
+        self.assertEqual(asyncio.run(resilience.call_async(self.host, ok, policy=self.policy)), "ok")
+
+    def test_failed_trial_reopens(self):
+        self.open_breaker()
+        self.breaker.reset_timeout = 60.0
+        self.breaker._opened_at -= 60.0
+
+        def attempt(timeout):
+            raise ConnectionError()
+
+        with self.assertRaises(resilience.UpstreamError):
+            resilience.call_sync(self.host, attempt, policy=self.policy, retry_on=(ConnectionError,))
+        with self.assertRaises(resilience.CircuitOpenError):
+            resilience.call_sync(self.host, lambda timeout: "ok", policy=self.policy)
+
+class RetryTest(unittest.TestCase):
+    def setUp(self):
+        self.host = f"test-{self.id()}"
+        self.policy = resilience.RetryPolicy(attempts=3, base_delay=0.0, deadline=5.0)
+
+    def test_sync_retries_after_retryable_status(self):
+        calls = []
+
+        def attempt(timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                raise resilience.RetryableStatus(503, retry_after=0.0)
+            return "ok"
+
+        self.assertEqual(resilience.call_sync(self.host, attempt, policy=self.policy), "ok")
+        self.assertEqual(len(calls), 2)
+        breaker = resilience.get_breaker(self.host)
+        self.assertFalse(breaker.is_open)
+        self.assertEqual(breaker._failures, 0)
+
+    def test_async_retries_after_retry_on_error(self):
+        calls = []
+
+        async def attempt(timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                raise ConnectionError()
+            return "ok"
+
+        self.assertEqual(asyncio.run(resilience.call_async(self.host, attempt, policy=self.policy, retry_on=(ConnectionError,))), "ok")
+        self.assertEqual(len(calls), 2)
+        breaker = resilience.get_breaker(self.host)
+        self.assertFalse(breaker.is_open)
+        self.assertEqual(breaker._failures, 0)
+
+class ExhaustedRetriesTest(unittest.TestCase):
+    def test_retry_on_error_is_wrapped_in_upstream_error(self):
+        policy = resilience.RetryPolicy(attempts=2, base_delay=0.0, deadline=5.0)
+
+        async def attempt(timeout):
+            raise ConnectionError("refused")
+
+        with self.assertRaises(resilience.UpstreamError) as raised:
+            asyncio.run(resilience.call_async("test-exhausted", attempt, policy=policy, retry_on=(ConnectionError,)))
+        self.assertIsInstance(raised.exception.__cause__, ConnectionError)
+
+if __name__ == "__main__":
+    unittest.main()
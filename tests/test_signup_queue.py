@@ -0,0 +1,125 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.repositories.registrations import RegistrationRepository, registration_index
+from core.services.signup_queue import SignupAdmissionQueue
+from core.services.signups import DuplicateTeamMemberError, PlayerAlreadyInATeam, TeamNameTaken, UnregisteredPlayersError
+from db import models
+
+CHANNEL_ID = "1"
+PLAYERS = 12
+
+def member(discord_id: int):
+    return SimpleNamespace(id=discord_id)
+
+class SignupAdmissionQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.directory.name, 'test.db')}")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        self.session_factory = sessionmaker(bind=self.engine, class_=AsyncSession, expire_on_commit=False)
+        async with self.session_factory() as session:
+            session.add(models.Tournaments(
+                name="test", status=models.TournamentStatus.signups, signup_channel_id=CHANNEL_ID,
+                game_texts_category_id="1", game_vc_category_id="1"
+            ))
+            for i in range(1, PLAYERS + 1):
+                session.add(models.Players(id=i, discord_user_id=str(i), username=f"player{i}"))
+                session.add(models.MinecraftAccounts(player_id=i, minecraft_uuid=f"uuid{i}", minecraft_username=f"mc{i}"))
+            await session.commit()
+
+        self.sent: list[str] = []
+        self.failing_teams: set[str] = set()
+        self.queue = SignupAdmissionQueue(self.session_factory, None, self.send, batch_window=0.05)
+
+    async def asyncTearDown(self):
+        await self.queue.close()
+        await self.engine.dispose()
+        self.directory.cleanup()
+
+    async def send(self, channel_id: str, team: models.Teams, discord_ids: list[int]):
+        await asyncio.sleep(0)
+        if team.team_name in self.failing_teams:
+            raise ConnectionError("Discord is down")
+        self.sent.append(team.team_name)
+        return SimpleNamespace(id=1000 + team.id, channel=SimpleNamespace(id=int(channel_id)))
+
+    async def submit_all(self, *signups):
+        return await asyncio.gather(*(self.queue.submit(CHANNEL_ID, name, members) for name, members in signups), return_exceptions=True)
+
+    async def team_names(self) -> set[str]:
+        async with self.session_factory() as session:
+            return set((await session.execute(select(models.Teams.team_name))).scalars().all())
+
+    async def signup_message_team_ids(self) -> set[int]:
+        async with self.session_factory() as session:
+            return set((await session.execute(select(models.Messages.team_id))).scalars().all())
+
+    async def test_concurrent_signups_are_admitted_in_one_batch(self):
+        results = await self.submit_all(*((f"team{i}", [member(2 * i + 1), member(2 * i + 2)]) for i in range(4)))
+
+        self.assertEqual([result.batch_size for result in results], [4, 4, 4, 4])
+        self.assertEqual(await self.team_names(), {"team0", "team1", "team2", "team3"})
+        self.assertEqual(await self.signup_message_team_ids(), {result.team.id for result in results})
+
+    async def test_rejected_signups_do_not_affect_the_rest_of_the_batch(self):
+        results = await self.submit_all(
+            ("alpha", [member(1), member(2)]),
+            ("alpha", [member(3), member(4)]),     # name taken earlier in the batch
+            ("beta", [member(2), member(5)]),      # player taken earlier in the batch
+            ("gamma", [member(6), member(6)]),
+            ("delta", [member(7), member(99)]),    # not registered
+            ("epsilon", [member(8), member(9)]),
+        )
+
+        self.assertEqual(results[0].team.team_name, "alpha")
+        self.assertIsInstance(results[1], TeamNameTaken)
+        self.assertIsInstance(results[2], PlayerAlreadyInATeam)
+        self.assertIsInstance(results[3], DuplicateTeamMemberError)
+        self.assertIsInstance(results[4], UnregisteredPlayersError)
+        self.assertEqual(results[5].team.team_name, "epsilon")
+        self.assertEqual(await self.team_names(), {"alpha", "epsilon"})
+
+    async def test_failed_signup_message_only_fails_its_own_request(self):
+        self.failing_teams.add("broken")
+
+        results = await self.submit_all(("ok", [member(1), member(2)]), ("broken", [member(3), member(4)]))
+
+        self.assertEqual(results[0].team.team_name, "ok")
+        self.assertIsInstance(results[1], ConnectionError)
+        # The team without a signup message is deleted again
+        self.assertEqual(await self.team_names(), {"ok"})
+        self.assertEqual(await self.signup_message_team_ids(), {results[0].team.id})
+        self.assertEqual(self.sent, ["ok"])
+
+        # So the same name and players can sign up again
+        self.failing_teams.clear()
+        retry = await self.queue.submit(CHANNEL_ID, "broken", [member(3), member(4)])
+        self.assertEqual(retry.team.team_name, "broken")
+        self.assertEqual(await self.team_names(), {"ok", "broken"})
+
+    async def test_failed_signup_message_frees_the_warm_registration_index(self):
+        registration_index.clear()
+        async with self.session_factory() as session:
+            await RegistrationRepository(session).warm([1])
+        self.addCleanup(registration_index.clear)
+        self.failing_teams.add("broken")
+
+        result = (await self.submit_all(("broken", [member(1), member(2)])))[0]
+        self.assertIsInstance(result, ConnectionError)
+        self.assertEqual(registration_index.taken_team_names(1, ["broken"]), set())
+        self.assertEqual({registration.team_id for registration in registration_index.lookup(1, ["1", "2"]).values()}, {None})
+
+        self.failing_teams.clear()
+        retry = await self.queue.submit(CHANNEL_ID, "broken", [member(1), member(2)])
+        self.assertEqual(retry.team.team_name, "broken")
+
+if __name__ == "__main__":
+    unittest.main()
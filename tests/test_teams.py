@@ -0,0 +1,54 @@
+import asyncio
+import datetime
+import os
+import tempfile
+import unittest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.repositories.teams import TeamRepository
+from db import models
+
+MAX_ACCEPTED_TEAMS = 16
+TEAMS = 300
+
+class CompleteSignupStressTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.directory.name, 'test.db')}")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        self.session_factory = sessionmaker(bind=self.engine, class_=AsyncSession, expire_on_commit=False)
+        async with self.session_factory() as session:
+            tournament = models.Tournaments(
+                name="test", signup_channel_id="1", game_texts_category_id="1", game_vc_category_id="1",
+                max_accepted_teams=MAX_ACCEPTED_TEAMS
+            )
+            session.add(tournament)
+            await session.flush()
+            session.add_all([models.Teams(tournament_id=tournament.id, team_name=f"team{i}") for i in range(TEAMS)])
+            await session.commit()
+            self.tournament_id = tournament.id
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.directory.cleanup()
+
+    async def approve(self, team_id: int) -> models.TeamStatus | None:
+        async with self.session_factory() as session:
+            return await TeamRepository(session).complete_signup(
+                team_id, self.tournament_id, MAX_ACCEPTED_TEAMS, datetime.datetime.now(datetime.timezone.utc)
+            )
+
+    async def test_concurrent_approvals_never_exceed_the_cap(self):
+        # Every team is approved twice on its own session, as with duplicate reaction events
+        results = await asyncio.gather(*(self.approve(team_id) for team_id in list(range(1, TEAMS + 1)) * 2))
+
+        self.assertEqual(results.count(models.TeamStatus.accepted), MAX_ACCEPTED_TEAMS)
+        self.assertEqual(results.count(models.TeamStatus.substitute), TEAMS - MAX_ACCEPTED_TEAMS)
+        self.assertEqual(results.count(None), TEAMS)
+        async with self.session_factory() as session:
+            self.assertEqual(await TeamRepository(session).get_accepted_team_count(self.tournament_id), MAX_ACCEPTED_TEAMS)
+
+if __name__ == "__main__":
+    unittest.main()